@@ -0,0 +1,195 @@
+"""
+Benchmarks of the hot paths of input generation.
+
+Each scenario is timed (best of `--repeat` runs, without garbage collection) and its peak memory is measured with tracemalloc.
+Results are compared with the stored baseline (`benchmarks/baseline.json`, created with `--save`):
+the script exits with status 1 when a scenario regresses (time or memory) beyond `--threshold`.
+The committed baseline is a reference measured on a developer machine: times depend on the hardware,
+so run `--save` once (e.g. on the current main branch) before comparing a change on another machine.
+
+    python benchmarks/run.py --save         # store the baseline on this machine
+    python benchmarks/run.py                # compare with the baseline
+    python benchmarks/run.py -k AtomBasis   # run only matching scenarios
+"""
+
+import sys, os
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+from typing import Callable
+
+import numpy as np
+
+from pynabi import DataSet, createAbi, append, parseAbi
+from pynabi.crystal import Atom, AtomBasis, Lattice
+from pynabi.calculation import EnergyCutoff, ToleranceOn, MaxSteps, SCFMixing
+from pynabi.kspace import SymmetricGrid, BrillouinZone, UsualKShifts, Path, CriticalPointsOf
+from pynabi.occupation import Metal, Smearing, SpinType
+from pynabi._common import Vec3D
+
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+_scenarios: dict[str, Callable[[], Callable[[], object]]] = {}
+
+
+def scenario(name: str):
+    """Registers a scenario: the decorated function prepares the inputs and returns the function to measure"""
+    def decorator(fn: Callable[[], Callable[[], object]]):
+        _scenarios[name] = fn
+        return fn
+    return decorator
+
+
+Na = Atom("Na")
+Cl = Atom("Cl")
+
+
+def _base():
+    return DataSet(
+        AtomBasis((Na, Vec3D.zero()), (Cl, Vec3D.uniform(0.5))),
+        Lattice.FCC(10.6),
+        SymmetricGrid(BrillouinZone.Irreducible, UsualKShifts.FCC).ofMonkhorstPack(4),
+        SCFMixing(density=True).Pulay(10),
+        ToleranceOn.EnergyDifference(1e-6),
+        MaxSteps(30)
+    )
+
+
+def _basis(n: int):
+    rng = np.random.default_rng(0)
+    return AtomBasis.fromArrays([Na, Cl], np.arange(n) % 2, rng.random((n,3)))
+
+
+for n in (1000, 10000):
+    @scenario(f"createAbi[{n} datasets]")
+    def _(n=n):
+        base = _base()
+        sets = [DataSet(EnergyCutoff(8.0 + i*0.01)) for i in range(n)]
+        return lambda: createAbi(base, *sets)
+
+
+for n in (1000, 10000, 100000):
+    @scenario(f"AtomBasis.stamp[{n} atoms]")
+    def _(n=n):
+        b = _basis(n)
+        pool = [Na, Cl]
+        return lambda: b.stamp(1, pool)
+
+
+for n in (1000, 10000):
+    @scenario(f"Path.auto[{n} points]")
+    def _(n=n):
+        p = "GXWKGLUWLK" * (n // 10)
+        return lambda: Path.auto(10, p, CriticalPointsOf.FCC).stamp(1)
+
+    @scenario(f"Path.manual[{n} points]")
+    def _(n=n):
+        args: list = ['G']
+        for i in range(n-1):
+            args += [10 + i % 7, "XWKL"[i % 4]]
+        return lambda: Path.manual(*args, pointSet=CriticalPointsOf.FCC).stamp(1)
+
+
+@scenario("DataSet._append[10000 datasets]")
+def _():
+    what = (
+        EnergyCutoff(10.0),
+        MaxSteps(20),
+        ToleranceOn.EnergyDifference(1e-6),
+        SCFMixing().Pulay(5),
+        Metal(Smearing.Gaussian, 8, 0.01),
+        SpinType.Polarized,
+        SymmetricGrid(BrillouinZone.Irreducible).ofMonkhorstPack(4),
+    )
+    def run():
+        for _ in range(10000):
+            DataSet()._append(what)
+    return run
+
+
+@scenario("append[10000 datasets]")
+def _():
+    e = EnergyCutoff(10.0)
+    def run():
+        sets = [DataSet(MaxSteps(20)) for _ in range(10000)]
+        append(e, sets)
+    return run
+
+
+@scenario("parseAbi[1000 datasets]")
+def _():
+    sets = [DataSet(EnergyCutoff(8.0 + i*0.01), MaxSteps(10 + i%5)) for i in range(1000)]
+    text = createAbi(_base(), *sets, series=False)
+    return lambda: parseAbi(text)
+
+
+def measure(make: Callable[[], Callable[[], object]], repeat: int):
+    fn = make()
+    fn() # warm-up
+    best = float("inf")
+    # as in timeit, collections of earlier garbage must not land in the timed runs
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            t = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - t)
+    finally:
+        gc.enable()
+    fn = make()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return { "time": best, "memory": peak }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks of the input generation")
+    parser.add_argument("-k", dest="filter", default="", help="run only scenarios whose name contains this string")
+    parser.add_argument("--repeat", type=int, default=5, help="number of timed runs (the best is kept)")
+    parser.add_argument("--threshold", type=float, default=0.25, help="relative regression that makes the run fail")
+    parser.add_argument("--save", action="store_true", help="store the results as baseline")
+    parser.add_argument("--baseline", default=BASELINE, help="path of the baseline file")
+    args = parser.parse_args()
+
+    baseline: dict = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as fp:
+            baseline = json.load(fp)
+
+    results: dict = {}
+    failed: list[str] = []
+    print(f"{'scenario':<36} {'time [ms]':>12} {'memory [MB]':>12}  change")
+    for name, make in _scenarios.items():
+        if args.filter not in name:
+            continue
+        r = results[name] = measure(make, args.repeat)
+        change = ""
+        b = baseline.get(name)
+        if b is not None:
+            dt = r["time"]/b["time"] - 1
+            dm = r["memory"]/b["memory"] - 1 if b["memory"] else 0.0
+            change = f"{dt:+.0%} time, {dm:+.0%} memory"
+            if dt > args.threshold or dm > args.threshold:
+                failed.append(name)
+                change += "  REGRESSION"
+        print(f"{name:<36} {r['time']*1e3:>12.2f} {r['memory']/2**20:>12.2f}  {change}")
+
+    if args.save:
+        with open(args.baseline, 'w') as fp:
+            json.dump({ **baseline, **results }, fp, indent=1)
+        print(f"Baseline saved to {args.baseline}")
+    elif len(failed) > 0:
+        print(f"{len(failed)} scenario(s) regressed beyond {args.threshold:.0%}: " + ', '.join(failed))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
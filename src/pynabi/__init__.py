@@ -1,2 +1,11 @@
 from ._common import *
-from ._dataset import *
\ No newline at end of file
+from ._dataset import *
+from ._profiler import *
+from ._cache import *
+from ._campaign import *
+from ._runner import *
+from ._split import *
+from ._reader import *
+from ._pseudo import *
+from ._cost import *
+from ._convergence import *
\ No newline at end of file
@@ -0,0 +1,75 @@
+from typing import Optional, Any
+import hashlib
+import json
+import os
+
+
+__all__ = ["digest", "InputCache"]
+
+
+def digest(text: str) -> str:
+    """Content hash (SHA-256) of an input file.
+
+    Rendering is deterministic (atom species are numbered in order of first appearance), so datasets defined in the same way always have the same digest"""
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def _atomic_write(path: str, text: str):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w') as fp:
+        fp.write(text)
+    os.replace(tmp, path)
+
+
+class InputCache:
+    """Content-addressed store of input files: each input is kept in `<directory>/<digest[:2]>/<digest>/` together with the record of its run, once completed.
+
+    ## Example
+    ```python
+    cache = InputCache("./cache")
+    key = cache.store(createAbi(base, *sets))
+    if not cache.isDone(key):
+        ... # run Abinit on cache.input(key)
+        cache.markDone(key, etotal=-8.86)
+    ```"""
+
+    def __init__(self, directory: str, filename: str = "run.abi") -> None:
+        self.directory = directory
+        self.filename = filename
+
+    def path(self, key: str):
+        """Directory of the input with the given digest"""
+        return os.path.join(self.directory, key[:2], key)
+
+    def input(self, key: str):
+        """Path of the input file with the given digest"""
+        return os.path.join(self.path(key), self.filename)
+
+    def __contains__(self, key: str):
+        return os.path.isfile(self.input(key))
+
+    def store(self, text: str) -> str:
+        """Stores the input file (unless already present) and returns its digest"""
+        key = digest(text)
+        f = self.input(key)
+        if not os.path.isfile(f):
+            os.makedirs(os.path.dirname(f), exist_ok=True)
+            _atomic_write(f, text)
+        return key
+
+    def isDone(self, key: str):
+        """Whether the run of the input with the given digest has been marked as completed"""
+        return os.path.isfile(os.path.join(self.path(key), "done.json"))
+
+    def markDone(self, key: str, **info: Any):
+        """Marks the run of the input with the given digest as completed, recording the JSON-serializable `info`"""
+        assert key in self, f"No input with digest {key} in the cache"
+        _atomic_write(os.path.join(self.path(key), "done.json"), json.dumps(info))
+
+    def result(self, key: str) -> Optional[dict[str, Any]]:
+        """Information recorded when the run of the input with the given digest was completed (None if not completed)"""
+        try:
+            with open(os.path.join(self.path(key), "done.json")) as fp:
+                return json.load(fp)
+        except FileNotFoundError:
+            return None
@@ -0,0 +1,187 @@
+from typing import Union, Sequence, Mapping, Optional, Iterable
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing as mp
+import json
+import os
+import re
+from ._dataset import DataSet, createAbi, splat, _RS
+from .crystal import AtomBasis
+from ._cache import InputCache, digest
+
+
+__all__ = ["Campaign"]
+
+
+_Axis = Union[Sequence[_RS], Mapping[str, _RS]]
+
+
+def _parse_axis(name: str, values: _Axis):
+    if isinstance(values, Mapping):
+        res = [(str(k), v) for k,v in values.items()]
+    else:
+        res = [(str(i), v) for i,v in enumerate(values)]
+    assert len(res) > 0, f"Axis {name} of the campaign must have at least one value"
+    return res
+
+
+_unsafe = re.compile(r"[^\w.+-]")
+
+
+def _variables(value: _RS) -> dict[str,str]:
+    """Input variables (with their values) written by the stampable(s) of an axis value"""
+    res: dict[str,str] = {}
+    for s in splat((value,)):
+        text = s.render(0, tuple(s.species)) if type(s) is AtomBasis else s.render(0)
+        for l in text.split('\n'):
+            k, _, v = l.partition(' ')
+            if k:
+                res[k] = v
+    return res
+
+
+class Campaign:
+    """High-throughput generation of independent input files: each file combines the base dataset with one value per axis.
+
+    Axes added with `product` are combined in a cartesian product, while axes added together with `zip` advance together.
+
+    ## Example
+    ```python
+    c = (Campaign(base)
+        .product(material={ "NaCl": RockSaltLike(Na, Cl, 5.64*Ang), "KCl": RockSaltLike(K, Cl, 6.29*Ang) })
+        .product(ecut=[EnergyCutoff(e) for e in (10.0, 15.0, 20.0)])
+        .zip(
+            kgrid=[SymmetricGrid(BZ.Irreducible, UsualKShifts.FCC).ofMonkhorstPack(n) for n in (4,6,8)],
+            smearing=[Metal(Smearing.Gaussian, broadening=b) for b in (0.02, 0.01, 0.005)]
+        ))
+    c.generate("./screening") # 2*3*3 = 18 files + manifest.json
+    ```"""
+
+    def __init__(self, base: DataSet, *datasets: DataSet, filename: str = "run.abi") -> None:
+        """Values of the axes are added to the common `base` dataset; `datasets` (if any) are the numbered datasets of every file"""
+        assert type(base) is DataSet, "Base of a campaign must be a DataSet"
+        self.base = base
+        self.datasets = datasets
+        self.filename = filename
+        self._g: list[tuple[tuple[str,...], list[list[tuple[str,_RS]]]]] = []
+
+    def _names(self):
+        return [n for g in self._g for n in g[0]]
+
+    def product(self, **axes: _Axis):
+        """Adds axes, each of them combined with all the other ones"""
+        names = self._names()
+        for name, values in axes.items():
+            assert name not in names, f"Axis {name} defined multiple times"
+            self._g.append(((name,), [[v] for v in _parse_axis(name, values)]))
+        return self
+
+    def zip(self, **axes: _Axis):
+        """Adds axes that advance together: they must have the same length"""
+        names = self._names()
+        assert len(axes) > 0, "At least one axis must be given"
+        parsed = []
+        for name, values in axes.items():
+            assert name not in names, f"Axis {name} defined multiple times"
+            parsed.append(_parse_axis(name, values))
+        n = len(parsed[0])
+        assert all(len(p) == n for p in parsed), "Zipped axes must have the same number of values"
+        self._g.append((tuple(axes.keys()), [list(v) for v in zip(*parsed)]))
+        return self
+
+    def __len__(self):
+        n = 1
+        for g in self._g:
+            n *= len(g[1])
+        return n
+
+    def _pick(self, index: int):
+        """Values of the axes (as tuples of name, label and value) of the `index`-th combination"""
+        picked: list[list[tuple[str,str,_RS]]] = []
+        for names, values in reversed(self._g):
+            index, i = divmod(index, len(values))
+            picked.append([(n, l, v) for n, (l, v) in zip(names, values[i])])
+        return [p for g in reversed(picked) for p in g]
+
+    def parameters(self, index: int) -> dict[str,str]:
+        """Labels of the axes of the `index`-th combination (keys of mapping axes, positions in sequence ones), as used in its path"""
+        return { n: l for n,l,_ in self._pick(index) }
+
+    def values(self, index: int) -> dict[str,dict[str,str]]:
+        """Input variables written by the value of each axis of the `index`-th combination"""
+        return { n: _variables(v) for n,_,v in self._pick(index) }
+
+    def path(self, index: int):
+        """Relative path of the file of the `index`-th combination"""
+        parts = [_unsafe.sub('_', f"{n}-{l}") for n,l,_ in self._pick(index)]
+        return os.path.join(*parts, self.filename)
+
+    def render(self, index: int):
+        """Input file of the `index`-th combination"""
+        b = self.base
+        d = DataSet(() if b.atoms is None else b.atoms, b.stamps, [v for _,_,v in self._pick(index)])
+        return createAbi(d, *self.datasets)
+
+    def _write(self, directory: str, indexes: Iterable[int], previous: dict[str,str], cache: Optional[InputCache]):
+        res = []
+        for i in indexes:
+            p = self.path(i)
+            f = os.path.join(directory, p)
+            text = self.render(i)
+            key = digest(text)
+            if previous.get(p) != key or not os.path.isfile(f):
+                os.makedirs(os.path.dirname(f), exist_ok=True)
+                with open(f, 'w') as fp:
+                    fp.write(text)
+            entry = { "file": p, "parameters": self.parameters(i), "values": self.values(i), "digest": key }
+            if cache is not None:
+                cache.store(text)
+                entry["done"] = cache.isDone(key)
+            res.append(entry)
+        return res
+
+    def generate(self, directory: str, workers: Optional[int] = None, chunksize: int = 64, manifest: str = "manifest.json", cache: Optional[InputCache] = None):
+        """Writes all the combinations in `directory` using a pool of `workers` processes (all cores if None, no pool if 1), and the `manifest` that maps each file to its parameters
+        (the labels of `parameters` and the input variables of `values`) and content digest. Returns the entries of the manifest.
+
+        Files whose digest matches the one in the existing manifest are not rewritten. If a `cache` is given, inputs are also stored in it and each entry tells whether its run is already `done`.
+
+        Workers are forked (where possible) so that stampables do not need to be picklable: only the indexes of the combinations are sent to them."""
+        n = len(self)
+        if workers is None:
+            workers = os.cpu_count() or 1
+        previous = _digests(os.path.join(directory, manifest))
+        if workers == 1 or n <= chunksize:
+            runs = self._write(directory, range(n), previous, cache)
+        else:
+            ctx = mp.get_context("fork") if "fork" in mp.get_all_start_methods() else None
+            chunks = (range(i, min(i+chunksize, n)) for i in range(0, n, chunksize))
+            runs = []
+            with ProcessPoolExecutor(workers, ctx, _init_worker, (self, directory, previous, cache)) as pool:
+                for r in pool.map(_worker, chunks):
+                    runs.extend(r)
+        with open(os.path.join(directory, manifest), 'w') as fp:
+            json.dump({ "axes": self._names(), "runs": runs }, fp, indent=1)
+        return runs
+
+
+def _digests(manifest: str) -> dict[str,str]:
+    """Digest of each file of an existing manifest"""
+    try:
+        with open(manifest) as fp:
+            return { r["file"]: r["digest"] for r in json.load(fp)["runs"] if "digest" in r }
+    except (FileNotFoundError, ValueError, KeyError, TypeError):
+        return {}
+
+
+_campaign: Optional[tuple[Campaign, str, dict[str,str], Optional[InputCache]]] = None
+
+
+def _init_worker(campaign: Campaign, directory: str, previous: dict[str,str], cache: Optional[InputCache]):
+    global _campaign
+    _campaign = (campaign, directory, previous, cache)
+
+
+def _worker(indexes: range):
+    assert _campaign is not None
+    c, directory, previous, cache = _campaign
+    return c._write(directory, indexes, previous, cache)
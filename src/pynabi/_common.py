@@ -1,7 +1,8 @@
-from typing import TypeVar, Type, Tuple, Callable, Any, TypeGuard
+from typing import TypeVar, Type, Tuple, Callable, Any, TypeGuard, Iterable, Optional, Sequence
+import numpy as np
 
 
-__all__ = ["Vec3D"]
+__all__ = ["Vec3D", "ArrayFormat"]
 
 
 class Singleton(object):
@@ -34,6 +35,71 @@ class Vec3D:
         return Vec3D(0,0,0)
 
  
+class ArrayFormat:
+    """Options to format the arrays (positions, k points, occupations, ...) written in the input file"""
+    _p: Optional[int] = None
+    _c = True
+    _gen = 0
+
+    @staticmethod
+    def setPrecision(digits: Optional[int]):
+        """Floats are written with `digits` significant digits. If None (default), the shortest representation that round-trips is used"""
+        assert digits is None or (type(digits) is int and 0 < digits <= 17), "Number of significant digits must be None or an integer between 1 and 17"
+        ArrayFormat._p = digits
+        ArrayFormat._gen += 1
+
+    @staticmethod
+    def setCompression(enabled: bool):
+        """If enabled (default), consecutive repeated values are written using Abinit syntax `n*value` when shorter"""
+        ArrayFormat._c = bool(enabled)
+        ArrayFormat._gen += 1
+
+
+def _token(v) -> str:
+    return str(v) if ArrayFormat._p is None or type(v) is not float else f"%.{ArrayFormat._p}g" % v
+
+
+def formatArray(values: Iterable[int|float]|np.ndarray, row: int = 0) -> str:
+    """Formats numbers (ndarrays are flattened) as in input files. If `row` is given, larger spaces separate groups of `row` values (e.g. vectors) and repeats are only compressed inside a group"""
+    flat = values.ravel() if isinstance(values, np.ndarray) else np.array(list(values), dtype=object)
+    n = len(flat)
+    if n == 0:
+        return ''
+    # runs of repeated values (within a single group of `row` values, so that each vector stays readable)
+    if ArrayFormat._c:
+        brk = np.concatenate(((True,), flat[1:] != flat[:-1]))
+        if row:
+            brk[::row] = True
+        starts = np.flatnonzero(brk)
+    else:
+        starts = np.arange(n)
+    counts = np.diff(np.append(starts, n))
+    tokens = list(map(_token, flat[starts].tolist()))
+    reps = np.ones(len(starts), dtype=np.intp)
+    for i in np.flatnonzero(counts > 1).tolist():
+        c = int(counts[i])
+        t = tokens[i]
+        if len(t)*c + c-1 > len(t) + len(str(c)) + 1:
+            tokens[i] = f"{c}*{t}"
+        else:
+            reps[i] = c
+    if len(tokens) < reps.sum():
+        idx = np.repeat(np.arange(len(starts)), reps)
+        offset = np.arange(len(idx)) - np.repeat(np.cumsum(reps) - reps, reps)
+        pos = starts[idx] + offset
+        tokens = [tokens[i] for i in idx.tolist()]
+    else:
+        pos = starts
+    if not row:
+        return ' '.join(tokens)
+    cuts = [0, *(np.flatnonzero(pos[1:] % row == 0) + 1).tolist(), len(tokens)]
+    return '   '.join(' '.join(tokens[a:b]) for a,b in zip(cuts, cuts[1:]))
+
+
+def formatVectors(vectors: Sequence['Vec3D']) -> str:
+    return formatArray((c for v in vectors for c in (v.x, v.y, v.z)), 3)
+
+
 S = TypeVar("S", bound="Stampable")
 
 class StampCollection:
@@ -51,10 +117,47 @@ class StampCollection:
         return t in self._s
 
 
+_SLOT = "\x00"
+
+
+class _Suffix(int):
+    """Fake dataset index which is printed as a placeholder: used to render templates independent of the index"""
+    def __format__(self, spec: str) -> str:
+        return _SLOT
+    
+    def __str__(self) -> str:
+        return _SLOT
+    
+    __repr__ = __str__
+
+
+_SUFFIX = _Suffix(2**31-1)
+
+
 class Stampable:
+    _cacheable = True
+    """Whether the output of stamp depends only on the stampable itself (and the dataset index)"""
+    _rev = 0
+    """Number of modifications, used to invalidate the validation of the datasets containing the stampable"""
+
     def stamp(self, index: int):
         raise NotImplementedError(f"{type(self).__name__} has not implemented stamp")
     
+    def render(self, index: int, *args) -> str:
+        """Same as `stamp`, but the output is rendered once as a template independent of the index and then cached until `invalidate` is called"""
+        if not self._cacheable:
+            return self.stamp(index, *args) # type: ignore
+        c = self.__dict__.get("_rc")
+        if c is None or c[0] != ArrayFormat._gen or c[1] != args:
+            c = self.__dict__["_rc"] = (ArrayFormat._gen, args, self.stamp(_SUFFIX, *args)) # type: ignore
+        return c[2].replace(_SLOT, str(index) if index else '')
+    
+    def invalidate(self):
+        """Drops the cached output of `render` and the validation of the datasets containing the stampable.
+        Called by the methods that modify the stampable: needed only after modifying its attributes directly (e.g. the arrays held by an `AtomBasis`)"""
+        self.__dict__.pop("_rc", None)
+        self._rev += 1
+    
     def compatible(self, coll: 'StampCollection'):
         pass
     
@@ -165,7 +268,9 @@ def sectionTitle(index: int, name: str):
 def decorate_IWD_method(fn):
     def method(self: 'IndexedWithDefault', *args):
         assert self._index is None, f"Multiple definitions for {type(self).__name__}"
-        return fn(self, *args)
+        res = fn(self, *args)
+        self.invalidate()
+        return res
     return method
 
 
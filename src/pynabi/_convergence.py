@@ -0,0 +1,139 @@
+from typing import Any, Callable, Optional, Sequence, Union
+import numpy as np
+from ._dataset import DataSet, _RS
+from .calculation import EnergyCutoff
+from .calculation.internal import Tolerance
+from .kspace import SymmetricGrid, BrillouinZone, UsualKShifts
+from .output import parseAbo, TotalEnergy
+from .units.internal import Energy
+
+
+__all__ = ["Convergence"]
+
+
+def _hartree(tolerance: Union[float, Energy, Tolerance]) -> float:
+    if isinstance(tolerance, Tolerance):
+        assert tolerance.suffix == "dfe", "Only a tolerance on the energy difference can be used as convergence criterion"
+        return float(tolerance.value)
+    if isinstance(tolerance, Energy):
+        return tolerance._v * Energy._U[tolerance._u][0] / Energy._U[0][0]
+    return float(tolerance)
+
+
+def _python(v: Any) -> Any:
+    """NumPy scalars (and arrays, e.g. rows of grid sizes) as Python numbers (and tuples), which the stampables expect"""
+    if isinstance(v, np.generic):
+        return v.item()
+    if isinstance(v, np.ndarray) or (isinstance(v, (tuple, list)) and any(isinstance(x, np.generic) for x in v)):
+        return tuple(np.asarray(v).tolist())
+    return v
+
+
+class Convergence:
+    """Plans a convergence study of one parameter (e.g. `EnergyCutoff` or the size of a Monkhorst-Pack grid) in rounds of datasets, instead of sweeping all the values at once.
+
+    `values` are the candidate values, in order of increasing accuracy (the last one being the reference), and `make` builds the stampable(s) of the dataset of a value.
+    The first round computes `coarse` values evenly spread over the candidates (the first and the last one included); each following round computes `refine` values
+    (1 for a bisection) between the largest value that is not converged and the smallest one that is, until they are adjacent.
+    A value is converged when its total energy, and the one of all the larger computed values, differ from the reference by at most `tolerance`
+    (Ha, an `Energy` or `ToleranceOn.EnergyDifference`).
+
+    ## Example
+    ```python
+    study = Convergence.ofCutoff(np.arange(8.0, 12.25, 0.25), 1e-3)
+    while len(sets := study.next()) > 0:
+        with open("conv.abi", 'w') as f:
+            f.write(createAbi(base, *sets))
+        subprocess.run(["abinit", "conv.abi"])
+        study.read("conv.abo")
+    print(study.converged)
+    ```"""
+
+    def __init__(self, make: Callable[[Any], _RS], values: Sequence[Any], tolerance: Union[float, Energy, Tolerance], coarse: int = 4, refine: int = 1) -> None:
+        assert len(values) > 0, "At least one value must be given"
+        assert coarse >= 2 and refine >= 1, "There must be at least two coarse values and one value per round"
+        self.make = make
+        self.values = list(values)
+        self.tolerance = _hartree(tolerance)
+        assert self.tolerance > 0, "Tolerance must be positive"
+        self.coarse = coarse
+        self.refine = refine
+        self.rounds = 0
+        self._e: dict[int, float] = {}
+        self._pending: list[tuple[int, DataSet]] = []
+        self._bounds: Optional[tuple[int, int]] = None
+
+    @staticmethod
+    def ofCutoff(values: Sequence[Union[float, Energy]], tolerance: Union[float, Energy, Tolerance], coarse: int = 4, refine: int = 1):
+        """Convergence with respect to the `EnergyCutoff`"""
+        return Convergence(EnergyCutoff, [_python(v) for v in values], tolerance, coarse, refine)
+
+    @staticmethod
+    def ofGrid(sizes: Sequence[Union[int, tuple[int,int,int]]], tolerance: Union[float, Energy, Tolerance], symmetry: BrillouinZone = BrillouinZone.Irreducible,
+               shifts: Union[tuple, UsualKShifts] = UsualKShifts.Default, coarse: int = 4, refine: int = 1):
+        """Convergence with respect to the number of points (`ngkpt`) of a Monkhorst-Pack grid"""
+        return Convergence(lambda n: SymmetricGrid(symmetry, shifts).ofMonkhorstPack(n), [_python(v) for v in sizes], tolerance, coarse, refine)
+
+    def _positions(self) -> list[int]:
+        """Positions of the values of the next round"""
+        n = len(self.values)
+        if len(self._e) == 0:
+            return np.unique(np.rint(np.linspace(0, n - 1, min(self.coarse, n)))).astype(int).tolist()
+        done = sorted(self._e)
+        ref = self._e[done[-1]]
+        first = len(done) - 1
+        while first > 0 and abs(self._e[done[first-1]] - ref) <= self.tolerance:
+            first -= 1
+        if first == 0:
+            # every value computed so far is converged: the smaller ones (if any) are to be checked
+            lo, hi = -1, done[0]
+        else:
+            lo, hi = done[first-1], done[first]
+        self._bounds = (lo, hi)
+        if hi - lo <= 1:
+            return []
+        return np.unique(np.rint(np.linspace(lo, hi, min(self.refine, hi - lo - 1) + 2)[1:-1])).astype(int).tolist()
+
+    def next(self) -> list[DataSet]:
+        """Datasets of the next round (to be written, e.g. by `createAbi`, run, and then `read`), empty once the study is completed"""
+        assert len(self._pending) == 0, "The energies of the previous round must be read first"
+        positions = [p for p in self._positions() if p not in self._e]
+        self._pending = [(p, DataSet(self.make(self.values[p]))) for p in positions]
+        if len(positions) > 0:
+            self.rounds += 1
+        return [d for _,d in self._pending]
+
+    def record(self, dataset: DataSet, energy: float):
+        """Sets the total energy (Ha) of a dataset of the current round"""
+        for i, (p, d) in enumerate(self._pending):
+            if d is dataset:
+                self._e[p] = energy
+                del self._pending[i]
+                return
+        raise ValueError("The dataset is not part of the current round")
+
+    def read(self, path: str):
+        """Reads the total energies of the datasets of the current round from the main output file at `path` (datasets are identified by the index given by `createAbi`)"""
+        energies: dict[int, float] = {}
+        for r in parseAbo(path, TotalEnergy):
+            energies[r.dataset] = r.etotal # type: ignore
+        for _, d in list(self._pending):
+            if d.index in energies:
+                self.record(d, energies[d.index])
+        assert len(self._pending) == 0, f"Energy of datasets {', '.join(str(d.index) for _,d in self._pending)} not found in {path}"
+
+    @property
+    def energies(self) -> list[tuple[Any, float]]:
+        """Computed values with their total energy (Ha), in the order of the candidates"""
+        return [(self.values[p], self._e[p]) for p in sorted(self._e)]
+
+    @property
+    def done(self):
+        return len(self._pending) == 0 and len(self._e) > 0 and len(self._positions()) == 0
+
+    @property
+    def converged(self) -> Any:
+        """Smallest converged value, None while the study is not completed"""
+        if not self.done:
+            return None
+        return self.values[self._bounds[1]] # type: ignore
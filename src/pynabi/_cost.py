@@ -0,0 +1,155 @@
+from typing import NamedTuple, Optional, Type
+import numpy as np
+from ._common import Stampable, CanDelay, Delayed, Later
+from ._dataset import DataSet
+from ._pseudo import PseudoIndex
+from .crystal import Lattice
+from .calculation import EnergyCutoff, MaxSteps, NonSelfConsistentCalc
+from .kspace import SymmetricGrid, ManualGrid, AutomaticGrid, Path, BrillouinZone
+from .occupation import Metal, Semiconductor, TwoQuasiFermilevels, OccupationPerBand, SpinType
+from .occupation.internal import SpinPolarization
+from .units.internal import Energy
+
+
+__all__ = ["CostEstimate", "estimate"]
+
+
+class CostEstimate(NamedTuple):
+    """Estimated size and cost of the calculation of a dataset"""
+    planeWaves: int
+    """Number of plane waves per k-point"""
+    kPoints: int
+    """Number of k-points (without the reduction by the symmetries of the crystal, which is not known in advance)"""
+    bands: int
+    fftGrid: tuple[int, int, int]
+    """Size of the FFT grid (of the density)"""
+    memory: float
+    """Memory per rank (bytes) of wavefunctions and real-space arrays"""
+    cost: float
+    """Relative time cost: the number of floating point operations of the SCF (or non-SCF) cycle, up to a constant factor"""
+
+
+_noble = (0, 2, 10, 18, 36, 54, 86, 118)
+
+
+def _nominal_valence(z: int):
+    """Electrons outside the last closed noble gas shell: a rough guess of the valence when the pseudopotentials are not known"""
+    core = max(n for n in _noble if n < z)
+    return z - core
+
+
+class _Finder:
+    def __init__(self, dataset: DataSet, base: Optional[DataSet]) -> None:
+        self.sets = (dataset,) if base is None else (dataset, base)
+
+    def get(self, t: Type[Stampable]):
+        for d in self.sets:
+            s = d.map.get(t)
+            if s is not None:
+                return s
+        return None
+
+    def delayable(self, t: Type[CanDelay], index: int):
+        """Value of a delayable of `t`, given either by its stampable or by a `Delayed`"""
+        c = self.get(t)
+        if c is None:
+            return None
+        v = c._dv[index]
+        if v is not Later._instance:
+            return v
+        for d in self.sets:
+            for s in d.stamps:
+                if isinstance(s, Delayed) and s.c is t and s.i == index:
+                    return s.v
+        return None
+
+
+def _kpoints(f: _Finder, cell: np.ndarray):
+    g = f.get(SymmetricGrid)
+    if isinstance(g, SymmetricGrid):
+        if g.type == 0:
+            n = f.delayable(SymmetricGrid, 0)
+            full = 1 if n is None else int(np.prod(n))
+        else:
+            v = f.delayable(SymmetricGrid, 1)
+            full = 1 if v is None else abs(round(np.linalg.det([(a.x, a.y, a.z) for a in v])))
+        full *= max(len(g.shi), 1)
+        return max(full // 2, 1) if g.sym is BrillouinZone.Half else full
+    g = f.get(ManualGrid)
+    if isinstance(g, ManualGrid):
+        return len(g.p)
+    g = f.get(AutomaticGrid)
+    if isinstance(g, AutomaticGrid):
+        return int(np.prod(np.ceil(g.len / np.linalg.norm(cell, axis=1))))
+    g = f.get(Path)
+    if isinstance(g, Path):
+        return sum(g.divisions(f.get(Lattice))) + 1 # type: ignore
+    return 1 # Gamma point only
+
+
+def _bands(f: _Finder, electrons: float, spin: SpinPolarization):
+    for t in (Metal, Semiconductor, TwoQuasiFermilevels):
+        if f.get(t) is not None:
+            n = f.delayable(t, 0) # type: ignore
+            if n is not None:
+                return int(n)
+            occupied = int(np.ceil(electrons / (3 - spin.spinorNumber)))
+            return max(int(np.ceil(1.2*occupied)), occupied + 4) if t is Metal else occupied
+    o = f.get(OccupationPerBand)
+    if isinstance(o, OccupationPerBand):
+        return o._r or len(o._o)
+    return int(np.ceil(electrons / (3 - spin.spinorNumber)))
+
+
+def estimate(dataset: DataSet, base: Optional[DataSet] = None, pseudos: Optional[PseudoIndex] = None, ranks: int = 1) -> CostEstimate:
+    """Estimates the size, memory and time cost of the calculation of `dataset` (using the stampables of `base` it does not define), before running it:
+     - plane waves from `EnergyCutoff` and the cell volume (`Lattice`)
+     - k-points from `SymmetricGrid`, `ManualGrid`, `AutomaticGrid` or `Path`, times the spin polarizations
+     - bands from the occupation stampables or, if not given, from the valence electrons (read from the pseudopotentials if `pseudos` is given, otherwise guessed)
+     - memory per rank when k-points are distributed over `ranks` processes
+
+    Estimates are meant to compare and sort inputs, not to predict absolute figures.
+
+    ## Example
+    ```python
+    costs = [estimate(d, base) for d in sets]
+    heavy = [d for d,c in zip(sets, costs) if c.memory > 4e9]
+    ```"""
+    assert type(ranks) is int and ranks > 0, "Number of ranks must be a positive integer"
+    f = _Finder(dataset, base)
+    lattice = f.get(Lattice)
+    assert isinstance(lattice, Lattice), "A Lattice is needed to estimate the cost of a dataset"
+    ecut = f.get(EnergyCutoff)
+    assert isinstance(ecut, EnergyCutoff), "An EnergyCutoff is needed to estimate the cost of a dataset"
+    atoms = dataset.atoms if dataset.atoms is not None or base is None else base.atoms
+    assert atoms is not None, "An atom basis is needed to estimate the cost of a dataset"
+    spin: SpinPolarization = f.get(SpinPolarization) or SpinType.Unpolarized # type: ignore
+
+    cell = lattice.primitiveVectors()
+    volume = abs(np.linalg.det(cell))
+    e = ecut.energy._v * Energy._U[ecut.energy._u][0] / Energy._U[0][0] # Ha
+    gmax = np.sqrt(2*e)
+    npw = int(volume * gmax**3 / (6*np.pi**2))
+    # the FFT box must contain the sphere of radius 2*gmax (the density): |G.a_i|/2pi <= 2*gmax*|a_i|/2pi on both sides
+    ngfft = tuple(int(np.ceil(2*gmax*np.linalg.norm(a)/np.pi)) for a in cell)
+    nfft = int(np.prod(ngfft))
+
+    if pseudos is not None:
+        electrons = pseudos.electrons(dataset, base)
+    else:
+        zval = np.array([_nominal_valence(a.num) for a in atoms.species])
+        electrons = float(np.bincount(atoms.types, minlength=len(zval)) @ zval)
+    nband = _bands(f, electrons, spin)
+    nkpt = _kpoints(f, cell) * spin.polarizationNumber
+    perRank = int(np.ceil(nkpt / ranks))
+
+    # complex wavefunctions (and as many work arrays) and about ten real-space arrays per density component
+    memory = 2 * 16.0 * npw * spin.spinorNumber * nband * perRank + 10 * 8.0 * nfft * spin.density
+    steps = f.get(MaxSteps)
+    nstep = int(steps.value) if isinstance(steps, MaxSteps) else 30
+    if f.get(NonSelfConsistentCalc) is not None:
+        nstep = 1 # a single (long) diagonalization per k-point
+    # per band: FFTs of the wavefunction, and orthogonalization against the other bands
+    perBand = spin.spinorNumber * (nfft * np.log2(max(nfft, 2)) + npw * nband)
+    cost = float(nstep * nkpt * nband * perBand)
+    return CostEstimate(npw, nkpt, nband, ngfft, memory, cost) # type: ignore
@@ -1,17 +1,16 @@
-from typing import Union, List, Iterable, Literal, Callable, Optional, Type, TypeVar
-from ._common import Stampable, Singleton, Delayed, StampCollection
+from typing import Union, List, Iterable, Literal, Callable, Optional, Type, TypeVar, TextIO, Collection, Sequence, Any
+from ._common import Stampable, Singleton, Delayed, StampCollection, formatArray, _SUFFIX
+from ._profiler import Profiler
+from ._series import Sweep, stampVars, templateVars
 from .crystal import AtomBasis, Atom
 from .calculation.internal import NonSelfConsistentCalc, Tolerance
 from inspect import stack
+from itertools import chain, islice
 
-from .occupation.internal import _exclusives as _ex1
-from .calculation.internal import _exclusives as _ex2
-from .kspace.internal import _exclusives as _ex3
+from ._rules import rules
 
-_excl = [_ex1, _ex2, _ex3]
 
-
-__all__ = ["DataSet", "PreviousRun", "AbIn", "AbOut", "createAbi", "append"]
+__all__ = ["DataSet", "PreviousRun", "AbIn", "AbOut", "Variables", "createAbi", "writeAbi", "append"]
 
 
 _RS = Union[Stampable,Iterable['_RS']]
@@ -23,9 +22,10 @@ def splat(i: Iterable[_RS]) -> Iterable[Stampable]:
             yield v
         else:
             try:
-                yield from splat(v)
-            except:
+                it = iter(v)
+            except TypeError:
                 raise TypeError("Arguments provided to dataset must be DataSet stampables of iterables of them")
+            yield from splat(it)
 
 
 class DataSet:
@@ -35,9 +35,15 @@ class DataSet:
         self.stamps: list[Stampable] = []
         self.map: dict[Type[Stampable], Stampable] = {}
         self.delayeds = set()
+        self._groups: dict[int, type] = {}
+        self._checks: list[Stampable] = []
+        self._version = 0
+        self._valid = None
+        self._validVersion: tuple = ()
         self._append(stampables)
             
     def _append(self, *stampables: _RS):
+        self._version += 1
         for s in splat(stampables):
             if not isinstance(s, Stampable):
                 raise TypeError(f"{s.__class__.__name__} is not a valid type for a dataset")
@@ -51,25 +57,49 @@ class DataSet:
                 t = type(s)
                 if t in self.map:
                     raise ValueError(f"Multiple {s.__class__.__name__} given")
+                g = rules.group(t)
+                if g is not None:
+                    other = self._groups.get(g)
+                    if other is not None:
+                        raise ValueError(f"{other.__name__}, {t.__name__} are mutually incompatible: please specify only one of them")
+                    self._groups[g] = t
                 self.map[t] = s
                 if t is AtomBasis:
                     self.atoms = s # type: ignore
                 else:
                     self.stamps.append(s) # type: ignore
-        s = set(self.map.keys())
-        for excl in _excl:
-            inters = s.intersection(excl)
-            if len(inters) > 1:
-                raise ValueError(', '.join(c.__name__ for c in inters) + " are mutually incompatible: please specify only one of them") 
+            if rules.requires(type(s)):
+                self._checks.append(s)
     
-    def stamp(self, atompool: List[Atom]):
+    def stamp(self, atompool: List[Atom], profiler: Optional[Profiler] = None, skip: Collection = (), extra: Iterable[Stampable] = ()):
+        """Renders the dataset, except the stampables whose key (see `_key`) is in `skip` and with the `extra` stampables"""
+        i = self.index
+        pool = tuple(atompool)
+        if profiler is None and not skip and not extra:
+            res = [s.render(i) for s in self.stamps]
+            if self.atoms is not None:
+                res.insert(0, self.atoms.render(i, pool))
+            return '\n'.join(res)
         res: list[str] = []
-        if self.atoms is not None:
-            res.append(self.atoms.stamp(self.index, atompool))
-        for s in self.stamps:
-            res.append(s.stamp(self.index))
+        for s in chain(self._all(), extra):
+            if skip and _key(s) in skip:
+                continue
+            args = (i, pool) if type(s) is AtomBasis else (i,)
+            if profiler is None:
+                res.append(s.render(*args))
+            else:
+                res.append(profiler.measure("rendering", type(s).__name__, i, s.render, *args))
         return '\n'.join(res)
     
+    def _all(self) -> Iterable[Stampable]:
+        return chain(() if self.atoms is None else (self.atoms,), self.stamps)
+
+
+def _key(s: Stampable):
+    """Identifies what a stampable defines in a dataset: the delayed property or the class"""
+    return s.d.prop if isinstance(s, Delayed) else type(s)
+
+    
 T = TypeVar("T", bound=Iterable[DataSet])
 def append(what: _RS, to: T) -> T:
     for d in to:
@@ -88,6 +118,7 @@ def _AbInMethod(prop: str, sel: Literal[0,1,2] = 0):
         else:
             assert sel < 2, f"{method._name} can only be read from a file"
         self._d[method] = value
+        self.invalidate()
         return self
     method._name = ""
     method._prop = prop
@@ -95,6 +126,8 @@ def _AbInMethod(prop: str, sel: Literal[0,1,2] = 0):
 
 
 class AbIn(Stampable):
+    _cacheable = False # depends on the index of the datasets it reads from
+
     def __init__(self, prefix: Optional[str] = None):
         self._p = prefix
         self._d: dict[Callable, Union['DataSet', str, PreviousRun]] = dict()
@@ -123,6 +156,7 @@ class AbIn(Stampable):
     
     def PseudoPotentials(self, directory_path: str):
         self._ppd = directory_path;
+        self.invalidate()
         return self
             
     FirstOrderDensity = _AbInMethod("1den")
@@ -158,6 +192,7 @@ for k,v in AbIn.__dict__.items():
 def _os(name: str):
     def method(self: 'AbOut', flag: bool = True):
         self._d[name] = int(flag)
+        self.invalidate()
         return self
     return method
 
@@ -166,6 +201,7 @@ def _om(name: str, max: int, min: int = 0):
     def method(self: 'AbOut', value: int):
         assert type(value) is int and min <= value <= max, f"Value of {stack()[0][3]} must be integer between {min} and {max}"
         self._d[name] = value
+        self.invalidate()
         return self
     return method
 
@@ -219,54 +255,290 @@ class AbOut(Stampable):
     XML = _os("xml")
 
 
-def createAbi(setup: Union[DataSet,None], *datasets: DataSet) -> str:
-    """Given one optional base dataset and multiple subsequent datasets, it constructs the abinit input file and returns it as a string"""
+class Variables(Stampable):
+    """Input variables written as they are given, for those not covered by the other stampables: values can be strings (written verbatim), numbers or sequences of numbers.
+
+    ## Example
+    ```python
+    Variables(nband=12, ecutsm="0.5 Ha", spinat=[0, 0, 1])
+    ```"""
+    def __init__(self, **variables: Union[str, int, float, Iterable[int|float]]) -> None:
+        assert len(variables) > 0, "At least one variable must be given"
+        self._v = { k: v if type(v) is str else formatArray((v,) if type(v) in (int, float) else v) for k,v in variables.items() } # type: ignore
+
+    def stamp(self, index: int):
+        s = index or ''
+        return '\n'.join(f"{k}{s} {v}" for k,v in self._v.items())
+
+
+def _revision(d: DataSet):
+    """Sum of the revisions of the stampables of a dataset, which changes whenever one of them is modified"""
+    return sum(s._rev for s in d._all())
+
+
+def _validation_key(base: Optional[DataSet]):
+    """Identifies the state against which datasets are validated (shared by all of them)"""
+    return (0, 0, 0) if base is None else (id(base), base._version, _revision(base))
+
+
+def _check_stamps(d: DataSet, base: Optional[DataSet], key: tuple, profiler: Optional[Profiler]):
+    """Calls `compatible` of the stampables with requirements, unless `d` has already been validated (against the same base) and no stampable has been modified since"""
+    if len(d._checks) == 0 or (d._validVersion == (d._version, _revision(d)) and d._valid == key):
+        return
+    coll = StampCollection(d.map, {} if base is None else base.map)
+    if profiler is None:
+        for s in d._checks:
+            s.compatible(coll)
+    else:
+        for s in d._checks:
+            profiler.measure("validation", type(s).__name__, d.index, s.compatible, coll)
+    d._valid = key
+    # after the checks, which may update the stampables
+    d._validVersion = (d._version, _revision(d))
+
+
+def _check_setup(setup: DataSet, profiler: Optional[Profiler] = None):
+    """Checks the compatibility of the base dataset and returns whether it lacks an explicit tolerance (or non SCF calculation)"""
+    _check_stamps(setup, None, _validation_key(None), profiler)
+    return setup.map.get(Tolerance) is None and setup.map.get(NonSelfConsistentCalc) is None
+
+
+def _check_dataset(d: DataSet, base: Optional[DataSet], key: tuple, no_base_tol: bool, base_atoms: bool, profiler: Optional[Profiler] = None):
+    _check_stamps(d, base, key, profiler)
+    if d.atoms is None and not base_atoms:
+        raise ValueError(f"All datasets (in particular the {d.index}-th one) must define the atom basis since no common one was defined")
+    if no_base_tol and d.map.get(Tolerance) is None and d.map.get(NonSelfConsistentCalc) is None:
+        raise ValueError("All numbered datasets without explicit Non SCF calculation must specify a Tolerance, since Abinit will implicitly assume a SFC calculation")
+
+
+def _hoistable(setup: Optional[DataSet], datasets: Sequence[DataSet], pool: tuple[Atom,...]):
+    """Stampables (by key) not defined in the base dataset that render the same in all numbered datasets"""
+    def template(s: Stampable):
+        return s.render(1, pool) if type(s) is AtomBasis else s.render(1)
+    
+    def names(s: Stampable):
+        return templateVars(s.render(_SUFFIX, pool) if type(s) is AtomBasis else s.render(_SUFFIX) if s._cacheable else s.stamp(_SUFFIX))
+    
+    base = set() if setup is None else set(map(_key, setup._all()))
+    # exclusive groups and variables already taken by the base dataset
+    groups = set() if setup is None else set(setup._groups)
+    taken = set() if setup is None else { n for s in setup._all() for n in names(s) }
+    cand: dict[Any, tuple[Stampable, str]] = {}
+    for s in datasets[0]._all():
+        k = _key(s)
+        if not s._cacheable or k in base:
+            continue
+        g = None if isinstance(s, Delayed) else rules.group(type(s))
+        if (g is not None and g in groups) or not taken.isdisjoint(names(s)):
+            continue
+        cand[k] = (s, template(s))
+    for d in datasets[1:]:
+        if len(cand) == 0:
+            break
+        present = { k: s for s in d._all() if (k := _key(s)) in cand }
+        for k, (s, t) in list(cand.items()):
+            o = present.get(k)
+            if o is None or (o is not s and template(o) != t):
+                del cand[k]
+    # a delayed property can be moved only if the stampable that can delay it is in the base dataset
+    hoisted = { k: s for k,(s,_) in cand.items() }
+    for k, s in list(hoisted.items()):
+        if isinstance(s, Delayed) and s.c not in hoisted and (setup is None or s.c not in setup.map):
+            del hoisted[k]
+    return hoisted
+
+
+def _sweep(common: str, setup: Optional[DataSet], datasets: Sequence[DataSet], hoisted: dict):
+    """Series (and double loop) analysis of the variables of the numbered datasets"""
+    base = { l.split(' ', 1)[0] for l in common.split('\n') }
+    # stampables that would clash with (or exclude) one of the base dataset
+    keys = set() if setup is None else set(map(_key, setup._all()))
+    groups = set() if setup is None else set(setup._groups)
+    n = len(datasets)
+    columns: dict[str, list[Optional[str]]] = {}
+    for i, d in enumerate(datasets):
+        for s in d._all():
+            if not s._cacheable or type(s) is AtomBasis or (hoisted and _key(s) in hoisted) or _key(s) in keys:
+                continue
+            if not isinstance(s, Delayed) and rules.group(type(s)) in groups:
+                continue
+            for var, value in stampVars(s)[0].items():
+                c = columns.get(var)
+                if c is None:
+                    c = columns[var] = [None]*n
+                if c[i] is None:
+                    c[i] = value
+    return Sweep.find(base, columns, n)
+
+
+def _covered(d: DataSet, hoisted: dict, names: set[str]):
+    """Stampables of `d` whose variables are all written by the series (to be skipped), whether other ones have only some of them and whether any is left to render"""
+    keys = set(hoisted)
+    partial = False
+    left = False
+    for s in d._all():
+        if not s._cacheable or type(s) is AtomBasis:
+            left = True
+            continue
+        tv, whole = stampVars(s)
+        if names.isdisjoint(tv) or (hoisted and _key(s) in hoisted):
+            left = left or not (hoisted and _key(s) in hoisted)
+            continue
+        if whole and names.issuperset(tv):
+            keys.add(_key(s))
+        else:
+            partial = left = True
+    return keys, partial, left
+
+
+def _drop(text: str, names: set[str], index: int):
+    names = { f"{n}{index}" for n in names }
+    return '\n'.join(l for l in text.split('\n') if l.split(' ', 1)[0] not in names)
+
+
+def createAbi(setup: Union[DataSet,None], *datasets: DataSet, profiler: Optional[Profiler] = None, hoist: bool = True, series: bool = True) -> str:
+    """Given one optional base dataset and multiple subsequent datasets, it constructs the abinit input file and returns it as a string.
+    
+    If `hoist` is True, stampables that are written identically in all numbered datasets (and not defined in the base one) are written once in the common dataset.
+
+    If `series` is True, variables of the numbered datasets are written once when possible, using the Abinit series syntax (`ecut: 10` `ecut+ 5`) for values in arithmetic or geometric progression across consecutive datasets:
+    the values of the datasets outside the progression are written explicitly (they take precedence over the series).
+    Since a series gives a value to every dataset, variables already defined by the base dataset, or missing in some datasets and having a default value, are written per dataset.
+    When some variables depend only on an outer index and others only on an inner one, datasets are arranged in a double loop (`udtset`) and numbered accordingly (11, 12, ..., 21, ...).
+
+    If a `profiler` is given, the time spent and output size of each phase, stampable and dataset are recorded in it"""
     n = len(datasets)
     if n == 1 and setup is None:
         raise ValueError("Cannot use a single dataset")
      
     res: list[str] = [f"ndtset {n}\n"]
-    atomSet = set()
-    base_coll = {} if setup is None else setup.map
+    # species in order of first appearance, so that the output does not depend on hashing
+    atomPool: list[Atom] = []
+    seen: set[Atom] = set()
 
     # check base dataset
     no_base_tol = True
     if setup is not None:
-        coll = StampCollection(setup.map, {});
-        for s in setup.stamps:
-            s.compatible(coll)
-        if setup.atoms is not None:
-            atomSet = set(setup.atoms.getAtoms())
+        setup.index = 0
+        no_base_tol = _check_setup(setup, profiler)
+        _pool_add(atomPool, seen, setup, profiler)
         # check that user sets tolerance when no SCF is specified
-        no_base_tol = setup.map.get(Tolerance) is None and setup.map.get(NonSelfConsistentCalc) is None
         if n == 0 and no_base_tol:
             raise ValueError("The dataset must specify a Tolerance, since Abinit will implictly assume a SCF calculation")
 
     # check compatibility
-    initialAtomCount = len(atomSet)
+    base_atoms = len(atomPool) > 0
+    key = _validation_key(setup)
     for (i,d) in enumerate(datasets):
         d.index = i+1
-        coll = StampCollection(d.map, base_coll)
-        for s in d.stamps:
-            s.compatible(coll)
-        if d.atoms is not None:
-            atomSet = atomSet.union(d.atoms.getAtoms())
-        elif initialAtomCount == 0:
-            raise ValueError(f"All datasets (in particular the {i+1}-th one) must define the atom basis since no common one was defined")
-    
-    # if no tolerance on base set
-    if no_base_tol:
-        for ds in datasets:
-            if ds.map.get(Tolerance) is None and ds.map.get(NonSelfConsistentCalc) is None:
-                raise ValueError("All numbered datasets without explicit Non SCF calculation must specify a Tolerance, since Abinit will implicitly assume a SFC calculation")
-
-    atomPool = list(atomSet)
-    res.append(Atom.poolstr(atomPool))
-    if setup is not None:
+        _check_dataset(d, setup, key, no_base_tol, base_atoms, profiler)
+        _pool_add(atomPool, seen, d, profiler)
+
+    res.append(Atom.poolstr(atomPool) if profiler is None else profiler.measure("rendering", "Atom", 0, Atom.poolstr, atomPool))
+    hoisted = _hoistable(setup, datasets, tuple(atomPool)) if hoist and n > 1 else {}
+    common = (setup or DataSet()).stamp(atomPool, profiler, extra=hoisted.values()) if setup is not None or len(hoisted) > 0 else None
+    if common is not None:
         res.append("\n# Common DataSet")
-        res.append(setup.stamp(atomPool))
-    for d in datasets:
-        res.append(f"\n# DataSet {d.index}")
-        res.append(d.stamp(atomPool))
+        res.append(common)
+    sweep = _sweep(common or '', setup, datasets, hoisted) if series and n > 1 else None
+    if not sweep:
+        for d in datasets:
+            text = d.stamp(atomPool, profiler, hoisted)
+            if text: # datasets entirely written by the common one need no section
+                res.append(f"\n# DataSet {d.index}")
+                res.append(text)
+        return '\n'.join(res)
+    
+    res.append("\n# Series")
+    res.append('\n'.join(sweep.lines))
+    for i, d in enumerate(datasets):
+        d.index = sweep.index(i)
+    for names, part in sweep.segments():
+        for d in islice(datasets, part.start, part.stop):
+            if len(names) == 0:
+                text = d.stamp(atomPool, profiler, hoisted)
+            else:
+                keys, partial, left = _covered(d, hoisted, names)
+                text = d.stamp(atomPool, profiler, keys) if left else ''
+                text = _drop(text, names, d.index) if partial else text
+            if text: # datasets entirely written by the series need no section
+                res.append(f"\n# DataSet {d.index}")
+                res.append(text)
     return '\n'.join(res)
+
+
+_NDTSET_WIDTH = 10
+
+
+def _pool_extend(pool: list[Atom], seen: set[Atom], atoms: AtomBasis):
+    for a in atoms.getAtoms():
+        if a not in seen:
+            seen.add(a)
+            pool.append(a)
+
+
+def _pool_add(pool: list[Atom], seen: set[Atom], d: DataSet, profiler: Optional[Profiler]):
+    if d.atoms is None:
+        return
+    if profiler is None:
+        _pool_extend(pool, seen, d.atoms)
+    else:
+        profiler.measure("atoms", "AtomBasis", d.index, _pool_extend, pool, seen, d.atoms)
+
+
+def writeAbi(fp: TextIO, setup: Union[DataSet,None], datasets: Iterable[DataSet] = (), profiler: Optional[Profiler] = None) -> int:
+    """Streaming version of `createAbi`: each dataset of `datasets` (which can be a generator) is validated and written to `fp` as soon as it is produced, so that memory usage does not grow with the size of the file. Returns the number of written (numbered) datasets.
+
+    Since the atom species are only known once all datasets have been consumed, the atoms definition is written at the end of the file (Abinit does not care about the order of variables).
+    If `fp` is seekable, `ndtset` is written at the top of the file and filled in at the end; otherwise it is written at the end too.
+    
+    `profiler` is the same as in `createAbi`"""
+    it = iter(datasets)
+    peek = list(islice(it, 2 if setup is None else 1))
+    if setup is None and len(peek) == 1:
+        raise ValueError("Cannot use a single dataset")
+    
+    atomPool: list[Atom] = []
+
+    no_base_tol = True
+    if setup is not None:
+        setup.index = 0
+        no_base_tol = _check_setup(setup, profiler)
+        if len(peek) == 0 and no_base_tol:
+            raise ValueError("The dataset must specify a Tolerance, since Abinit will implictly assume a SCF calculation")
+        if setup.atoms is not None:
+            atomPool.extend(dict.fromkeys(setup.atoms.getAtoms()))
+    base_atoms = len(atomPool) > 0
+    key = _validation_key(setup)
+    seen = set(atomPool)
+
+    head = fp.tell() if fp.seekable() else None
+    if head is not None:
+        fp.write("ndtset " + " "*_NDTSET_WIDTH)
+    if setup is not None:
+        fp.write("\n\n# Common DataSet\n")
+        fp.write(setup.stamp(atomPool, profiler))
+    
+    n = 0
+    for d in chain(peek, it):
+        n += 1
+        d.index = n
+        _check_dataset(d, setup, key, no_base_tol, base_atoms, profiler)
+        if d.atoms is not None:
+            if profiler is None:
+                _pool_extend(atomPool, seen, d.atoms)
+            else:
+                profiler.measure("atoms", "AtomBasis", n, _pool_extend, atomPool, seen, d.atoms)
+        fp.write(f"\n\n# DataSet {n}\n")
+        fp.write(d.stamp(atomPool, profiler))
     
+    fp.write("\n\n")
+    fp.write(Atom.poolstr(atomPool) if profiler is None else profiler.measure("rendering", "Atom", 0, Atom.poolstr, atomPool))
+    if head is None:
+        fp.write(f"\n\nndtset {n}")
+    else:
+        end = fp.tell()
+        fp.seek(head)
+        fp.write(f"ndtset {n:<{_NDTSET_WIDTH}}")
+        fp.seek(end)
+    return n
@@ -0,0 +1,115 @@
+from typing import Callable, Optional, Union, Any
+from time import perf_counter
+import json
+
+
+__all__ = ["Profiler"]
+
+
+_Hook = Callable[[str, str, int, float, int], Any]
+
+
+class _Entry:
+    __slots__ = ("count", "time", "size")
+
+    def __init__(self, count: int = 0, time: float = 0.0, size: int = 0) -> None:
+        self.count = count
+        self.time = time
+        self.size = size
+
+    def add(self, count: int, time: float, size: int):
+        self.count += count
+        self.time += time
+        self.size += size
+
+    def dict(self):
+        return { "count": self.count, "time": self.time, "bytes": self.size }
+
+
+class Profiler:
+    """Opt-in instrumentation of `createAbi` and `writeAbi`: it records wall time and output size of each phase (`validation`, `atoms` i.e. atom pool construction, `rendering`) per stampable class and per dataset (0 being the base one).
+
+    ## Example
+    ```python
+    p = Profiler()
+    createAbi(base, *sets, profiler=p)
+    print(p.summary())
+    with open("profile.json", 'w') as f:
+        f.write(p.toJSON())
+    ```"""
+
+    PHASES = ("validation", "atoms", "rendering")
+
+    def __init__(self, hook: Optional[_Hook] = None) -> None:
+        """`hook`, if given, is called for each record with phase, stampable class name, dataset index, seconds and output size"""
+        self.hook = hook
+        self.byClass: dict[tuple[str,str], _Entry] = {}
+        self.byDataset: dict[tuple[str,int], _Entry] = {}
+
+    def record(self, phase: str, name: str, dataset: int, seconds: float, size: int = 0):
+        e = self.byClass.get((phase, name))
+        if e is None:
+            e = self.byClass[(phase, name)] = _Entry()
+        e.add(1, seconds, size)
+        e = self.byDataset.get((phase, dataset))
+        if e is None:
+            e = self.byDataset[(phase, dataset)] = _Entry()
+        e.add(1, seconds, size)
+        if self.hook is not None:
+            self.hook(phase, name, dataset, seconds, size)
+
+    def measure(self, phase: str, name: str, dataset: int, fn: Callable, *args):
+        """Calls `fn(*args)` recording its duration (and the length of its result if it is a string)"""
+        t = perf_counter()
+        r = fn(*args)
+        self.record(phase, name, dataset, perf_counter() - t, len(r) if type(r) is str else 0)
+        return r
+
+    def phases(self):
+        """Total time and output size of each phase"""
+        res: dict[str, _Entry] = {}
+        for (phase,_), e in self.byClass.items():
+            res.setdefault(phase, _Entry()).add(e.count, e.time, e.size)
+        return res
+
+    def toDict(self):
+        return {
+            "phases": { k: e.dict() for k,e in self.phases().items() },
+            "classes": [{ "phase": p, "name": n, **e.dict() } for (p,n),e in self.byClass.items()],
+            "datasets": [{ "phase": p, "dataset": d, **e.dict() } for (p,d),e in self.byDataset.items()],
+        }
+
+    def toJSON(self, **kwargs):
+        return json.dumps(self.toDict(), **kwargs)
+
+    def merge(self, other: Union['Profiler', dict, str]):
+        """Adds the records of another profiler (or of its `toDict`/`toJSON` export), e.g. coming from another worker"""
+        if isinstance(other, Profiler):
+            other = other.toDict()
+        elif type(other) is str:
+            other = json.loads(other)
+        assert type(other) is dict, "Can only merge a Profiler or its export"
+        for c in other["classes"]:
+            self.byClass.setdefault((c["phase"], c["name"]), _Entry()).add(c["count"], c["time"], c["bytes"])
+        for d in other["datasets"]:
+            self.byDataset.setdefault((d["phase"], d["dataset"]), _Entry()).add(d["count"], d["time"], d["bytes"])
+        return self
+
+    def summary(self, datasets: int = 10):
+        """Table of the records by phase and class, followed by the `datasets` slowest datasets"""
+        order = { p: i for i,p in enumerate(Profiler.PHASES) }
+        lines = [f"{'phase':<12} {'name':<28} {'count':>8} {'time [ms]':>12} {'size [kB]':>12}"]
+        for (p,n), e in sorted(self.byClass.items(), key=lambda v: (order.get(v[0][0], len(order)), -v[1].time)):
+            lines.append(f"{p:<12} {n:<28} {e.count:>8} {e.time*1e3:>12.3f} {e.size/1e3:>12.1f}")
+        for p, e in self.phases().items():
+            lines.append(f"{p:<12} {'(total)':<28} {e.count:>8} {e.time*1e3:>12.3f} {e.size/1e3:>12.1f}")
+        totals: dict[int, _Entry] = {}
+        for (_,d), e in self.byDataset.items():
+            totals.setdefault(d, _Entry()).add(e.count, e.time, e.size)
+        slowest = sorted(totals.items(), key=lambda v: -v[1].time)[:datasets]
+        if len(slowest) > 0:
+            lines.append("")
+            lines.append(f"{'dataset':<12} {'':<28} {'count':>8} {'time [ms]':>12} {'size [kB]':>12}")
+            for d, e in slowest:
+                lines.append(f"{d:<12} {'':<28} {e.count:>8} {e.time*1e3:>12.3f} {e.size/1e3:>12.1f}")
+        return '\n'.join(lines)
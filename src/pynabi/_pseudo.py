@@ -0,0 +1,162 @@
+from typing import NamedTuple, Optional, Union
+import json
+import os
+import re
+import numpy as np
+from ._dataset import DataSet, AbIn
+from .crystal import Atom
+from .calculation import EnergyCutoff
+from .units.internal import Ha
+
+
+__all__ = ["PseudoHeader", "PseudoIndex"]
+
+
+class PseudoHeader(NamedTuple):
+    """Main information in the header of a pseudopotential file"""
+    path: str
+    format: str
+    """Either `psp8` or `upf`"""
+    Z: float
+    """Atomic number"""
+    zval: float
+    """Valence charge, i.e. number of electrons per atom"""
+    lmax: int
+    """Maximum angular momentum of the projectors"""
+    ecut: Optional[float]
+    """Suggested energy cutoff (Ha), if any"""
+
+
+_upf2 = re.compile(r"<PP_HEADER\b([^>]*)>", re.S)
+_attr = re.compile(r"(\w+)\s*=\s*\"\s*([^\"]*?)\s*\"")
+_upf1 = re.compile(r"^\s*(\S+)(?:\s+(\S+))?\s+(Element|Z valence|Max angular momentum component|Suggested cutoff for wfc and rho)\s*$", re.M)
+
+
+def _fortran(s: str):
+    return float(s.replace('d', 'e').replace('D', 'E'))
+
+
+def _z(symbol: str) -> float:
+    """Atomic number of an element symbol as written in headers (e.g. `FE` or ` Fe`)"""
+    return float(Atom(symbol.strip().capitalize()).num)
+
+
+def _djrepo(path: str) -> Optional[float]:
+    """Normal cutoff hint (Ha) of the PseudoDojo report next to the pseudopotential, if any"""
+    try:
+        with open(os.path.splitext(path)[0] + ".djrepo") as fp:
+            return float(json.load(fp)["hints"]["normal"]["ecut"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def _psp8(path: str, head: str):
+    lines = head.splitlines()
+    assert len(lines) >= 3, f"{path} is not a valid psp8 file"
+    z, zval = (_fortran(v) for v in lines[1].split()[:2])
+    pspcod, _, lmax = (int(v) for v in lines[2].split()[:3])
+    assert pspcod == 8, f"{path} is not a psp8 file (pspcod = {pspcod})"
+    return PseudoHeader(path, "psp8", z, zval, lmax, _djrepo(path))
+
+
+def _upf(path: str, head: str):
+    m = _upf2.search(head)
+    a = {} if m is None else dict(_attr.findall(m[1]))
+    if "z_valence" in a: # version 2 (version 1 has a <PP_HEADER> tag without attributes)
+        element = a.get("element", "").strip()
+        z = _z(element) if element else float("nan")
+        wfc = _fortran(a.get("wfc_cutoff", "0"))
+        ecut = wfc/2 if wfc > 0 else None # Ry -> Ha
+        return PseudoHeader(path, "upf", z, _fortran(a["z_valence"]), int(a.get("l_max", -1)), ecut or _djrepo(path))
+    fields = { m[3]: (m[1], m[2]) for m in _upf1.finditer(head) }
+    assert "Element" in fields and "Z valence" in fields, f"{path} is not a valid UPF file"
+    wfc = _fortran(fields["Suggested cutoff for wfc and rho"][0]) if "Suggested cutoff for wfc and rho" in fields else 0.0
+    lmax = int(fields["Max angular momentum component"][0]) if "Max angular momentum component" in fields else -1
+    return PseudoHeader(path, "upf", _z(fields["Element"][0]), _fortran(fields["Z valence"][0]), lmax, wfc/2 if wfc > 0 else _djrepo(path))
+
+
+def _read(path: str) -> PseudoHeader:
+    with open(path, errors="replace") as fp:
+        head = fp.read(16384)
+    if "<PP_HEADER" in head or "<UPF" in head:
+        return _upf(path, head)
+    return _psp8(path, head)
+
+
+class PseudoIndex:
+    """Index of the headers of pseudopotential files (psp8 and UPF), cached by path and modification time.
+
+    Each file is read only the first time it is needed (or after it changes); if `path` is given, the index is loaded from and saved to that JSON file,
+    so that headers are not read again by later runs.
+    Suggested cutoffs are taken from the header of UPF files, or from the PseudoDojo report (`.djrepo`) next to the file.
+
+    ## Example
+    ```python
+    index = PseudoIndex("./pseudos/index.json")
+    index.check(base)
+    electrons = index.electrons(base)
+    ecut = index.suggestedCutoff(base)
+    index.save()
+    ```"""
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        self.path = path
+        self._h: dict[str, tuple[int, int, PseudoHeader]] = {}
+        self._dirty = False
+        if path is not None and os.path.isfile(path):
+            with open(path) as fp:
+                for k, (mtime, size, h) in json.load(fp).items():
+                    self._h[k] = (mtime, size, PseudoHeader(*h))
+
+    def save(self):
+        """Writes the index to its file (if any and if it changed)"""
+        if self.path is None or not self._dirty:
+            return
+        with open(self.path, 'w') as fp:
+            json.dump({ k: (m, s, list(h)) for k,(m,s,h) in self._h.items() }, fp)
+        self._dirty = False
+
+    def header(self, path: str) -> PseudoHeader:
+        """Header of the pseudopotential file at `path` (FileNotFoundError if it does not exist)"""
+        key = os.path.abspath(path)
+        st = os.stat(key)
+        c = self._h.get(key)
+        if c is not None and c[0] == st.st_mtime_ns and c[1] == st.st_size:
+            return c[2]
+        h = _read(key)
+        self._h[key] = (st.st_mtime_ns, st.st_size, h)
+        self._dirty = True
+        return h
+
+    @staticmethod
+    def _files(dataset: DataSet, base: Optional[DataSet]):
+        """Pseudopotential paths (as Abinit resolves them through `pp_dirpath`) of the atoms of a dataset along with the basis"""
+        atoms = dataset.atoms if dataset.atoms is not None or base is None else base.atoms
+        assert atoms is not None, "The dataset has no atom basis"
+        abin: Optional[AbIn] = dataset.map.get(AbIn) or (None if base is None else base.map.get(AbIn)) # type: ignore
+        directory = None if abin is None else abin._ppd
+        return atoms, [(a, a.file if directory is None else os.path.join(directory, a.file)) for a in atoms.species]
+
+    def headers(self, dataset: DataSet, base: Optional[DataSet] = None) -> dict[Atom, PseudoHeader]:
+        """Headers of the pseudopotentials of the species of `dataset` (or of `base` if it does not define an atom basis)"""
+        return { a: self.header(p) for a,p in PseudoIndex._files(dataset, base)[1] }
+
+    def check(self, dataset: DataSet, base: Optional[DataSet] = None):
+        """Checks that the pseudopotential files of the species exist and that their atomic number is the one of the atom"""
+        for a, p in PseudoIndex._files(dataset, base)[1]:
+            if not os.path.isfile(p):
+                raise FileNotFoundError(f"Pseudopotential of {a} not found at {p}")
+            h = self.header(p)
+            if not np.isnan(h.Z) and round(h.Z) != a.num:
+                raise ValueError(f"Pseudopotential at {p} is for Z={h.Z:g}, not {a.num}")
+
+    def electrons(self, dataset: DataSet, base: Optional[DataSet] = None) -> float:
+        """Number of valence electrons of the atom basis"""
+        atoms, files = PseudoIndex._files(dataset, base)
+        zval = np.array([self.header(p).zval for _,p in files])
+        return float(np.bincount(atoms.types, minlength=len(zval)) @ zval)
+
+    def suggestedCutoff(self, dataset: DataSet, base: Optional[DataSet] = None) -> Union[EnergyCutoff, None]:
+        """Largest cutoff suggested by the pseudopotentials of the species (None if none of them has a hint)"""
+        hints = [h.ecut for h in self.headers(dataset, base).values() if h.ecut is not None]
+        return EnergyCutoff(max(hints)*Ha) if len(hints) > 0 else None
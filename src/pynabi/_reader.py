@@ -0,0 +1,357 @@
+from typing import Optional, Union, Callable, Any, Sequence
+from math import sqrt
+import re
+import numpy as np
+from ._common import Vec3D, Stampable, formatArray
+from ._dataset import DataSet, AbIn, AbOut, PreviousRun, Variables
+from .crystal import Atom, AtomBasis, Lattice, SymmetryOperations
+from .calculation import EnergyCutoff, MaxSteps, ToleranceOn, NonSelfConsistentCalc
+from .units.internal import Energy, Length, Pos3D
+
+
+__all__ = ["parseAbi", "readAbi"]
+
+
+_token = re.compile(r'"[^"]*"|[#!][^\n]*|[^\s"#!]+')
+_name = re.compile(r"([A-Za-z_][A-Za-z0-9_]*?)(\d*|\d+\?|\?\d|:\??|\+\??|\*\??|\?[:+*])$")
+_int = re.compile(r"[+-]?\d+$")
+
+_units: dict[str, tuple[type, int]] = {
+    "ha": (Energy, 0), "hartree": (Energy, 0),
+    "ev": (Energy, 1),
+    "ry": (Energy, 2), "rydberg": (Energy, 2),
+    "k": (Energy, 3), "kelvin": (Energy, 3),
+    "bohr": (Length, 0),
+    "angstrom": (Length, 1), "angstr": (Length, 1), "ang": (Length, 1),
+    "nm": (Length, 2),
+}
+
+
+def _number(t: str) -> int|float:
+    """Parses a number as written in Abinit inputs, including fractions (`1/3`), square roots (`sqrt(3)/2`) and Fortran exponents (`1.0d-3`)"""
+    if _int.match(t):
+        return int(t)
+    num, _, den = t.partition('/')
+    sign = -1.0 if num.startswith('-') else 1.0
+    num = num.lstrip('+-')
+    if num.startswith("sqrt(") and num.endswith(')'):
+        v = sqrt(float(num[5:-1].replace('d', 'e').replace('D', 'e')))
+    else:
+        v = float(num.replace('d', 'e').replace('D', 'e'))
+    return sign * v / (_number(den) if den else 1.0)
+
+
+class _Value:
+    """Value of a variable: its tokens (as written) and the optional unit"""
+    __slots__ = ("tokens", "unit")
+
+    def __init__(self, tokens: list[str], unit: Optional[tuple[type, int]] = None) -> None:
+        self.tokens = tokens
+        self.unit = unit
+
+    def numbers(self) -> list[int|float]:
+        res: list[int|float] = []
+        for t in self.tokens:
+            c, star, v = t.partition('*')
+            if star:
+                res.extend([_number(v)]*int(c))
+            else:
+                res.append(_number(t))
+        return res
+
+    def text(self):
+        u = '' if self.unit is None else f" {self.unit[0]._U[self.unit[1]][1]}"
+        return ' '.join(self.tokens) + u
+
+    def string(self):
+        return ' '.join(t.strip('"') for t in self.tokens)
+
+
+def _variables(text: str):
+    """Splits the input into (name, suffix, value) entries"""
+    res: list[tuple[str, str, _Value]] = []
+    for t in _token.findall(text):
+        if t[0] in "#!":
+            continue
+        m = _name.match(t) if t[0].isalpha() or t[0] == '_' else None
+        u = _units.get(t.lower())
+        if m is not None and u is None and not t.startswith("sqrt("):
+            res.append((m[1], m[2], _Value([])))
+        elif len(res) == 0:
+            raise ValueError(f"Value {t} given before any variable name")
+        elif u is not None:
+            res[-1][2].unit = u
+        else:
+            res[-1][2].tokens.append(t)
+    return res
+
+
+def _series(start: _Value, step: _Value, op: str, k: int) -> _Value:
+    """`k`-th (from 0) value of a series"""
+    a = start.numbers()
+    s = step.numbers()
+    assert len(a) == len(s), "Start and step of a series must have the same number of values"
+    v = [x + k*d for x,d in zip(a,s)] if op == '+' else [x * d**k for x,d in zip(a,s)]
+    return _Value([formatArray(v)], start.unit)
+
+
+def _resolve(entries: list[tuple[str, str, _Value]]):
+    """Generic variables and the variables of each dataset (by Abinit index), after expanding series and wildcards"""
+    generic: dict[str, _Value] = {}
+    special: dict[str, dict[str, _Value]] = {}
+    for name, suffix, v in entries:
+        if suffix:
+            special.setdefault(name, {})[suffix] = v
+        else:
+            generic[name] = v
+    ndtset = int(generic.pop("ndtset").numbers()[0]) if "ndtset" in generic else 0
+    udtset = generic.pop("udtset").numbers() if "udtset" in generic else None
+    if udtset is not None:
+        n1, n2 = int(udtset[0]), int(udtset[1])
+        indexes = [10*i + j for i in range(1, n1+1) for j in range(1, n2+1)]
+    elif "jdtset" in generic:
+        indexes = [int(i) for i in generic.pop("jdtset").numbers()]
+    else:
+        indexes = list(range(1, ndtset+1))
+    generic.pop("jdtset", None)
+    if ndtset == 0:
+        return generic, [], []
+
+    datasets: list[dict[str, _Value]] = []
+    for p, idx in enumerate(indexes):
+        d: dict[str, _Value] = {}
+        outer, inner = divmod(idx, 10)
+        for name, s in special.items():
+            v = s.get(str(idx))
+            if v is None and udtset is not None:
+                v = s.get(f"{outer}?") or s.get(f"?{inner}")
+                if v is None and ":?" in s:
+                    v = _series(s[":?"], s.get("+?") or s["*?"], '+' if "+?" in s else '*', outer-1)
+                elif v is None and "?:" in s:
+                    v = _series(s["?:"], s.get("?+") or s["?*"], '+' if "?+" in s else '*', inner-1)
+            if v is None and ':' in s:
+                v = _series(s[':'], s.get('+') or s['*'], '+' if '+' in s else '*', p)
+            if v is not None:
+                d[name] = v
+        datasets.append(d)
+    return generic, indexes, datasets
+
+
+def _pool(generic: dict[str, _Value]):
+    znucl = generic.pop("znucl", None)
+    ntypat = generic.pop("ntypat", None)
+    pseudos = generic.pop("pseudos", None)
+    if znucl is None:
+        return []
+    z = [int(round(v)) for v in znucl.numbers()]
+    if ntypat is not None:
+        assert int(ntypat.numbers()[0]) == len(z), "ntypat does not match the number of znucl values"
+    files: list[Optional[str]] = [None]*len(z)
+    if pseudos is not None:
+        names = [f.strip() for f in re.split(r"[,\s]+", pseudos.string()) if f.strip()]
+        assert len(names) == len(z), "Number of pseudopotentials does not match the number of atom types"
+        files = names # type: ignore
+    return [Atom(n, f) for n,f in zip(z, files)]
+
+
+def _bohr(v: _Value) -> np.ndarray:
+    x = np.array(v.numbers(), dtype=float)
+    if v.unit is not None:
+        assert v.unit[0] is Length, f"Invalid unit for a length ({v.text()})"
+        x *= Length._U[v.unit[1]][0] / Length._U[0][0]
+    return x
+
+
+def _atoms(vars: dict[str, _Value], pool: Sequence[Atom]):
+    typat = np.array(vars["typat"].numbers(), dtype=np.intp)
+    if "natom" in vars:
+        assert int(vars["natom"].numbers()[0]) == len(typat), "natom does not match the number of typat values"
+    if "xred" in vars:
+        x, cart = np.array(vars["xred"].numbers(), dtype=float), False
+    elif "xcart" in vars:
+        x, cart = _bohr(vars["xcart"]), True
+    else:
+        x, cart = np.array(vars["xangst"].numbers(), dtype=float) * Length._U[1][0] / Length._U[0][0], True
+    return AtomBasis.fromArrays(pool, typat - 1, x.reshape(-1, 3), cartesian=cart)
+
+
+def _lattice(vars: dict[str, _Value], pool: Sequence[Atom]):
+    acell = vars.get("acell")
+    if acell is None:
+        scaling = Pos3D(1, 1, 1, Length(1.0, 0))
+    else:
+        a = acell.numbers()
+        if len(a) == 1:
+            a = a*3
+        u = 0 if acell.unit is None else acell.unit[1]
+        scaling = Pos3D(*a, Length(1.0, u)) # type: ignore
+    if "angdeg" in vars:
+        return Lattice.fromAngles(Vec3D(*vars["angdeg"].numbers()), scaling) # type: ignore
+    r = vars["rprim"].numbers() if "rprim" in vars else [1,0,0, 0,1,0, 0,0,1]
+    return Lattice.fromPrimitives(Vec3D(*r[0:3]), Vec3D(*r[3:6]), Vec3D(*r[6:9]), scaling) # type: ignore
+
+
+def _symmetries(vars: dict[str, _Value], pool: Sequence[Atom]):
+    nsym = int(vars["nsym"].numbers()[0]) if "nsym" in vars else None
+    if "symrel" not in vars:
+        assert nsym is not None and nsym <= 1, "symrel must be given when nsym is larger than 1"
+        # nsym 0 (the default) lets Abinit find the symmetries, nsym 1 disables them
+        return None if nsym == 0 else SymmetryOperations(np.eye(3, dtype=np.intp)[None], np.zeros((1,3)))
+    r = np.array(vars["symrel"].numbers(), dtype=np.intp).reshape(-1,3,3).transpose(0,2,1) # column-major
+    assert nsym is None or nsym == len(r), "nsym does not match the number of symrel matrices"
+    t = np.array(vars["tnons"].numbers(), dtype=float).reshape(-1,3) if "tnons" in vars else np.zeros((len(r),3))
+    return SymmetryOperations(r, t)
+
+
+_groups: list[tuple[tuple[str,...], tuple[tuple[str,...],...], Callable[[dict[str,_Value], Sequence[Atom]], Optional[Stampable]]]] = [
+    # variables of the group, required variables (one for each tuple), builder
+    (("natom", "typat", "xred", "xcart", "xangst"), (("typat",), ("xred", "xcart", "xangst")), _atoms),
+    (("acell", "rprim", "angdeg"), (), _lattice),
+    (("nsym", "symrel", "tnons"), (), _symmetries),
+]
+
+
+def _complete(vars: dict[str, _Value], required: tuple[tuple[str,...],...]):
+    return len(vars) > 0 and all(any(n in vars for n in r) for r in required)
+
+
+_abin = { m._prop: m for m in AbIn.__dict__.values() if callable(m) and hasattr(m, "_prop") }
+_tolerances = { f"tol{t.value}": t for t in ToleranceOn }
+
+
+def _simple(name: str, v: _Value) -> Optional[Stampable]:
+    """Stampable of a variable that maps one to one to a stampable, if any"""
+    if name == "ecut":
+        e = v.numbers()[0]
+        if v.unit is None:
+            return EnergyCutoff(Energy(float(e), 0))
+        assert v.unit[0] is Energy, f"Invalid unit for ecut ({v.text()})"
+        return EnergyCutoff(Energy(float(e), v.unit[1]))
+    elif name == "nstep":
+        return MaxSteps(int(v.numbers()[0]))
+    elif name in _tolerances:
+        return _tolerances[name](float(v.numbers()[0]))
+    elif name == "iscf":
+        i = int(v.numbers()[0])
+        return NonSelfConsistentCalc(i) if -3 <= i <= -1 else None # type: ignore
+    return None
+
+
+def _io(vars: dict[str, _Value], position: int, indexes: list[int], previous: list[DataSet]):
+    """AbIn and AbOut from the variables of the files (get*, ird*, prt*, prefixes)"""
+    res: list[Stampable] = []
+    inp: Optional[AbIn] = None
+    out: Optional[AbOut] = None
+    for name in list(vars):
+        v = vars[name]
+        if name.startswith("prt") or name == "outdata_prefix":
+            if out is None:
+                out = AbOut()
+            if name == "outdata_prefix":
+                out._p = v.string()
+            else:
+                out._d[name[3:]] = int(v.numbers()[0])
+            del vars[name]
+            continue
+        if name == "indata_prefix" or name == "pp_dirpath":
+            inp = inp or AbIn()
+            if name == "indata_prefix":
+                inp._p = v.string()
+            else:
+                inp.PseudoPotentials(v.string())
+            del vars[name]
+            continue
+        if name.startswith("get") and name.endswith("_filepath"):
+            m = _abin.get(name[3:-9])
+            value: Any = v.string()
+        elif name.startswith("ird"):
+            m = _abin.get(name[3:])
+            value = PreviousRun() if int(v.numbers()[0]) != 0 else None
+        elif name.startswith("get") and position >= 0:
+            m = _abin.get(name[3:])
+            i = int(v.numbers()[0])
+            value = None
+            if i != 0:
+                target = position + i if i < 0 else (indexes.index(i) if i in indexes else -1)
+                assert 0 <= target < position, f"Dataset {indexes[position]} reads {name[3:]} from an invalid dataset ({i})"
+                value = previous[target]
+        else:
+            continue
+        if m is None:
+            continue
+        if value is not None:
+            target = inp or AbIn()
+            try:
+                m(target, value)
+            except AssertionError: # not supported by AbIn: kept as it is
+                continue
+            inp = target
+        del vars[name]
+    if inp is not None:
+        res.append(inp)
+    if out is not None:
+        res.append(out)
+    return res
+
+
+def _stampables(vars: dict[str, _Value], pool: list[Atom], position: int, indexes: list[int], previous: list[DataSet]):
+    res: list[Stampable] = _io(vars, position, indexes, previous)
+    for name in list(vars):
+        s = _simple(name, vars[name])
+        if s is not None:
+            res.append(s)
+            del vars[name]
+    if len(vars) > 0:
+        res.append(Variables(**{ k: v.text() for k,v in vars.items() }))
+    return res
+
+
+def parseAbi(text: str) -> tuple[DataSet, list[DataSet]]:
+    """Reconstructs the base dataset and the numbered datasets of an Abinit input file, so that `createAbi(base, *datasets)` regenerates an equivalent input.
+
+    Repeated values (`n*value`), dataset suffixes, series (`ecut:`/`ecut+`/`ecut*`), double loops (`udtset`) and units are supported.
+    Atoms (`znucl`, `pseudos`, `typat`, positions), lattice, symmetries (`nsym`, `symrel`, `tnons`), cutoff, number of steps, tolerances, non self-consistent calculations and file handling variables become the corresponding stampables, while any other variable is kept as it is written through `Variables`.
+    Generic `get*` variables (e.g. `getden -1`) are resolved for each numbered dataset.
+
+    ## Example
+    ```python
+    with ProcessPoolExecutor() as pool:
+        for path, (base, datasets) in zip(paths, pool.map(readAbi, paths, chunksize=32)):
+            ...
+    ```"""
+    generic, indexes, specific = _resolve(_variables(text))
+    pool = _pool(generic)
+
+    # relative references to other datasets are resolved for each numbered dataset
+    gets = { k: generic.pop(k) for k in list(generic) if k.startswith("get") and not k.endswith("_filepath") } if len(specific) > 0 else {}
+
+    built: list[list[Stampable]] = [[] for _ in range(len(specific)+1)]
+    for names, required, build in _groups:
+        common = { n: generic.pop(n) for n in names if n in generic }
+        ok = _complete(common, required)
+        if ok:
+            if (s := build(common, pool)) is not None:
+                built[0].append(s)
+        elif len(common) > 0 and len(specific) == 0:
+            raise ValueError(f"Incomplete definition of {', '.join(names)}")
+        for i, d in enumerate(specific):
+            own = { n: d.pop(n) for n in names if n in d }
+            if len(own) == 0 and (ok or len(common) == 0):
+                continue
+            merged = { **common, **own }
+            assert _complete(merged, required), f"Incomplete definition of {', '.join(names)} in dataset {indexes[i]}"
+            if (s := build(merged, pool)) is not None:
+                built[i+1].append(s)
+
+    base = DataSet(built[0], _stampables(generic, pool, -1, indexes, []))
+    datasets: list[DataSet] = []
+    for i, d in enumerate(specific):
+        vars = { **{ k: v for k,v in gets.items() if k not in d }, **d }
+        datasets.append(DataSet(built[i+1], _stampables(vars, pool, i, indexes, datasets)))
+    return base, datasets
+
+
+def readAbi(path: str) -> tuple[DataSet, list[DataSet]]:
+    """Same as `parseAbi`, reading the input from the file at `path`"""
+    with open(path) as fp:
+        return parseAbi(fp.read())
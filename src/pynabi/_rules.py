@@ -0,0 +1,35 @@
+from typing import Iterable, Optional, Type
+from ._common import Stampable
+
+from .occupation.internal import _exclusives as _ex1
+from .calculation.internal import _exclusives as _ex2
+from .kspace.internal import _exclusives as _ex3
+from .relaxation.internal import _ex1 as _ex4, _ex2 as _ex5
+
+
+class RuleTable:
+    """Compatibility rules of the stampables compiled once into lookup tables:
+     - exclusivity: each class is mapped to its group of mutually exclusive classes
+     - requirements: classes whose `compatible` must be called when validating a dataset"""
+
+    def __init__(self, *exclusives: Iterable[Type[Stampable]]) -> None:
+        self._g: dict[type, int] = {}
+        for i, group in enumerate(exclusives):
+            for t in group:
+                assert t not in self._g, f"{t.__name__} belongs to multiple groups of exclusive stampables"
+                self._g[t] = i
+        self._r: dict[type, bool] = {}
+
+    def group(self, t: type) -> Optional[int]:
+        """Index of the group of mutually exclusive classes `t` belongs to (if any)"""
+        return self._g.get(t)
+
+    def requires(self, t: type) -> bool:
+        """Whether `t` has requirements on the other stampables of the dataset (i.e. overrides `compatible`)"""
+        r = self._r.get(t)
+        if r is None:
+            r = self._r[t] = getattr(t, "compatible", Stampable.compatible) is not Stampable.compatible
+        return r
+
+
+rules = RuleTable(_ex1, _ex2, _ex3, _ex4, _ex5)
@@ -0,0 +1,180 @@
+from typing import Optional, Sequence, Union
+from enum import Enum
+import asyncio
+import json
+import os
+import time
+from ._cache import InputCache, digest
+
+
+__all__ = ["JobStatus", "Job", "Runner"]
+
+
+class JobStatus(Enum):
+    Pending = "pending"
+    Running = "running"
+    Done = "done"
+    Failed = "failed"
+    TimedOut = "timed out"
+    Cancelled = "cancelled"
+    Skipped = "skipped"
+    """Already completed according to the cache"""
+
+
+class Job:
+    """Run of the executable on one input file, executed in the directory of the file.
+
+    Standard output and error are written to `stdout` and `stderr` (files next to the input, `<name>.log` and `<name>.err`)"""
+
+    def __init__(self, input: str, timeout: Optional[float] = None, after: Sequence['Job'] = ()) -> None:
+        self.input = os.path.abspath(input)
+        self.after = tuple(after)
+        """Jobs that must be completed before this one starts"""
+        self.directory = os.path.dirname(self.input)
+        stem = os.path.splitext(self.input)[0]
+        self.stdout = stem + ".log"
+        self.stderr = stem + ".err"
+        self.timeout = timeout
+        self.status = JobStatus.Pending
+        self.returncode: Optional[int] = None
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def duration(self):
+        """Seconds spent running (so far), None if not started"""
+        if self.started is None:
+            return None
+        return (self.finished or time.time()) - self.started
+
+    def __repr__(self) -> str:
+        return f"Job({self.input!r}, {self.status.value})"
+
+
+async def _stop(proc: asyncio.subprocess.Process, grace: float):
+    """Terminates a process, killing it if it does not exit within `grace` seconds"""
+    if proc.returncode is not None:
+        return
+    proc.terminate()
+    try:
+        await asyncio.wait_for(proc.wait(), grace)
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+
+
+class Runner:
+    """Runs an executable (`abinit` by default) on many input files with asyncio subprocesses, at most `concurrency` at a time.
+
+    Jobs that exceed their timeout are terminated; `cancel` stops pending or running jobs.
+    If a `cache` is given, inputs whose run is already done are skipped and successful runs are marked as done.
+
+    ## Example
+    ```python
+    runner = Runner("abinit", concurrency=8, timeout=3600)
+    runner.submitManifest("./screening")    # files written by Campaign.generate
+    runner.execute()
+    print(runner.summary())
+    ```"""
+
+    def __init__(self, executable: Union[str, Sequence[str]] = "abinit", concurrency: Optional[int] = None, timeout: Optional[float] = None, cache: Optional[InputCache] = None, grace: float = 5.0) -> None:
+        """`executable` is the command (a string or the sequence of its arguments) to which the input file name is appended.
+        `concurrency` defaults to the number of cores and `timeout` (seconds, None for no limit) is the default one of the jobs.
+        `grace` is the time given to terminated jobs before they are killed"""
+        self.command = [executable] if isinstance(executable, str) else list(executable)
+        assert len(self.command) > 0, "Executable must be given"
+        self.concurrency = concurrency or os.cpu_count() or 1
+        assert self.concurrency > 0, "Concurrency must be positive"
+        self.timeout = timeout
+        self.cache = cache
+        self.grace = grace
+        self.jobs: list[Job] = []
+
+    def submit(self, input: str, timeout: Optional[float] = None, after: Sequence[Job] = ()) -> Job:
+        """Adds a job for the input file at `input` (with its own `timeout` if given), which starts once the jobs it comes `after` are completed (e.g. the inputs it reads from, see `splitAbi`).
+        If any of them does not complete successfully, the job is cancelled"""
+        assert all(j in self.jobs for j in after), "Jobs to wait for must be submitted first"
+        job = Job(input, self.timeout if timeout is None else timeout, after)
+        self.jobs.append(job)
+        return job
+
+    def submitManifest(self, directory: str, manifest: str = "manifest.json") -> list[Job]:
+        """Adds a job for each file of the manifest written by `Campaign.generate` in `directory`, except those marked as done"""
+        with open(os.path.join(directory, manifest)) as fp:
+            runs = json.load(fp)["runs"]
+        return [self.submit(os.path.join(directory, r["file"])) for r in runs if not r.get("done", False)]
+
+    def summary(self) -> dict[str, int]:
+        """Number of jobs for each status"""
+        res = { s.value: 0 for s in JobStatus }
+        for j in self.jobs:
+            res[j.status.value] += 1
+        return res
+
+    def cancel(self, job: Optional[Job] = None):
+        """Cancels a job (all of them if None): pending jobs will not start and running ones are terminated. Must be called while `run` is awaited"""
+        for j in (self.jobs if job is None else (job,)):
+            if j._task is not None and not j._task.done():
+                j._task.cancel()
+            elif j.status is JobStatus.Pending:
+                j.status = JobStatus.Cancelled
+
+    async def run(self) -> list[Job]:
+        """Runs all pending jobs, returning them once they are all finished"""
+        sem = asyncio.Semaphore(self.concurrency)
+        pending = [j for j in self.jobs if j.status is JobStatus.Pending]
+        for j in pending:
+            j._task = asyncio.create_task(self._run(j, sem))
+        await asyncio.gather(*(j._task for j in pending), return_exceptions=True) # type: ignore
+        return pending
+
+    def execute(self) -> list[Job]:
+        """Blocking version of `run`"""
+        return asyncio.run(self.run())
+
+    async def _run(self, job: Job, sem: asyncio.Semaphore):
+        text = None
+        if self.cache is not None:
+            with open(job.input) as fp:
+                text = fp.read()
+            key = digest(text)
+            if self.cache.isDone(key):
+                job.status = JobStatus.Skipped
+                return
+        proc = None
+        try:
+            for j in job.after:
+                if j._task is not None:
+                    await asyncio.shield(j._task)
+                if j.status not in (JobStatus.Done, JobStatus.Skipped):
+                    job.status = JobStatus.Cancelled
+                    return
+            async with sem:
+                job.status = JobStatus.Running
+                job.started = time.time()
+                with open(job.stdout, 'wb') as out, open(job.stderr, 'wb') as err:
+                    try:
+                        proc = await asyncio.create_subprocess_exec(*self.command, os.path.basename(job.input), cwd=job.directory, stdout=out, stderr=err)
+                    except OSError as e: # e.g. executable not found
+                        err.write(str(e).encode())
+                        job.status = JobStatus.Failed
+                        return
+                    try:
+                        job.returncode = await asyncio.wait_for(proc.wait(), job.timeout)
+                    except asyncio.TimeoutError:
+                        await _stop(proc, self.grace)
+                        job.returncode = proc.returncode
+                        job.status = JobStatus.TimedOut
+                        return
+                job.status = JobStatus.Done if job.returncode == 0 else JobStatus.Failed
+                if self.cache is not None and text is not None and job.status is JobStatus.Done:
+                    self.cache.markDone(self.cache.store(text), input=job.input, duration=job.duration)
+        except asyncio.CancelledError:
+            if proc is not None:
+                await _stop(proc, self.grace)
+                job.returncode = proc.returncode
+            job.status = JobStatus.Cancelled
+        finally:
+            if job.started is not None:
+                job.finished = time.time()
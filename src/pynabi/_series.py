@@ -0,0 +1,260 @@
+from typing import Optional, Sequence
+import re
+import numpy as np
+from ._common import Stampable, ArrayFormat, formatArray, _SUFFIX
+
+
+_line = re.compile("^(\\w+?)\x00 (.+)$")
+
+
+def templateVars(template: str) -> dict[str, str]:
+    """Variables (with their values) of an index-independent template, i.e. the lines with a dataset suffix"""
+    res: dict[str, str] = {}
+    for l in template.split('\n'):
+        m = _line.match(l)
+        if m is not None:
+            res[m[1]] = m[2]
+    return res
+
+
+def stampVars(s: Stampable) -> tuple[dict[str, str], bool]:
+    """Variables of the template of a cacheable stampable, and whether they are all of its lines: cached along with its template"""
+    c = s.__dict__.get("_tv")
+    rc = s.__dict__.get("_rc")
+    if c is None or c[0] is not rc or rc[0] != ArrayFormat._gen or rc[1] != ():
+        t = s.render(_SUFFIX)
+        rc = s.__dict__["_rc"]
+        tv = templateVars(t)
+        c = s.__dict__["_tv"] = (rc, tv, len(tv) == t.count('\n') + 1)
+    return c[1], c[2]
+
+
+_Num = int|float
+
+_mandatory = frozenset(("ecut",))
+"""Variables without a default value in Abinit: a series can give them a value in the datasets that do not define them"""
+
+
+def _number(v: str) -> _Num:
+    return int(v) if v.lstrip('+-').isdigit() else float(v)
+
+
+def _numbers(value: str) -> Optional[tuple[list[_Num], str]]:
+    """Parses the value of a variable (expanding the `n*value` syntax) into its numbers and trailing unit"""
+    tokens = value.split()
+    unit = tokens.pop() if len(tokens) > 1 and tokens[-1].isalpha() else ''
+    res: list[_Num] = []
+    try:
+        for t in tokens:
+            c, _, v = t.rpartition('*')
+            if c:
+                res.extend([_number(v)]*int(c))
+            else:
+                res.append(_number(v))
+    except ValueError:
+        return None
+    return (res, unit) if len(res) > 0 else None
+
+
+def _parse(raw: Sequence[str]) -> Optional[tuple[np.ndarray, str]]:
+    """Values of a variable in multiple datasets as a 2D array (one row per dataset) along with their common unit, if they are all numeric"""
+    heads = [r.partition(' ') for r in raw]
+    unit = heads[0][2]
+    if all(h[2] == unit for h in heads) and (unit == '' or unit.isalpha()):
+        # fast path: scalar values, parsed by numpy
+        a = np.array([h[0] for h in heads])
+        for t in (np.int64, np.float64):
+            try:
+                return a.astype(t).reshape(-1, 1), unit
+            except ValueError:
+                pass
+    parsed = [_numbers(r) for r in raw]
+    p0 = parsed[0]
+    if p0 is None or any(p is None or p[1] != p0[1] or len(p[0]) != len(p0[0]) for p in parsed):
+        return None
+    return np.array([p[0] for p in parsed]), p0[1] # type: ignore
+
+
+def _clean(x: _Num) -> _Num:
+    return x if type(x) is int else float(f"{x:.15g}")
+
+
+def _run(v: np.ndarray, geometric: bool):
+    """Longest run of consecutive values (rows of `v`) in arithmetic (or geometric) progression, as (start, stop, step)"""
+    if geometric:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            steps = v[1:] / v[:-1]
+        ok = np.all(v[:-1] != 0, axis=1)
+    else:
+        steps = v[1:] - v[:-1]
+        ok = np.ones(len(steps), dtype=bool)
+    # same[i]: the i-th and (i+1)-th steps are equal, i.e. values i..i+2 are in progression
+    same = ok[1:] & ok[:-1] & np.all(np.isclose(steps[1:], steps[:-1], rtol=1e-9, atol=1e-12), axis=1)
+    if len(same) == 0 or not same.any():
+        i = int(np.argmax(ok)) if len(ok) > 0 and ok.any() else -1
+        return (i, i+2, steps[i].tolist()) if i >= 0 else (0, 0, None)
+    # longest sequence of True in same
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], same.view(np.int8), [0]))))
+    starts, stops = edges[::2], edges[1::2]
+    k = int(np.argmax(stops - starts))
+    a = int(starts[k])
+    return (a, int(stops[k]) + 2, steps[a].tolist())
+
+
+def _defined(column: Sequence[Optional[str]]):
+    """Longest range of consecutive datasets defining a variable, as (start, stop)"""
+    best = (0, 0)
+    start = None
+    for i, v in enumerate((*column, None)):
+        if v is None:
+            if start is not None and i - start > best[1] - best[0]:
+                best = (start, i)
+            start = None
+        elif start is None:
+            start = i
+    return best
+
+
+class Sweep:
+    """Result of the analysis of the variables of the numbered datasets:
+    the lines to write once (`lines`), the datasets (by position) from which each variable must be dropped (`drop`) and the double loop sizes (`udtset`)"""
+
+    def __init__(self, n: int) -> None:
+        self.n = n
+        self.udtset: Optional[tuple[int,int]] = None
+        self.lines: list[str] = []
+        self.drop: dict[str, range] = {}
+
+    def __bool__(self):
+        return len(self.lines) > 0
+
+    def index(self, position: int):
+        """Dataset index of the `position`-th (from 0) numbered dataset"""
+        if self.udtset is None:
+            return position + 1
+        i, j = divmod(position, self.udtset[1])
+        return 10*(i+1) + j+1
+
+    def segments(self):
+        """Consecutive ranges of datasets (by position) along with the variables written by the series for them"""
+        edges = sorted({ 0, self.n, *(e for r in self.drop.values() for e in (r.start, r.stop)) })
+        for a, b in zip(edges, edges[1:]):
+            yield { v for v,r in self.drop.items() if a in r }, range(a, b)
+
+    def _constant(self, var: str, raw: str):
+        self.lines.append(f"{var} {raw}")
+        self.drop[var] = range(self.n)
+
+    def _series(self, var: str, values: np.ndarray, unit: str, fmt: tuple[str,str,str]):
+        """Adds a series of `values` of the whole range: returns False if they are not a progression"""
+        for geometric in (False, True):
+            a, b, step = _run(values, geometric)
+            if b - a == len(values) and step is not None:
+                first = values[0].tolist()
+                if geometric and values.dtype.kind == 'i' and all(float(s).is_integer() for s in step):
+                    step = [int(s) for s in step]
+                u = f" {unit}" if unit else ''
+                self.lines.append(f"{var}{fmt[0]} {formatArray(map(_clean, first))}{u}")
+                self.lines.append(f"{var}{fmt[2] if geometric else fmt[1]} {formatArray(map(_clean, step))}{'' if geometric else u}")
+                return True
+        return False
+
+    @staticmethod
+    def find(base: set[str], values: dict[str, list[Optional[str]]], n: int, minimum: int = 3) -> 'Sweep':
+        """Analyses the values of the variables of the `n` numbered datasets (None where a dataset does not define the variable), given the variables defined in the `base` dataset.
+        Series of a single variable must span at least `minimum` datasets"""
+        # variables of the base dataset cannot be written again as series (nor as constants)
+        values = { v: values[v] for v in sorted(values) if v not in base }
+        full: dict[str, list[str]] = { v: c for v,c in values.items() if None not in c } # type: ignore
+        return Sweep._double(base, full, n) or Sweep._single(base, values, n, minimum)
+
+    @staticmethod
+    def _single(base: set[str], values: dict[str, list[Optional[str]]], n: int, minimum: int):
+        res = Sweep(n)
+        for var, column in values.items():
+            offset = 0
+            if None in column:
+                # a series would also give a value to the datasets not defining the variable
+                if var not in _mandatory:
+                    continue
+                offset, stop = _defined(column)
+                column = column[offset:stop]
+            raw: list[str] = column # type: ignore
+            if all(r == raw[0] for r in raw):
+                if len(raw) == n:
+                    res._constant(var, raw[0])
+                else:
+                    res.lines.append(f"{var} {raw[0]}")
+                    res.drop[var] = range(offset, offset + len(raw))
+                continue
+            parsed = _parse(raw)
+            if parsed is None:
+                continue
+            nums, unit = parsed
+            ar = _run(nums, False)
+            ge = _run(nums, True)
+            geometric = ge[1] - ge[0] > ar[1] - ar[0]
+            a, b, step = ge if geometric else ar
+            if b - a < minimum or step is None:
+                continue
+            first = nums[a].tolist()
+            a, b = a + offset, b + offset
+            if geometric:
+                if all(type(x) is int for x in first) and all(float(s).is_integer() for s in step):
+                    step = [int(s) for s in step]
+                start = [x / s**a for x,s in zip(first, step)] if a > 0 else first
+            else:
+                start = [x - a*s for x,s in zip(first, step)]
+            if all(type(x) is int for x in first) and all(type(s) is int for s in step):
+                if not all(float(x).is_integer() for x in start):
+                    continue # the series would not start from an integer
+                start = [int(x) for x in start]
+            u = f" {unit}" if unit else ''
+            res.lines.append(f"{var}: {formatArray(map(_clean, start))}{u}")
+            res.lines.append(f"{var}{'*' if geometric else '+'} {formatArray(map(_clean, step))}{'' if geometric else u}")
+            res.drop[var] = range(a, b)
+        return res
+
+    @staticmethod
+    def _double(base: set[str], values: dict[str, list[str]], n: int):
+        """Looks for a double loop (`udtset`) where some variables depend only on the outer index and some only on the inner one"""
+        best: Optional[tuple[int, int, list[str], list[str]]] = None
+        for n2 in range(2, 10):
+            n1, r = divmod(n, n2)
+            if r != 0 or n1 < 2 or n1 > 999:
+                continue
+            outer: list[str] = []
+            inner: list[str] = []
+            for var, raw in values.items():
+                if all(r == raw[0] for r in raw):
+                    continue
+                if all(raw[i*n2 + j] == raw[i*n2] for i in range(n1) for j in range(n2)):
+                    outer.append(var)
+                elif all(raw[i*n2 + j] == raw[j] for i in range(n1) for j in range(n2)):
+                    inner.append(var)
+            if len(outer) > 0 and len(inner) > 0 and (best is None or len(outer) + len(inner) > len(best[2]) + len(best[3])):
+                best = (n1, n2, outer, inner)
+        if best is None:
+            return None
+        n1, n2, outer, inner = best
+        res = Sweep(n)
+        res.udtset = (n1, n2)
+        res.lines.append(f"udtset {n1} {n2}")
+        for var, raw in values.items():
+            if all(r == raw[0] for r in raw):
+                res._constant(var, raw[0])
+        for loop, names in ((0, outer), (1, inner)):
+            for var in names:
+                raw = values[var]
+                one = [raw[i*n2] for i in range(n1)] if loop == 0 else raw[:n2]
+                parsed = _parse(one)
+                done = False
+                if parsed is not None:
+                    fmt = (":?", "+?", "*?") if loop == 0 else ("?:", "?+", "?*")
+                    done = res._series(var, parsed[0], parsed[1], fmt)
+                if not done:
+                    for k, r in enumerate(one):
+                        res.lines.append(f"{var}{k+1}?" if loop == 0 else f"{var}?{k+1}")
+                        res.lines[-1] += f" {r}"
+                res.drop[var] = range(n)
+        return res
@@ -0,0 +1,200 @@
+from typing import NamedTuple, Optional, Union
+from ._dataset import DataSet, AbIn, AbOut, createAbi
+
+
+__all__ = ["SplitInput", "splitAbi"]
+
+
+# data that a dataset can read from a file (get*_filepath) instead of from a dataset of the same run
+_files = { "ddb", "den", "dvdb", "scr", "wfk", "wfq" }
+
+
+class SplitInput(NamedTuple):
+    """One of the input files produced by `splitAbi`"""
+    name: str
+    """Stem of the file, also used in the output prefix"""
+    text: str
+    after: tuple[str, ...]
+    """Names of the inputs whose output files are read: their runs must be completed first"""
+
+
+def _refs(d: DataSet):
+    """Datasets read by `d` through AbIn, along with whether it could be read from a file instead"""
+    abin: Optional[AbIn] = d.map.get(AbIn) # type: ignore
+    if abin is None:
+        return []
+    return [(v, m._prop in _files) for m,v in abin._d.items() if type(v) is DataSet]
+
+
+class _Groups:
+    """Union-find of the positions of the datasets"""
+    def __init__(self, n: int) -> None:
+        self.p = list(range(n))
+
+    def find(self, i: int) -> int:
+        while self.p[i] != i:
+            self.p[i] = self.p[self.p[i]]
+            i = self.p[i]
+        return i
+
+    def union(self, i: int, j: int):
+        i, j = self.find(i), self.find(j)
+        if i != j:
+            self.p[max(i,j)] = min(i,j)
+
+
+def _graph(g: _Groups, edges: list[tuple[int,int]]):
+    """Parents and children of each group given the (parent, child) edges between datasets"""
+    parents: dict[int, set[int]] = {}
+    children: dict[int, set[int]] = {}
+    for a, b in edges:
+        a, b = g.find(a), g.find(b)
+        if a != b:
+            parents.setdefault(b, set()).add(a)
+            children.setdefault(a, set()).add(b)
+    return parents, children
+
+
+def _cycle(roots: list[int], children: dict[int, set[int]]) -> Optional[list[int]]:
+    state: dict[int, int] = {}
+    stack: list[int] = []
+    def visit(r: int) -> Optional[list[int]]:
+        state[r] = 1
+        stack.append(r)
+        for c in children.get(r, ()):
+            s = state.get(c, 0)
+            if s == 1:
+                return stack[stack.index(c):]
+            if s == 0 and (found := visit(c)) is not None:
+                return found
+        state[r] = 2
+        stack.pop()
+        return None
+    for r in roots:
+        if state.get(r, 0) == 0 and (found := visit(r)) is not None:
+            return found
+    return None
+
+
+def _partition(datasets: tuple[DataSet, ...]) -> list[list[int]]:
+    """Groups of datasets (by position) to write in the same file, in order of execution"""
+    position = { id(d): i for i,d in enumerate(datasets) }
+    g = _Groups(len(datasets))
+    soft: list[tuple[int,int]] = []
+    for i, d in enumerate(datasets):
+        for v, file in _refs(d):
+            j = position.get(id(v))
+            if j is None:
+                raise ValueError(f"Dataset {i+1} reads from a dataset which is not being split")
+            if file:
+                soft.append((j, i))
+            else:
+                g.union(j, i) # no file alternative: must stay in the same run
+    while True:
+        # groups depending on each other must be merged
+        parents, children = _graph(g, soft)
+        roots = sorted({ g.find(i) for i in range(len(datasets)) })
+        c = _cycle(roots, children)
+        if c is None:
+            break
+        for r in c[1:]:
+            g.union(c[0], r)
+    # chains (a group whose only parent has no other child) run serially anyway: keep them in one file
+    for r in roots:
+        ps = parents.get(r, ())
+        if len(ps) == 1:
+            p = next(iter(ps))
+            if len(children[p]) == 1:
+                g.union(p, r)
+    parents, children = _graph(g, soft)
+    groups: dict[int, list[int]] = {}
+    for i in range(len(datasets)):
+        groups.setdefault(g.find(i), []).append(i)
+    # topological order of the groups (by first dataset among the ready ones)
+    order: list[list[int]] = []
+    missing = { r: len(parents.get(r, ())) for r in groups }
+    ready = sorted(r for r,n in missing.items() if n == 0)
+    while len(ready) > 0:
+        r = ready.pop(0)
+        order.append(groups[r])
+        for c in children.get(r, ()):
+            missing[c] -= 1
+            if missing[c] == 0:
+                ready.append(c)
+        ready.sort()
+    return order
+
+
+def _prefix(d: Optional[DataSet]):
+    out: Optional[AbOut] = None if d is None else d.map.get(AbOut) # type: ignore
+    return None if out is None else out._p
+
+
+def _withPrefix(setup: Optional[DataSet], prefix: str):
+    """Copy of the base dataset whose output files use `prefix`"""
+    old: Optional[AbOut] = None if setup is None else setup.map.get(AbOut) # type: ignore
+    out = AbOut(prefix)
+    if old is not None:
+        out._d = dict(old._d)
+    if setup is None:
+        return DataSet(out)
+    return DataSet(() if setup.atoms is None else setup.atoms, [out if s is old else s for s in setup.stamps], () if old is not None else out)
+
+
+def splitAbi(setup: Union[DataSet,None], *datasets: DataSet, name: str = "run", **kwargs) -> list[SplitInput]:
+    """Splits a multi-dataset input into the least number of files that can run concurrently, following the dependencies between datasets given by `AbIn`.
+
+    Datasets not depending on each other end up in different files, while chains of datasets (each one read only by the next one) stay in one file.
+    References to datasets of another file are rewritten as `get*_filepath` pointing to the output of that file, whose prefix is set through `AbOut`
+    (`<prefix>_<k>`, where the prefix is the one of the base `AbOut` or `<name>o`); data that cannot be read from a file (e.g. first-order wavefunctions) keeps datasets in the same file.
+    Paths are relative, so files are meant to be written and run in the same directory; `after` lists the inputs that must be completed first.
+    Other keyword arguments are passed to `createAbi`.
+
+    ## Example
+    ```python
+    runner = Runner()
+    jobs = {}
+    for part in splitAbi(base, *sets):
+        with open(f"{part.name}.abi", 'w') as f:
+            f.write(part.text)
+        jobs[part.name] = runner.submit(f"{part.name}.abi", after=[jobs[a] for a in part.after])
+    runner.execute()
+    ```"""
+    if len(datasets) == 0:
+        return [SplitInput(name, createAbi(setup, **kwargs), ())]
+    groups = _partition(datasets)
+    base = _prefix(setup) or f"{name}o"
+    file: dict[int, str] = {}          # position -> name of the file of the dataset
+    prefix: dict[int, str] = {}        # position -> output prefix of the dataset
+    final: dict[int, DataSet] = {}     # position -> dataset as written (for its index)
+    position = { id(d): i for i,d in enumerate(datasets) }
+    res: list[SplitInput] = []
+    for k, group in enumerate(groups):
+        part = f"{name}_{k+1}"
+        out = f"{base}_{k+1}"
+        after: list[str] = []
+        written: list[DataSet] = []
+        for i in group:
+            file[i] = part
+            d = datasets[i]
+            refs = _refs(d)
+            if len(refs) > 0:
+                old: AbIn = d.map[AbIn] # type: ignore
+                new = AbIn(old._p)
+                new._ppd = old._ppd
+                for m, v in old._d.items():
+                    j = position.get(id(v)) if type(v) is DataSet else None
+                    if j is None:
+                        new._d[m] = v
+                    elif file[j] == part:
+                        new._d[m] = final[j]
+                    else:
+                        new._d[m] = f"{prefix[j]}_DS{final[j].index}_{m._prop.upper()}"
+                        if file[j] not in after:
+                            after.append(file[j])
+                d = DataSet(() if d.atoms is None else d.atoms, [new if s is old else s for s in d.stamps])
+            final[i] = d
+            prefix[i] = _prefix(d) or out
+            written.append(d)
+        res.append(SplitInput(part, createAbi(_withPrefix(setup, out), *written, **kwargs), tuple(after)))
+    return res
@@ -87,6 +87,7 @@ class EnergyCutoff(OneLineStamp):
         e = Energy.sanitize(value);
         assert e._v > 0, "cutoff energy must be positive"
         super().__init__(str(e))
+        self.energy = e
 
 
 class MaxSteps(OneLineStamp):
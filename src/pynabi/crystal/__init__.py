@@ -15,4 +15,7 @@ from .internal import (
     WurtziteLike,
     NiAsLike,
     HCP,
+    supercell,
+    SymmetryOperations,
+    spaceGroup,
 )
\ No newline at end of file
@@ -2,12 +2,15 @@
 WARNING: do not import this file directly!
 """
 
-from pynabi._common import Vec3D, Stampable
-from typing import Optional, Union, Tuple
+from pynabi._common import Vec3D, Stampable, formatArray, formatVectors
+from typing import Optional, Union, Tuple, Sequence
 from pynabi.units.internal import Length, Pos3D
+from numpy.typing import ArrayLike
+import numpy as np
+import hashlib
 
 
-atom_symbols = ["H","He","Li","Be","B","C","N","O","F","Ne","Na","Mg","Al","Si","P","S","Cl","Ar","K","Ca","Sc","Ti","V","Cr","Mn","Fe","Co","Ni","Cu","Zn","Ga","Ge","As","Se","Br","Kr","Rb","Sr","Y","Zr","Nb","Mo","Tc","Ru","Rh","Pd","Ag","Cd","In","Sn","Sb","Te","I","Xe","Cs","Ba","La","Ce","Pr","Nd","Pm","Sm","Eu","Gd","Tb","Dy","Ho","Er","Tm","Yb","Lu","Hf","Ta","W","Re","Os","Ir","Pt","Au","Hg","Tl","Pb","Bi","Po","At","Rn","Fr","Ra","Ac","Th","Pa","U ","Np","Pu","Am","Cm","Bk","Cf","Es","F","Md","No","Lr","Rf","Db","Sg","Bh","Hs","Mt","Ds","Rg","Cn","Nh","Fl","Mc","Lv","Ts","Og"]
+atom_symbols = ["H","He","Li","Be","B","C","N","O","F","Ne","Na","Mg","Al","Si","P","S","Cl","Ar","K","Ca","Sc","Ti","V","Cr","Mn","Fe","Co","Ni","Cu","Zn","Ga","Ge","As","Se","Br","Kr","Rb","Sr","Y","Zr","Nb","Mo","Tc","Ru","Rh","Pd","Ag","Cd","In","Sn","Sb","Te","I","Xe","Cs","Ba","La","Ce","Pr","Nd","Pm","Sm","Eu","Gd","Tb","Dy","Ho","Er","Tm","Yb","Lu","Hf","Ta","W","Re","Os","Ir","Pt","Au","Hg","Tl","Pb","Bi","Po","At","Rn","Fr","Ra","Ac","Th","Pa","U","Np","Pu","Am","Cm","Bk","Cf","Es","Fm","Md","No","Lr","Rf","Db","Sg","Bh","Hs","Mt","Ds","Rg","Cn","Nh","Fl","Mc","Lv","Ts","Og"]
 
 class Atom:
     def __init__(self, id: int|str, file: Optional[str] = None):
@@ -47,28 +50,125 @@ pseudos \"{', '.join(a.file for a in atoms)}\""""
 
 
 class AtomBasis(Stampable):
-    def __init__(self, *atoms: Tuple[Atom,Vec3D], cartesian: bool = False) -> None:
+    def __init__(self, *atoms: Tuple[Atom,Union[Vec3D,Pos3D]], cartesian: bool = False) -> None:
         """Construct an atom basis given a sequence of tuples containing an atom and a position (Vec3D)\n
-        If `cartesian` is True, the coordinates of the atoms' position are cartesian instead of reduced."""
+        If `cartesian` is True, the coordinates of the atoms' position are cartesian instead of reduced: they can be given as Pos3D (converted to Bohr) or as Vec3D (in Bohr).
+        
+        Internally atoms are stored as an array of species indexes and an (N,3) array of positions: for large basis prefer `AtomBasis.fromArrays`"""
         assert len(atoms) > 0, "There must be at least one atom in basis"
-        self.atoms = atoms
+        self._setup(cartesian)
+        self.extend([a[0] for a in atoms], [self._coordinates(a[1]) for a in atoms])
+    
+    def _setup(self, cartesian: bool):
         self.cartesian = cartesian
+        self._s: list[Atom] = []
+        self._si: dict[Atom,int] = {}
+        self._t = np.empty(0, dtype=np.intp)
+        self._x = np.empty((0,3))
+        self._n = 0
+    
+    def _species(self, atom: Atom):
+        i = self._si.get(atom)
+        if i is None:
+            assert type(atom) is Atom, f"Invalid atom (got {type(atom)})"
+            i = self._si[atom] = len(self._s)
+            self._s.append(atom)
+        return i
+    
+    def _push(self, types: np.ndarray, positions: np.ndarray):
+        n = self._n + len(types)
+        if n > len(self._t):
+            cap = max(n, 2*len(self._t))
+            t = np.empty(cap, dtype=np.intp)
+            x = np.empty((cap,3))
+            t[:self._n] = self._t[:self._n]
+            x[:self._n] = self._x[:self._n]
+            self._t = t
+            self._x = x
+        self._t[self._n:n] = types
+        self._x[self._n:n] = positions
+        self._n = n
+        self.invalidate()
+    
+    @staticmethod
+    def fromArrays(species: Sequence[Atom], types: ArrayLike, positions: ArrayLike, cartesian: bool = False):
+        """Construct an atom basis without looping over the atoms:
+         - `species` is the sequence of (distinct) atoms
+         - `types` is an array of N integers, the i-th atom being `species[types[i]]`
+         - `positions` is an array of shape (N,3)
+        """
+        t = np.asarray(types, dtype=np.intp)
+        x = np.asarray(positions, dtype=float)
+        assert t.ndim == 1 and len(t) > 0, "There must be at least one atom in basis"
+        assert x.shape == (len(t),3), "Positions must be an array of shape (N,3), N being the number of types"
+        assert 0 <= t.min() and t.max() < len(species), "Types must be valid indexes of the species"
+        b = AtomBasis.__new__(AtomBasis)
+        b._setup(cartesian)
+        for a in species:
+            b._species(a)
+        assert len(b._s) == len(species), "Species must be distinct atoms"
+        b._push(t, x)
+        return b
+    
+    @property
+    def species(self):
+        """Distinct atoms of the basis (indexed by `types`)"""
+        return tuple(self._s)
+    
+    @property
+    def types(self):
+        """Array of the species indexes of each atom"""
+        return self._t[:self._n]
+    
+    @property
+    def positions(self):
+        """(N,3) array of the atoms' positions: call `invalidate` after modifying it in place"""
+        return self._x[:self._n]
     
-    def add(self, atom: Atom, where: Vec3D):
-        if type(self.atoms) is tuple:
-            self.atoms = list(self.atoms)
-        self.atoms.append((atom, where)) # type: ignore
+    @property
+    def atoms(self):
+        return tuple((self._s[t], Vec3D(*x)) for t,x in zip(self.types.tolist(), self.positions.tolist()))
+    
+    def __len__(self):
+        return self._n
+    
+    def _coordinates(self, where: Union[Vec3D,Pos3D]):
+        if type(where) is Pos3D:
+            assert self.cartesian, "Positions with a unit (Pos3D) must be cartesian"
+            return _bohr(where)
+        return (where.x, where.y, where.z)
+    
+    def add(self, atom: Atom, where: Union[Vec3D,Pos3D]):
+        self._push(np.array((self._species(atom),)), np.array(self._coordinates(where)))
+    
+    def extend(self, atoms: Atom|Sequence[Atom], positions: ArrayLike):
+        """Adds many atoms at once: `atoms` can be either a single atom (placed at all positions) or a sequence of atoms of the same length of `positions` (array-like of shape (N,3))"""
+        x = np.asarray(positions, dtype=float).reshape(-1,3)
+        if isinstance(atoms, Atom):
+            t = np.full(len(x), self._species(atoms), dtype=np.intp)
+        else:
+            assert len(atoms) == len(x), "Number of atoms and positions must be the same"
+            t = np.fromiter((self._species(a) for a in atoms), dtype=np.intp, count=len(x))
+        self._push(t, x)
     
     def getAtoms(self):
-        return (a[0] for a in self.atoms)
+        return (self._s[i] for i in np.unique(self.types).tolist())
     
-    def stamp(self, index: int, pool: 'list[Atom]'):
-        indexes = [pool.index(a[0]) for a in self.atoms]
+    def stamp(self, index: int, pool: 'Sequence[Atom]'):
+        lookup = {a: i+1 for i,a in enumerate(pool)}
+        used = np.unique(self.types)
+        table = np.zeros(len(self._s), dtype=np.intp)
+        for t in used.tolist():
+            i = lookup.get(self._s[t])
+            if i is None:
+                raise ValueError(f"Atom {self._s[t]} is not in the pool of atoms")
+            table[t] = i
+        typat = table[self.types]
         suffix = str(index or '');
         x_type = "xcart" if self.cartesian else "xred";
-        return f"""natom{suffix} {len(indexes)}
-typat{suffix} {' '.join(str(i+1) for i in indexes)}
-{x_type}{suffix} {'   '.join(str(a[1]) for a in self.atoms)}"""
+        return f"""natom{suffix} {self._n}
+typat{suffix} {formatArray(typat)}
+{x_type}{suffix} {formatArray(self.positions, 3)}"""
 
     @staticmethod
     def ofOne(atom: Atom):
@@ -86,6 +186,25 @@ def _2uni(v: Union[float,Length]):
         raise TypeError(f"Lattice constant is of wrong value (got {t} instead of float or Length)")
 
 
+def _bohr(l: Pos3D):
+    """Components of `l` in Bohr"""
+    f = Length._U[l.u][0]/Length._U[0][0]
+    return np.array((l.x, l.y, l.z))*f
+
+
+def _candidates():
+    """All the unimodular 3x3 matrices with entries -1, 0, 1 (identity first)"""
+    global _unimodular
+    if _unimodular is None:
+        m = np.array(np.meshgrid(*[(-1,0,1)]*9, indexing="ij")).reshape(9,-1).T.reshape(-1,3,3)
+        m = m[np.abs(np.round(np.linalg.det(m))) == 1]
+        identity = np.all(m == np.eye(3, dtype=int), axis=(1,2))
+        _unimodular = np.concatenate((m[identity], m[~identity]))
+    return _unimodular
+
+_unimodular: Optional[np.ndarray] = None
+
+
 class Lattice(Stampable):
     def __init__(self, **props):
         """Do not use directly: prefer static methods like fromAngle, fromPrimitives"""
@@ -93,7 +212,31 @@ class Lattice(Stampable):
 
     def stamp(self, index: int):
         suffix = index if index > 0 else ''
-        return '\n'.join(f"{k}{suffix} {v}" for k,v in self._p.items())
+        return '\n'.join(f"{k}{suffix} {formatVectors(v) if type(v) is tuple else v}" for k,v in self._p.items())
+    
+    def primitiveVectors(self) -> np.ndarray:
+        """Returns a (3,3) array whose rows are the cartesian primitive vectors (in Bohr) of the lattice.
+        When defined from angles, the first vector is along x and the second one in the xy plane."""
+        acell: Pos3D = self._p["acell"]
+        if "rprim" in self._p:
+            r = np.array([(v.x, v.y, v.z) for v in self._p["rprim"]], dtype=float)
+        else:
+            a: Vec3D = self._p["angdeg"]
+            ca, cb, cg = np.cos(np.radians((a.x, a.y, a.z)))
+            sg = np.sin(np.radians(a.z))
+            cy = (ca - cb*cg)/sg
+            r = np.array(((1.0, 0.0, 0.0), (cg, sg, 0.0), (cb, cy, np.sqrt(1.0 - cb*cb - cy*cy))))
+        return r * _bohr(acell)[:,None]
+    
+    def pointGroup(self, tolerance: float = 1e-5) -> np.ndarray:
+        """Returns the (nsym,3,3) integer array of the rotations (in reduced coordinates, like `symrel`) that leave the lattice invariant, identity first.
+        Rotations are searched among the matrices with entries -1, 0 or 1, which contain all of them for reduced cells (such as the ones of the presets)."""
+        a = self.primitiveVectors()
+        g = a @ a.T
+        m = _candidates()
+        mgm = np.einsum("nji,jk,nkl->nil", m, g, m, optimize=True)
+        ok = np.all(np.abs(mgm - g) <= tolerance*np.abs(g).max(), axis=(1,2))
+        return m[ok]
     
     @staticmethod
     def fromAngles(angles: Vec3D, scaling: Union[Vec3D,Pos3D]):
@@ -117,7 +260,7 @@ class Lattice(Stampable):
         Construct lattice from dimensionless primitives [a, b, c]. Each primitive gets scaled by the corresponfing component of `scaling`.
         """
         assert type(a) is Vec3D and type(b) is Vec3D and type(c) is Vec3D, "Primitive vectors must be of type Vec3D"
-        return Lattice(acell=Pos3D.sanitize(scaling), rprim=f"{a}   {b}   {c}")
+        return Lattice(acell=Pos3D.sanitize(scaling), rprim=(a,b,c))
     
     @staticmethod
     def CUB(a: Union[float,Length]):
@@ -285,4 +428,236 @@ def NiAsLike(Ni: Atom, As: Atom, a: Union[Length,float], c: Union[Length,float])
         (Ni, Vec3D(0.0,0.0,0.5)),
         (As, Vec3D(1/3, 2/3, 0.75))
     )
-    return (b,l)
\ No newline at end of file
+    return (b,l)
+
+def _supercell_matrix(matrix: Union[int, Tuple[int,int,int], ArrayLike]):
+    m = np.asarray(matrix)
+    if m.ndim == 0:
+        m = np.diag((m,m,m))
+    elif m.shape == (3,):
+        m = np.diag(m)
+    assert m.shape == (3,3) and np.issubdtype(m.dtype, np.integer), "Supercell matrix must be an integer, three integers or a 3x3 integer matrix"
+    assert round(np.linalg.det(m)) != 0, "Supercell matrix must not be singular"
+    return m
+
+
+def _supercell_translations(m: np.ndarray):
+    """Lattice translations (as integer vectors) inside the supercell defined by the rows of `m`"""
+    corners = np.array([(i,j,k) for i in (0,1) for j in (0,1) for k in (0,1)]) @ m
+    lo = corners.min(axis=0)
+    hi = corners.max(axis=0)
+    g = np.mgrid[lo[0]:hi[0], lo[1]:hi[1], lo[2]:hi[2]].reshape(3,-1).T
+    f = g @ np.linalg.inv(m)
+    eps = 1e-9
+    inside = np.all((f > -eps) & (f < 1-eps), axis=1)
+    return g[inside]
+
+
+def supercell(basis: AtomBasis, lattice: Lattice, matrix: Union[int, Tuple[int,int,int], ArrayLike], 
+              vacancies: Optional[ArrayLike] = None, substitutions: Optional[dict[Atom, ArrayLike]] = None):
+    """Constructs the supercell whose primitive vectors are the rows of `matrix` times the primitive vectors of `lattice`.
+    `matrix` can also be an integer n (n x n x n supercell) or a tuple of three integers (n1 x n2 x n3 supercell).
+
+    Atoms are ordered so that the copies of the i-th atom of `basis` are contiguous. The following index masks (either boolean arrays or arrays of indexes) refer to this ordering:
+     - `vacancies` selects the atoms to remove
+     - `substitutions` maps an atom to the sites to replace with it
+
+    Returns the new (AtomBasis, Lattice) pair. 
+    
+    ## Example
+    ```python
+    b, l = supercell(*RockSaltLike(Na, Cl, 5.64*Ang), 4, vacancies=[0], substitutions={ Br: [70, 71] })
+    ```"""
+    m = _supercell_matrix(matrix)
+    T = _supercell_translations(m)
+    x = basis.positions
+    if basis.cartesian:
+        pos = x[:,None,:] + (T @ lattice.primitiveVectors())[None,:,:]
+    else:
+        pos = (x[:,None,:] + T[None,:,:]) @ np.linalg.inv(m)
+        pos -= np.floor(pos + 1e-9)
+    pos = pos.reshape(-1,3)
+    types = np.repeat(basis.types, len(T))
+    species = list(basis.species)
+    if substitutions is not None:
+        for atom, mask in substitutions.items():
+            if atom in species:
+                i = species.index(atom)
+            else:
+                i = len(species)
+                species.append(atom)
+            types[np.asarray(mask)] = i
+    if vacancies is not None:
+        keep = np.ones(len(types), dtype=bool)
+        keep[np.asarray(vacancies)] = False
+        types = types[keep]
+        pos = pos[keep]
+    b = AtomBasis.fromArrays(species, types, pos, basis.cartesian)
+
+    acell: Pos3D = lattice._p["acell"]
+    if np.count_nonzero(m - np.diag(np.diagonal(m))) == 0:
+        d = np.diagonal(m).tolist()
+        l = Lattice(**{ **lattice._p, "acell": Pos3D(acell.x*d[0], acell.y*d[1], acell.z*d[2], Length(1.0, acell.u)) })
+    else:
+        # primitive vectors in units of acell
+        r = m @ (lattice.primitiveVectors() / (Length._U[acell.u][0]/Length._U[0][0]))
+        l = Lattice(acell=Pos3D(1.0, 1.0, 1.0, Length(1.0, acell.u)), rprim=tuple(Vec3D(*v) for v in r.tolist()))
+    return (b,l)
+
+
+_msym = 384
+"""Default maximum number of symmetry operations of Abinit"""
+
+
+class SymmetryOperations(Stampable):
+    def __init__(self, rotations: ArrayLike, translations: ArrayLike) -> None:
+        """Symmetry operations of the crystal, given explicitly to Abinit (instead of letting it search them at startup):
+        the atom in `x` (reduced coordinates) is sent to `rotations[i] @ x + translations[i]`.
+        `rotations` is an (nsym,3,3) integer array and `translations` an (nsym,3) array; prefer `spaceGroup` to find them"""
+        r = np.asarray(rotations, dtype=np.intp)
+        t = np.asarray(translations, dtype=float)
+        assert r.ndim == 3 and r.shape[1:] == (3,3) and len(r) > 0, "Rotations must be an array of shape (nsym,3,3)"
+        assert t.shape == (len(r),3), "Translations must be an array of shape (nsym,3)"
+        self.rotations = r
+        self.translations = t
+    
+    def __len__(self):
+        return len(self.rotations)
+    
+    def stamp(self, index: int):
+        suffix = index or ''
+        assert len(self) <= _msym, f"Abinit takes at most {_msym} symmetry operations (got {len(self)}): the cell is probably not primitive"
+        # Abinit reads each matrix in column-major order
+        return f"""nsym{suffix} {len(self)}
+symrel{suffix} {formatArray(self.rotations.transpose(0,2,1), 9)}
+tnons{suffix} {formatArray(self.translations, 3)}"""
+
+
+def _wrap(x: np.ndarray):
+    """Reduced coordinates (differences) folded in [-0.5, 0.5)"""
+    return x - np.floor(x + 0.5)
+
+
+class _Sites:
+    """Lookup of the atoms by (wrapped) reduced position and species, through sorted keys of the cells of a grid finer than the tolerance"""
+    def __init__(self, x: np.ndarray, types: np.ndarray, tolerance: float) -> None:
+        self.x = x
+        self.types = types
+        self.tol = tolerance
+        self.n = max(1, int(1/tolerance))
+        self.species = int(types.max()) + 1
+        keys = self._keys(np.floor(x * self.n).astype(np.int64), types)
+        self.sorter = np.argsort(keys)
+        self.sorted = keys[self.sorter]
+
+    def _keys(self, q: np.ndarray, types: np.ndarray):
+        q = q % self.n
+        return ((q[...,0]*self.n + q[...,1])*self.n + q[...,2])*self.species + types
+
+    def find(self, y: np.ndarray, types: np.ndarray) -> np.ndarray:
+        """Index of the atom of the given species in each position of `y` (within the tolerance), -1 where there is none"""
+        shape = y.shape[:-1]
+        y = y.reshape(-1,3)
+        types = np.broadcast_to(types, shape).reshape(-1)
+        q = np.floor((y % 1.0) * self.n).astype(np.int64)
+        res = np.full(len(y), -1)
+        todo = np.arange(len(y))
+        # the cell of the position first, then the neighbouring ones for the positions not found yet
+        for o in sorted(np.ndindex(3,3,3), key=lambda o: o != (1,1,1)):
+            keys = self._keys(q[todo] + np.array(o) - 1, types[todo])
+            pos = np.minimum(np.searchsorted(self.sorted, keys), len(self.sorted) - 1)
+            j = self.sorter[pos]
+            ok = (self.sorted[pos] == keys) & np.all(np.abs(_wrap(self.x[j] - y[todo])) <= self.tol, axis=-1)
+            res[todo[ok]] = j[ok]
+            todo = todo[~ok]
+            if len(todo) == 0:
+                break
+        return res.reshape(shape)
+
+
+_groups: dict[bytes, SymmetryOperations] = {}
+_cached = 64
+
+
+def spaceGroup(basis: AtomBasis, lattice: Lattice, tolerance: float = 1e-5) -> SymmetryOperations:
+    """Finds the symmetry operations (rotations and fractional translations) of the crystal, i.e. the ones that send each atom onto an atom of the same species
+    within `tolerance` (in reduced coordinates, like Abinit's `tolsym`). The identity comes first.
+    Cells that are not primitive also have pure translations, combined with every rotation: since Abinit takes at most 384 operations (`msym`), writing larger groups fails
+    (use the primitive cell, or `nsym 1`), while their rotations can still be used to reduce k-points.
+
+    Results are cached by the content of the structure, so that datasets (or campaigns) reusing a structure compute them once.
+
+    ## Example
+    ```python
+    b, l = supercell(*ZincBlendeLike(Ga, As, 0.565*nm), (2,2,1), substitutions={ Al: [0] })
+    sym = spaceGroup(b, l)
+    base = DataSet(b, l, sym, ...)
+    kpts, weights = grid.kpoints(l, sym.rotations)
+    ```"""
+    assert tolerance > 0, "Tolerance must be positive"
+    a = lattice.primitiveVectors()
+    x = basis.positions @ np.linalg.inv(a) if basis.cartesian else basis.positions
+    x = x % 1.0
+    types = basis.types
+    key = hashlib.sha1(b"".join((a.tobytes(), types.astype(np.int64).tobytes(), x.tobytes(), np.float64(tolerance).tobytes()))).digest()
+    res = _groups.get(key)
+    if res is not None:
+        return res
+
+    rot = lattice.pointGroup()
+    sites = _Sites(x, types, tolerance)
+    # candidates send an atom of the least frequent species onto an atom of the same species
+    counts = np.bincount(types)
+    rare = int(np.argmin(np.where(counts > 0, counts, len(types) + 1)))
+    targets = x[types == rare]
+    # a few atoms discard most of the candidates, then all of them are checked (in chunks)
+    order = np.argsort(np.arange(len(x)) % max(1, len(x)//8), kind="stable")
+
+    def check(r: np.ndarray, t: np.ndarray):
+        step = 8
+        start = 0
+        while len(r) > 0 and start < len(x):
+            atoms = order[start:start+step]
+            found = sites.find(np.einsum("nij,aj->nai", rot[r], x[atoms]) + t[:,None,:], types[atoms][None,:])
+            keep = np.all(found >= 0, axis=1)
+            r, t = r[keep], t[keep]
+            start += step
+            step = max(8, (1 << 22) // max(1, len(r)))
+        # refine the translations as the mean displacement of the atoms onto their images
+        images = np.einsum("nij,aj->nai", rot[r], x) + t[:,None,:]
+        found = sites.find(images, types[None,:])
+        t = _wrap(t + _wrap(x[found] - images).mean(axis=1))
+        t[np.abs(t) < tolerance] = 0.0
+        return r, t
+
+    # pure translations (identity rotation): more than one if the cell is not primitive
+    _, pure = check(np.zeros(len(targets), dtype=np.intp), _wrap(targets - targets[0]))
+    pureSites = _Sites(_wrap(pure) % 1.0, np.zeros(len(pure), dtype=np.intp), tolerance)
+    t = _wrap(targets[None,:,:] - (rot[1:] @ targets[0])[:,None,:])   # (nrot-1, ntargets, 3)
+    r = np.repeat(np.arange(1, len(rot)), len(targets))
+    t = t.reshape(-1,3)
+    if len(pure) > 1:
+        # candidates (of the same rotation) differing by a pure translation are equivalent: one per coset is checked
+        keep = []
+        for i in range(1, len(rot)):
+            left = np.flatnonzero(r == i)
+            while len(left) > 0:
+                j = left[0]
+                keep.append(j)
+                left = left[pureSites.find(t[left] - t[j], np.zeros(len(left), dtype=np.intp)) < 0]
+        r, t = r[keep], t[keep]
+    r, t = check(r, t)
+    r = np.concatenate((np.zeros(1, dtype=np.intp), r))
+    t = np.concatenate((np.zeros((1,3)), t))
+    # every operation combined with every pure translation
+    if len(pure) > 1:
+        r = np.repeat(r, len(pure))
+        t = _wrap((t[:,None,:] + pure[None,:,:]).reshape(-1,3))
+        t[np.abs(t) < tolerance] = 0.0
+    # identity first
+    first = np.lexsort((np.any(np.abs(t) > 0, axis=1), r))
+    res = SymmetryOperations(rot[r[first]], t[first])
+    if len(_groups) >= _cached:
+        del _groups[next(iter(_groups))]
+    _groups[key] = res
+    return res
@@ -9,5 +9,7 @@ from .internal import (
     SymmetricGrid,
     AutomaticGrid,
     UsualKShifts,
-    Path
+    Path,
+    kpointDivisions,
+    densityGrids,
 )
\ No newline at end of file
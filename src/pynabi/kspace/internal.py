@@ -2,9 +2,15 @@
 WARNING: do not import this file directly!
 """
 
-from pynabi._common import Vec3D as Vec3D, Stampable as Stampable, _pos_int, CanDelay as CanDelay, Delayed as Delayed, Later as Later
-from typing import Dict as Dict, Union as Union, Tuple as Tuple, Iterable as Iterable
+from pynabi._common import Vec3D as Vec3D, Stampable as Stampable, _pos_int, CanDelay as CanDelay, Delayed as Delayed, Later as Later, formatArray, formatVectors
+from typing import Dict as Dict, Union as Union, Tuple as Tuple, Iterable as Iterable, Optional, Sequence
 from enum import Enum as Enum
+from fractions import Fraction
+from math import gcd, lcm
+import numpy as np
+from pynabi.crystal.internal import Lattice, SymmetryOperations
+from pynabi.units.internal import Length
+from numpy.typing import ArrayLike
 
 
 class BrillouinZone(Enum):
@@ -86,16 +92,21 @@ class UsualKShifts(Enum):
 
 
 class ManualGrid(Stampable):
-    def __init__(self, *points: Vec3D, normalize: float = 1.0) -> None:
+    def __init__(self, *points: Vec3D, normalize: float = 1.0, weights: Optional[Sequence[float]] = None) -> None:
+        """`weights` of the k-points (`wtk`) are optional: Abinit normalizes them and, if not given, uses equal weights"""
         assert all(type(v) is Vec3D for v in points), "Points of the manual grid must be Vec3D"
         assert normalize >= 1, "k-points normalization faction cannot be lower than 1"
+        assert weights is None or len(weights) == len(points), "There must be one weight per k-point"
         self.p = points
         self.n = normalize
+        self.w = None if weights is None else tuple(weights)
     
     def stamp(self, index: int):
         s = index or ''
-        kpt = "   ".join(str(v) for v in self.p)
-        return f"kptopt{s} 0\nnkpt{s} {len(self.p)}\nkpt{s} {kpt}\nkptnrm{s} {self.n}"
+        res = f"kptopt{s} 0\nnkpt{s} {len(self.p)}\nkpt{s} {formatVectors(self.p)}\nkptnrm{s} {self.n}"
+        if self.w is not None:
+            res += f"\nwtk{s} {formatArray(self.w)}"
+        return res
 
 
 def _parse_shifts(value: Tuple[Vec3D,...]|UsualKShifts) -> Tuple[Vec3D,...]:
@@ -121,7 +132,7 @@ class _D_grid_points(CanDelay.info):
             raise TypeError(f"{self.name} must be either a positive integer or a tuple of 3 positive integers")
 
     def stamp(self, suffix, value):
-        return f"{self.prop}{suffix} {value[0]} {value[1]} {value[2]}"
+        return f"{self.prop}{suffix} {formatArray(value)}"
 
 
 class _D_super_lattice(CanDelay.info):
@@ -134,8 +145,7 @@ class _D_super_lattice(CanDelay.info):
             raise TypeError(f"{self.name} must be three Vec3D")
     
     def stamp(self, suffix, value):
-        s = '  '.join(str(v) for v in value)
-        return f"{self.prop}{suffix} {s}"
+        return f"{self.prop}{suffix} {formatVectors(value)}"
 
 
 class SymmetricGrid(CanDelay):
@@ -160,19 +170,65 @@ class SymmetricGrid(CanDelay):
         assert self.type == -1, "Symmetric grid type redefined"
         self.type = 0
         self._dv = (self._delayables[0].laterOrSanitized(gridPointsNumber), Later())
+        self.invalidate()
         return self
     
     def fromSuperLattice(self, a: Vec3D, b: Vec3D, c: Vec3D):
         assert self.type == -1, "Symmetric grid type redefined"
         self.type = 1
         self._dv = (Later(), self._delayables[1].laterOrSanitized((a,b,c)))
+        self.invalidate()
         return self
     
     def stamp(self, index: int):
         s = index or ''
-        shift = " ".join(str(t) for t in self.shi)
-        return f"kptopt{s} {self.sym.value}\nnshiftk{s} {len(self.shi)}\nshiftk{s} {shift}\n{super().stamp(index)}"
+        return f"kptopt{s} {self.sym.value}\nnshiftk{s} {len(self.shi)}\nshiftk{s} {formatVectors(self.shi)}\n{super().stamp(index)}"
     
+    def kpoints(self, lattice: Lattice, symrel: Union[np.ndarray,SymmetryOperations,None] = None, grid: Union[int,tuple[int,int,int],tuple[Vec3D,Vec3D,Vec3D],None] = None) -> tuple[np.ndarray, np.ndarray]:
+        """Computes the k-points Abinit will use, returning the (nkpt,3) array of their reduced coordinates and their weights (summing to 1).
+
+        The full grid (with the shifts) is reduced according to the symmetry of the Brillouin zone, using the rotations `symrel` (in reduced coordinates of the real space),
+        which default to the point group of the lattice: pass the ones of the crystal (e.g. the result of `spaceGroup`) when its symmetry is lower.
+        `grid` is the number of grid points (or super lattice vectors) when they are delayed to the datasets.
+
+        ## Example
+        ```python
+        kpts, weights = SymmetricGrid(BZ.Irreducible, UsualKShifts.FCC).ofMonkhorstPack(8).kpoints(Lattice.FCC(0.5*nm))
+        ```"""
+        m = self._superLattice(grid)
+        shifts = np.array([(v.x, v.y, v.z) for v in self.shi] or [(0.0, 0.0, 0.0)])
+        if self.sym in (BrillouinZone.Irreducible, BrillouinZone.NoTimeReversal):
+            if symrel is None:
+                rot = lattice.pointGroup()
+            else:
+                rot = symrel.rotations if isinstance(symrel, SymmetryOperations) else np.asarray(symrel)
+            # rotations act on reciprocal reduced coordinates as the inverse transpose
+            ops = np.rint(np.linalg.inv(rot).transpose(0,2,1)).astype(np.int64)
+        else:
+            ops = np.eye(3, dtype=np.int64)[None]
+        if self.sym in (BrillouinZone.Irreducible, BrillouinZone.Half):
+            ops = np.concatenate((ops, -ops)) # time reversal
+        return _reduce(m, shifts, ops)
+
+    def toManualGrid(self, lattice: Lattice, symrel: Union[np.ndarray,SymmetryOperations,None] = None, grid: Union[int,tuple[int,int,int],tuple[Vec3D,Vec3D,Vec3D],None] = None):
+        """Explicit grid of the k-points (with their weights) computed by `kpoints`"""
+        k, w = self.kpoints(lattice, symrel, grid)
+        return ManualGrid(*(Vec3D(*v) for v in k.tolist()), weights=w.tolist())
+
+    def _superLattice(self, grid) -> np.ndarray:
+        """Integer matrix whose rows are the vectors of the super lattice (in reduced coordinates)"""
+        assert self.type != -1, "Symmetric grid type not defined"
+        if grid is None:
+            grid = self._dv[self.type]
+            assert grid is not Later._instance, "Grid is delayed: it must be given"
+        else:
+            grid = self._delayables[self.type].sanitize(grid)
+        if self.type == 0:
+            return np.diag(grid)
+        m = np.array([(v.x, v.y, v.z) for v in grid])
+        assert np.allclose(m, np.rint(m)) and round(abs(np.linalg.det(m))) > 0, "Super lattice vectors must be independent integer vectors"
+        return np.rint(m).astype(np.int64)
+
     @classmethod
     def setMPgridPointNumber(cls, num: int|tuple[int,int,int]):
         """Sets the number of k points in the Monkhorst-Pack grid"""
@@ -187,7 +243,8 @@ class SymmetricGrid(CanDelay):
 class AutomaticGrid(Stampable):
     """ABINIT will automatically generate a large set of possible k point grids, and select among this set, the grids that give a length of smallest vector larger than the provided lenght.
     
-    Note that this procedure can be time-consuming. It is worth doing it once for a given unit cell and set of symmetries, but not use this procedure by default. The best is then to use `AbOut().KPointsSets()`, in order to get a detailed analysis of the set of grids."""
+    Note that this procedure can be time-consuming. It is worth doing it once for a given unit cell and set of symmetries, but not use this procedure by default. The best is then to use `AbOut().KPointsSets()`, in order to get a detailed analysis of the set of grids.
+    To choose the grid from a target density without running Abinit (e.g. for many structures), see `densityGrids`."""
 
     def __init__(self, symmetry: BrillouinZone, length: float = 30.0):
         self.sym = symmetry
@@ -198,6 +255,70 @@ class AutomaticGrid(Stampable):
         return f"kptopt{s} {self.sym.value}\nkptrlen{s} {self.len}"
 
 
+def _cells(lattices: Union[Lattice,Sequence[Lattice],np.ndarray]) -> np.ndarray:
+    """(M,3,3) array of the primitive vectors (rows, in Bohr) of the lattices"""
+    if isinstance(lattices, Lattice):
+        return lattices.primitiveVectors()[None]
+    if isinstance(lattices, np.ndarray):
+        assert lattices.ndim in (2,3) and lattices.shape[-2:] == (3,3), "Primitive vectors must be an array of shape (3,3) or (M,3,3)"
+        return lattices.reshape(-1,3,3).astype(float)
+    return np.array([l.primitiveVectors() for l in lattices]).reshape(-1,3,3)
+
+
+def kpointDivisions(lattices: Union[Lattice,Sequence[Lattice],np.ndarray], perLength: Optional[ArrayLike] = None, perAtom: Optional[ArrayLike] = None, atoms: Optional[ArrayLike] = None) -> np.ndarray:
+    """Computes at once the number of grid points (`ngkpt`) of many lattices (or an (M,3,3) array of their primitive vectors in Bohr) from a target density, returning an (M,3) integer array.
+    The density is given either as:
+     - `perLength`, k points per Å⁻¹ along each reciprocal vector (including 2π): the divisions are the smallest ones whose spacing does not exceed 1/`perLength`
+     - `perAtom`, k points per reciprocal atom (i.e. the total number of k points times the number of `atoms` of the cell), divided among the reciprocal vectors proportionally to their length
+    
+    Densities and numbers of atoms can be scalars or one value per lattice."""
+    assert (perLength is None) != (perAtom is None), "Exactly one of perLength and perAtom must be given"
+    cells = _cells(lattices)
+    # lengths of the reciprocal vectors in 1/Angstrom
+    b = np.linalg.norm(2*np.pi*np.linalg.inv(cells), axis=-2) / Length._U[0][0]
+    if perLength is not None:
+        density = np.asarray(perLength, dtype=float).reshape(-1,1)
+        assert np.all(density > 0), "Density must be positive"
+        n = np.ceil(b * density - 1e-9)
+    else:
+        assert atoms is not None, "The number of atoms is needed for a density per reciprocal atom"
+        density = np.asarray(perAtom, dtype=float).reshape(-1)
+        natom = np.asarray(atoms, dtype=float).reshape(-1)
+        assert np.all(density > 0) and np.all(natom > 0), "Density and number of atoms must be positive"
+        total = density / natom
+        n = np.rint(b * np.cbrt(total / np.prod(b, axis=1))[:,None])
+    return np.maximum(n, 1).astype(int)
+
+
+def _hexagonal(cells: np.ndarray, tolerance: float = 1e-5) -> np.ndarray:
+    """Whether each cell has two primitive vectors of the same length at 60 or 120 degrees, both orthogonal to the third one"""
+    g = cells @ cells.transpose(0,2,1)
+    res = np.zeros(len(cells), dtype=bool)
+    for i, j, k in ((0,1,2), (1,2,0), (0,2,1)):
+        t = tolerance*g[:,i,i]
+        plane = (np.abs(g[:,i,i] - g[:,j,j]) <= t) & (np.abs(np.abs(g[:,i,j]) - 0.5*g[:,i,i]) <= t)
+        res |= plane & (np.abs(g[:,i,k]) <= t) & (np.abs(g[:,j,k]) <= t)
+    return res
+
+
+def densityGrids(lattices: Union[Lattice,Sequence[Lattice],np.ndarray], perLength: Optional[ArrayLike] = None, perAtom: Optional[ArrayLike] = None, atoms: Optional[ArrayLike] = None,
+                 symmetry: BrillouinZone = BrillouinZone.Irreducible, shifts: Union[Tuple[Vec3D,...],UsualKShifts,None] = None) -> list[SymmetricGrid]:
+    """Monkhorst-Pack grids of many lattices with the number of points given by `kpointDivisions`, an alternative to `AutomaticGrid` that does not need Abinit's search.
+    Unless `shifts` are given, grids of hexagonal cells are centered in Gamma (shifted grids would break their symmetry) and the others are shifted by (0.5,0.5,0.5).
+
+    ## Example
+    ```python
+    structures = [ZincBlendeLike(Ga, As, a*Ang) for a in np.linspace(5.5, 5.8, 1000)]
+    grids = densityGrids([l for _,l in structures], perAtom=1000, atoms=2)
+    ```"""
+    cells = _cells(lattices)
+    n = kpointDivisions(cells, perLength, perAtom, atoms)
+    if shifts is None:
+        gamma = _hexagonal(cells).tolist()
+        return [SymmetricGrid(symmetry, UsualKShifts.Unshifted if g else UsualKShifts.Default).ofMonkhorstPack(tuple(v)) for v,g in zip(n.tolist(), gamma)]
+    return [SymmetricGrid(symmetry, shifts).ofMonkhorstPack(tuple(v)) for v in n.tolist()]
+
+
 def _parse_crit_point(c: str, s: dict[str,Vec3D]):
     if c == 'G':
         return Vec3D.zero()
@@ -207,10 +328,32 @@ def _parse_crit_point(c: str, s: dict[str,Vec3D]):
         return s[c]
 
 
+def _parse_path_points(points: str|Iterable[Union[str,Vec3D]], pointSet: CriticalPointsOf|Dict[str,Vec3D]):
+    s: dict[str,Vec3D] = pointSet.value if type(pointSet) is CriticalPointsOf else pointSet  # type: ignore
+    b: list[Vec3D] = []
+    for p in points:
+        if type(p) is str:
+            for c in p:
+                b.append(_parse_crit_point(c,s))
+        elif type(p) is Vec3D:
+            b.append(p)
+        else:
+            raise TypeError(f"Invalid type of k-path point (got {type(p)})")
+    assert len(b) > 1, "Number of boundaries must be at least 2 (i.e. one segment)"
+    return b
+
+
+def _segment_lengths(points: Sequence[Vec3D], lattice: Lattice) -> np.ndarray:
+    """Lengths of the segments between consecutive (reduced) k points in the cartesian reciprocal space"""
+    recip = 2*np.pi*np.linalg.inv(lattice.primitiveVectors()).T
+    b = np.array([(p.x, p.y, p.z) for p in points]) @ recip
+    return np.linalg.norm(np.diff(b, axis=0), axis=1)
+
+
 class Path(Stampable):
     """A path though points in the reciprocal space"""
 
-    def __init__(self, points: list[Vec3D]|tuple[Vec3D], prop: str, val: str) -> None:
+    def __init__(self, points: list[Vec3D]|tuple[Vec3D], prop: str, val: list[int]) -> None:
         """DO NOT USE this constructor"""
         super().__init__()
         self.points = points
@@ -219,8 +362,7 @@ class Path(Stampable):
     
     def stamp(self, index: int):
         s = index or ''
-        bounds = '  '.join(str(v) for v in self.points)
-        return f"kptopt{s} {1-len(self.points)}\nkptbounds{s} {bounds}\n{self.prop}{s} {self.val}"
+        return f"kptopt{s} {1-len(self.points)}\nkptbounds{s} {formatVectors(self.points)}\n{self.prop}{s} {formatArray(self.val)}"
 
     @staticmethod
     def auto(minDivisions: int, points: str|Iterable[Union[str,Vec3D]], pointSet: CriticalPointsOf|Dict[str,Vec3D] = {}):
@@ -252,18 +394,55 @@ class Path(Stampable):
         p4 = Path.auto(10, "GABGC", ccp) # note that 'G' is always (0,0,0)
         ```"""
         assert _pos_int(minDivisions), "Smallest division must be a positive integer"
-        s: dict[str,Vec3D] = pointSet.value if type(pointSet) is CriticalPointsOf else pointSet  # type: ignore
-        b: list[Vec3D] = []
-        for p in points:
-            if type(p) is str:
-                for c in p:
-                    b.append(_parse_crit_point(c,s))
-            elif type(p) is Vec3D:
-                b.append(p)
-            else:
-                raise TypeError(f"Invalid type of k-path point (got {type(p)})")
-        assert len(b) > 1, "Number of boundaries must be at least 2 (i.e. one segment)"
-        return Path(b, "ndivsm", str(minDivisions))
+        return Path(_parse_path_points(points, pointSet), "ndivsm", [minDivisions])
+    
+    @staticmethod
+    def even(total: int, lattice: Lattice, points: str|Iterable[Union[str,Vec3D]], pointSet: CriticalPointsOf|Dict[str,Vec3D] = {}):
+        """Path through k points (given as in `auto`) made of `total` points evenly spaced along it, according to the lengths of the segments in the
+        cartesian reciprocal space of `lattice` (so that anisotropic cells, e.g. `HEX` or `BCT`, are sampled with the same density along all the directions).
+        Each segment has at least one division.
+
+        ## Example
+        ```python
+        l = Lattice.HEX(3.2*Ang, 5.2*Ang)
+        p = Path.even(200, l, "GMKGALHA", CriticalPointsOf.HEX)
+        grid = p.toManualGrid(l) # explicit list of the 200 k points
+        ```"""
+        assert _pos_int(total), "Total number of points must be a positive integer"
+        b = _parse_path_points(points, pointSet)
+        lengths = _segment_lengths(b, lattice)
+        assert np.all(lengths > 0), "Consecutive points of the path must be different"
+        assert total > len(lengths), f"Total number of points must be larger than the number of segments ({len(lengths)})"
+        # largest remainder apportionment of the divisions, at least one per segment
+        ideal = (total - 1) * lengths / lengths.sum()
+        d = np.maximum(np.floor(ideal).astype(int), 1)
+        while d.sum() < total - 1:
+            d[np.argmax(ideal - d)] += 1
+        while d.sum() > total - 1:
+            d[np.argmin(np.where(d > 1, ideal - d, np.inf))] -= 1
+        return Path(b, "ndivk", d.tolist())
+    
+    def divisions(self, lattice: Optional[Lattice] = None) -> list[int]:
+        """Number of divisions of each segment; `lattice` is needed for paths built with `auto`, whose divisions are computed by Abinit from the lengths of the segments"""
+        if self.prop == "ndivk":
+            return list(self.val)
+        assert lattice is not None, "The lattice is needed to compute the divisions of the segments"
+        lengths = _segment_lengths(self.points, lattice)
+        smallest = lengths[lengths > 0].min()
+        return [max(int(np.floor(self.val[0] * v / smallest + 0.5)), 1) if v > 0 else 1 for v in lengths.tolist()]
+    
+    def kpoints(self, lattice: Optional[Lattice] = None) -> np.ndarray:
+        """(nkpt,3) array of the reduced coordinates of the k points along the path (see `divisions` for `lattice`)"""
+        b = np.array([(v.x, v.y, v.z) for v in self.points])
+        res = [b[:1]]
+        for i, n in enumerate(self.divisions(lattice)):
+            t = np.arange(1, n + 1)[:,None] / n
+            res.append(b[i] + t * (b[i+1] - b[i]))
+        return np.concatenate(res)
+    
+    def toManualGrid(self, lattice: Optional[Lattice] = None):
+        """Explicit list of the k points computed by `kpoints`"""
+        return ManualGrid(*(Vec3D(*v) for v in self.kpoints(lattice).tolist()))
     
     @staticmethod
     def manual(*args: int|Vec3D|str, pointSet: CriticalPointsOf|Dict[str,Vec3D] = {}):
@@ -311,7 +490,121 @@ class Path(Stampable):
             p.append(last) # type: ignore
         else:
             raise TypeError(f"Last element must be a vector or a critical point name")
-        return Path(p, "ndivk", ' '.join(str(v) for v in d))
-
-
-_exclusives = (ManualGrid, SymmetricGrid, AutomaticGrid, Path)
\ No newline at end of file
+        return Path(p, "ndivk", d)
+
+
+_exclusives = (ManualGrid, SymmetricGrid, AutomaticGrid, Path)
+
+def _denominator(values: np.ndarray, limit: int = 64):
+    """Least common denominator of small fractions, None if some value is not one of them"""
+    res = 1
+    for v in values.ravel().tolist():
+        f = Fraction(v).limit_denominator(limit)
+        if abs(float(f) - v) > 1e-9:
+            return None
+        res = lcm(res, f.denominator)
+    return res
+
+
+def _generators(ops: np.ndarray):
+    """A small subset of the group of operations `ops` that generates it"""
+    identity = np.eye(3, dtype=ops.dtype)
+    group = { identity.tobytes(): identity }
+    gens: list[np.ndarray] = []
+    for op in ops:
+        if op.tobytes() in group:
+            continue
+        gens.append(op)
+        frontier = list(group.values())
+        while len(frontier) > 0:
+            new = {}
+            for a in frontier:
+                for g in gens:
+                    b = a @ g
+                    if b.tobytes() not in group:
+                        new[b.tobytes()] = b
+            group.update(new)
+            frontier = list(new.values())
+    return gens
+
+
+def _reduce(m: np.ndarray, shifts: np.ndarray, ops: np.ndarray):
+    """Irreducible k-points (and weights) of the grid of the super lattice `m` with the given shifts, under the group of (reciprocal) operations `ops`"""
+    n = round(abs(np.linalg.det(m)))
+    adj = np.rint(np.linalg.inv(m) * n).astype(np.int64)
+    if np.count_nonzero(m - np.diag(np.diag(m))) == 0:
+        # Monkhorst-Pack grid
+        box = np.stack(np.meshgrid(*(np.arange(abs(v)) for v in np.diag(m)), indexing="ij"), -1).reshape(-1,3)
+    else:
+        # integer points of the box containing the cell spanned by the rows of m (duplicates are dropped below)
+        lo = np.minimum(m, 0).sum(axis=0)
+        hi = np.maximum(m, 0).sum(axis=0)
+        box = np.stack(np.meshgrid(*(np.arange(a, b + 1) for a,b in zip(lo, hi)), indexing="ij"), -1).reshape(-1,3)
+    d = _denominator(shifts)
+    table = None
+    if d is None:
+        # irrational shifts: points are compared after rounding
+        points = np.concatenate([((box + s) @ adj.T / n) % 1.0 for s in shifts])
+        keys = lambda x: _float_keys(x % 1.0)
+        k = points
+    else:
+        # exact integer numerators of the reduced coordinates of (box + shift) @ inv(m).T
+        num = np.concatenate([((box*d + np.rint(s*d).astype(np.int64)) @ adj.T) % (n*d) for s in shifts])
+        g = int(np.gcd.reduce(np.append(num.ravel(), n*d)))
+        den = n*d // g
+        points = num // g
+        keys = lambda q: ((q[:,0] % den)*den + q[:,1] % den)*den + q[:,2] % den
+        k = points / den
+    own = keys(points)
+    _, first = np.unique(own, return_index=True)
+    if len(first) < len(points):
+        first.sort() # keep the points in order of generation
+        points, k, own = points[first], k[first], own[first]
+    total = len(k)
+    if d is not None and den**3 <= 1 << 25:
+        table = np.full(den**3, total)
+        table[own] = np.arange(total)
+    else:
+        sorter = np.argsort(own)
+        sortedKeys = own[sorter]
+
+    def index(img: np.ndarray):
+        if table is not None:
+            return table[img]
+        pos = np.searchsorted(sortedKeys, img)
+        pos[pos == total] = 0
+        return np.where(sortedKeys[pos] == img, sorter[pos], total)
+
+    def images(op: np.ndarray):
+        return index(keys(points @ op.T))
+
+    # operations that map the grid onto itself (checked on a sample, then on all points for the generators) act by permutations:
+    # the smallest index of each orbit spreads along the generators
+    sample = points[np.linspace(0, total-1, min(total, 64)).astype(int)]
+    invariant = [op for op in ops if np.all(index(keys(sample @ op.T)) < total)]
+    moved = [images(g) for g in _generators(np.array(invariant))] if len(invariant) > 0 else []
+    if any(np.any(i == total) for i in moved):
+        invariant, moved = [], []
+    rep = np.arange(total)
+    changed = len(moved) > 0
+    while changed:
+        prev = rep
+        for i in moved:
+            rep = np.minimum(rep, rep[i])
+        changed = not np.array_equal(rep, prev)
+    # any other operation g maps only some points onto the grid: the orbit of k also contains the images g*h*k for h invariant
+    covered = { op.tobytes() for op in invariant }
+    for g in ops:
+        if g.tobytes() in covered:
+            continue
+        covered.update((g @ h).tobytes() for h in invariant)
+        smallest = np.full(total, total)
+        np.minimum.at(smallest, rep, images(g))
+        rep = np.minimum(rep, smallest[rep])
+    reps, counts = np.unique(rep, return_counts=True)
+    return k[reps], counts / total
+
+
+def _float_keys(k: np.ndarray):
+    q = np.rint(k * 1e6).astype(np.int64) % 1000000
+    return (q[:,0]*1000000 + q[:,1])*1000000 + q[:,2]
@@ -2,7 +2,7 @@
 WARNING: do not import this file directly!
 """
 
-from pynabi._common import Stampable, StampCollection, CanDelay, Delayed, Later, _pos_int, _pos0_int, DelayedInfo
+from pynabi._common import Stampable, StampCollection, CanDelay, Delayed, Later, _pos_int, _pos0_int, DelayedInfo, formatArray
 from pynabi.units.internal import Energy
 from typing import Union, Tuple, Literal, Optional
 from enum import Enum
@@ -192,38 +192,29 @@ class OccupationPerBand(Stampable):
         
     def compatible(self, coll: StampCollection):
         spin = coll.get(SpinPolarization)
-        if spin is None or spin.polarizationNumber == 1:
-            self._d = False
+        d = spin is not None and spin.polarizationNumber != 1
+        if not d:
             assert all(type(v) is float for v in self._o), "Since the spin is not polarized, ony one occupation per band must be given"
-        else:
-            self._d = True
+        if d != self._d:
+            self._d = d
+            self.invalidate()
     
     def stamp(self, index: int):
-        o = ''
-        b = 1
         if self._r == 0:
             b = len(self._o)
             if self._d:
-                s1 = [0.0]*b
-                s2 = [0.0]*b
-                for i,o in enumerate(self._o):
-                    if type(o) is tuple:
-                        s1[i] = o[0]
-                        s2[i] = o[1]
-                    else:
-                        s1[i] = s2[i] = o # type: ignore
-                o = ' '.join(str(v) for v in s1) + ' ' + ' '.join(str(v) for v in s2)
+                s1 = [v[0] if type(v) is tuple else v for v in self._o]
+                s2 = [v[1] if type(v) is tuple else v for v in self._o]
+                o = formatArray(s1 + s2)
             else:
-                o = ' '.join(str(o) for o in self._o)
+                o = formatArray(self._o) # type: ignore
         else:
             b = self._r
+            v = self._o[0]
             if self._d:
-                if type(self._o[0]) is tuple:
-                    o = f"{self._r}*{self._o[0][0]} {self._r}*{self._o[0][1]}"
-                else:
-                    o = f"{self._r*2}*{self._o[0]}"
+                o = formatArray([v[0]]*b + [v[1]]*b if type(v) is tuple else [v]*(2*b))
             else:
-                o = f"{self._r}*{self._o[0]}"
+                o = formatArray([v]*b) # type: ignore
         s = index or ''
         return f"occopt{s} 0\nocc{s} {o}\nband{s} {b}"
     
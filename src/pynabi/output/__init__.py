@@ -0,0 +1,16 @@
+"""
+PynAbi submodule for anything related to the files produced by Abinit (main output file, trajectories, density and potential grids)
+"""
+
+from .internal import (
+    parseAbo,
+    AboRecord,
+    DatasetHeader,
+    SCFIteration,
+    TotalEnergy,
+    Forces,
+    Stress,
+    Trajectory,
+    GridFile,
+    checkGridFiles
+)
@@ -0,0 +1,383 @@
+"""
+WARNING: do not import this file directly!
+"""
+
+from typing import NamedTuple, Iterator, Union, Type, Optional
+from heapq import merge
+import mmap
+import os
+import re
+import numpy as np
+from .._dataset import DataSet, AbIn
+from ..crystal import Lattice
+from ..occupation.internal import SpinPolarization, SpinType
+
+
+class DatasetHeader(NamedTuple):
+    """Start of the output of a dataset"""
+    dataset: int
+    offset: int
+
+
+class SCFIteration(NamedTuple):
+    """One iteration of a SCF cycle: `residuals` maps the names of the remaining columns (e.g. `residm`, `vres2`, `diffor`) to their values"""
+    dataset: int
+    offset: int
+    iteration: int
+    etot: float
+    deltaE: float
+    residuals: dict[str, float]
+
+
+class TotalEnergy(NamedTuple):
+    """Total energy (Ha) at the end of a SCF cycle"""
+    dataset: int
+    offset: int
+    etotal: float
+
+
+class Forces(NamedTuple):
+    """Cartesian forces (Ha/Bohr) on the atoms at the end of a SCF cycle, with shape (natom, 3)"""
+    dataset: int
+    offset: int
+    forces: np.ndarray
+
+
+class Stress(NamedTuple):
+    """Cartesian stress tensor (Ha/Bohr^3) at the end of a SCF cycle, in Voigt order (11, 22, 33, 23, 13, 12)"""
+    dataset: int
+    offset: int
+    stress: np.ndarray
+
+
+AboRecord = Union[DatasetHeader, SCFIteration, TotalEnergy, Forces, Stress]
+
+
+# patterns start with a literal newline (rather than ^) so that they are searched for with a fast prefix scan
+_patterns: dict[type, re.Pattern[bytes]] = {
+    DatasetHeader: re.compile(rb"\n== DATASET\s+(\d+) ="),
+    SCFIteration: re.compile(rb"\n ETOT\s+(\d+)\s+(\S+)\s+(\S+)([^\n]*)"),
+    TotalEnergy: re.compile(rb"\n >>>>>>>>> Etotal=\s*(\S+)"),
+    Forces: re.compile(rb"\n cartesian forces \(hartree/bohr\) at end:\n((?:[ \t]+\d+(?:[ \t]+\S+){3}\n)+)"),
+    Stress: re.compile(rb"\n Cartesian components of stress tensor \(hartree/bohr\^3\)\n((?:[^\n]*sigma[^\n]*\n){3})"),
+}
+_columns = re.compile(rb"\n\s+iter\s+Etot\(hartree\)\s+deltaE\(h\)([^\n]*)")
+_sigma = re.compile(rb"sigma\((\d) (\d)\)=\s*(\S+)")
+_voigt = { (1,1): 0, (2,2): 1, (3,3): 2, (3,2): 3, (3,1): 4, (2,1): 5 }
+_exponent = re.compile(rb"([0-9.])([+-]\d{3})$")
+
+
+def _float(s: bytes) -> float:
+    """Parses a Fortran real, which may lack the `E` when the exponent has three digits (e.g. `1.0-100`)"""
+    try:
+        return float(s)
+    except ValueError:
+        return float(_exponent.sub(rb"\1E\2", s))
+
+
+def _matches(mm: mmap.mmap, kind: object, pattern: re.Pattern[bytes], start: int):
+    for m in pattern.finditer(mm, max(start-1, 0)): # type: ignore
+        yield m.start()+1, kind, m
+
+
+def parseAbo(path: str, *kinds: Type[AboRecord], start: int = 0) -> Iterator[AboRecord]:
+    """Parses the main output file (`.abo`) of Abinit, yielding its records in the order they appear.
+
+    The file is memory-mapped and scanned without loading it, so memory usage does not depend on its size.
+    Only records of the given `kinds` are produced (all of them if none is given); `start` is the byte offset where parsing begins (e.g. the `offset` of a previous record).
+    The `dataset` of each record is the index of the dataset as written by `createAbi` (1 when there are no numbered datasets, 0 before the first dataset header).
+
+    ## Example
+    ```python
+    for r in parseAbo("run.abo", SCFIteration):
+        print(r.dataset, r.iteration, r.etot)
+    ```"""
+    wanted = set(kinds) if len(kinds) > 0 else set(_patterns)
+    assert wanted.issubset(_patterns), "Kinds must be AboRecord classes"
+    with open(path, "rb") as fp:
+        try:
+            mm = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError: # empty file
+            return
+    with mm:
+        yield from _records(mm, wanted, start)
+
+
+def _records(mm: mmap.mmap, wanted: set[type], start: int) -> Iterator[AboRecord]:
+    dataset, columns = _state_before(mm, start)
+    sources = [_matches(mm, k, p, start) for k,p in _patterns.items() if k in wanted or k is DatasetHeader]
+    if SCFIteration in wanted:
+        sources.append(_matches(mm, None, _columns, start))
+    for offset, kind, m in merge(*sources, key=lambda v: v[0]):
+        if kind is DatasetHeader:
+            dataset = int(m[1])
+            if kind in wanted:
+                yield DatasetHeader(dataset, offset)
+        elif kind is None:
+            columns = m[1].decode().split()
+        elif kind is SCFIteration:
+            values = m[4].split()
+            yield SCFIteration(dataset, offset, int(m[1]), _float(m[2]), _float(m[3]), { c: _float(v) for c,v in zip(columns, values) })
+        elif kind is TotalEnergy:
+            yield TotalEnergy(dataset, offset, _float(m[1]))
+        elif kind is Forces:
+            rows = [l.split()[1:4] for l in m[1].splitlines()]
+            yield Forces(dataset, offset, np.array([[_float(v) for v in r] for r in rows]))
+        elif kind is Stress:
+            stress = np.zeros(6)
+            for i, j, v in _sigma.findall(m[1]):
+                stress[_voigt[(int(i), int(j))]] = _float(v)
+            yield Stress(dataset, offset, stress)
+
+
+def _state_before(mm: mmap.mmap, start: int) -> tuple[int, list[str]]:
+    """Index of the last dataset header and names of the last SCF columns before `start`"""
+    dataset = 0
+    columns: list[str] = []
+    if start > 0:
+        pos = mm.rfind(b"\n== DATASET", 0, start)
+        m = None if pos < 0 else _patterns[DatasetHeader].match(mm, pos) # type: ignore
+        if m is not None:
+            dataset = int(m[1])
+        pos = mm.rfind(b"Etot(hartree)", 0, start)
+        pos = -1 if pos < 0 else mm.rfind(b"\n", 0, pos)
+        m = None if pos < 0 else _columns.match(mm, pos) # type: ignore
+        if m is not None:
+            columns = m[1].decode().split()
+    return dataset, columns
+
+
+class GridFile:
+    """Real-space grid (e.g. density `_DEN`, potential `_POT`) written by Abinit as a Fortran binary file.
+
+    The header is parsed for the main settings (`natom`, `ngfft`, `nspden`, `nspinor`, `nsppol`, `rprimd`, `ecut`, ...),
+    while `data` is a read-only view (no copy) of the memory-mapped grid, with shape (nspden, cplex, n1, n2, n3).
+
+    ## Example
+    ```python
+    with GridFile("scf/scfo_DEN") as den:
+        print(den.ngfft, den.data[0,0].mean())
+    ```"""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(path, "rb") as fp:
+            self._mm = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._read()
+        except Exception:
+            self._mm.close()
+            raise
+
+    def _read(self):
+        e, records = _fortranRecords(self._mm)
+        if len(records) < 3:
+            raise ValueError(f"{self.path} is not an Abinit binary file")
+        i4, f8 = e+"i4", e+"f8"
+        o, n = records[0]
+        self.codvsn = self._mm[o:o+n-8].decode(errors="replace").strip()
+        self.headform, self.fform = np.frombuffer(self._mm, dtype=i4, count=2, offset=o+n-8).tolist()
+        o, n = records[1]
+        if n < 18*4 + 16*8:
+            raise ValueError(f"{self.path} has an unknown header format")
+        (self.bantot, self.date, self.intxc, self.ixc, self.natom, n1, n2, n3, self.nkpt,
+            self.nspden, self.nspinor, self.nsppol, self.nsym, self.npsp, self.ntypat, self.occopt, self.pertcase, self.usepaw
+        ) = np.frombuffer(self._mm, dtype=i4, count=18, offset=o).tolist()
+        # copied, so that no view of the map is left behind if the file is rejected
+        reals = np.frombuffer(self._mm, dtype=f8, count=16, offset=o + 18*4).copy()
+        self.ngfft: tuple[int,int,int] = (n1, n2, n3)
+        self.ecut = float(reals[0])
+        self.ecutdg = float(reals[1])
+        self.qptn = reals[4:7]
+        self.rprimd = reals[7:16].reshape(3, 3)
+        """(3,3) array whose rows are the cartesian primitive vectors (in Bohr)"""
+        # the grid follows the header: one record of cplex*nfft reals per density component
+        nfft = n1*n2*n3
+        grid = records[-self.nspden:]
+        size = grid[0][1]
+        if not (size in (8*nfft, 16*nfft) and all(r[1] == size for r in grid)):
+            raise ValueError(f"{self.path} does not end with a real-space grid of {n1}x{n2}x{n3} points")
+        self.cplex = size // (8*nfft)
+        step = size + 8 # payload and markers of a record
+        self.data: np.ndarray = np.ndarray(
+            shape=(self.nspden, self.cplex, n1, n2, n3),
+            dtype=f8,
+            buffer=self._mm, # type: ignore
+            offset=grid[0][0],
+            strides=(step, 8, 8*self.cplex, 8*self.cplex*n1, 8*self.cplex*n1*n2)
+        )
+
+    def close(self):
+        """Releases the memory map: `data` must not be used afterwards"""
+        del self.data
+        self._mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def _fortranRecords(mm: mmap.mmap) -> tuple[str, list[tuple[int,int]]]:
+    """Byte order and (offset, length) of the payload of each record of a Fortran sequential file with 4-byte markers"""
+    size = len(mm)
+    for e in ("<", ">"):
+        res: list[tuple[int,int]] = []
+        pos = 0
+        while pos + 8 <= size:
+            n = int.from_bytes(mm[pos:pos+4], "little" if e == "<" else "big", signed=True)
+            end = pos + 8 + n
+            if n < 0 or end > size or mm[end-4:end] != mm[pos:pos+4]:
+                break
+            res.append((pos+4, n))
+            pos = end
+        if pos == size and len(res) > 0:
+            return e, res
+    raise ValueError("Not a Fortran sequential binary file")
+
+
+def _metric(r: np.ndarray):
+    return r @ r.T
+
+
+def checkGridFiles(dataset: DataSet, base: Optional[DataSet] = None, tolerance: float = 1e-6):
+    """Checks that the density and potential files read by `dataset` (through `AbIn().ElectronDensity(path)` or `AbIn().KSPotential(path)`)
+    are consistent with its cell (`Lattice`) and spin settings (`SpinPolarization`), which default to the ones of `base`.
+    Cells are compared by their metric (lengths and angles), since Abinit may orient them differently.
+
+    Raises a ValueError on the first inconsistency; files that do not exist yet are skipped"""
+    def find(t: type):
+        s = dataset.map.get(t)
+        return base.map.get(t) if s is None and base is not None else s
+    abin: Optional[AbIn] = find(AbIn)
+    if abin is None:
+        return
+    lattice: Optional[Lattice] = find(Lattice)
+    spin: SpinPolarization = find(SpinPolarization) or SpinType.Unpolarized
+    for method, source in abin._d.items():
+        if method._prop not in ("den", "pot") or type(source) is not str or not os.path.isfile(source):
+            continue
+        with GridFile(source) as g:
+            got = (g.nsppol, g.nspinor, g.nspden)
+            expected = (spin.polarizationNumber, spin.spinorNumber, spin.density)
+            if got != expected:
+                raise ValueError(f"{source} has (nsppol, nspinor, nspden) = {got} instead of {expected}")
+            if lattice is not None:
+                m = _metric(lattice.primitiveVectors())
+                if not np.allclose(_metric(g.rprimd), m, rtol=tolerance, atol=tolerance*np.abs(m).max()):
+                    raise ValueError(f"The cell of {source} differs from the one of the dataset")
+
+
+_step = re.compile(rb"\n Total energy \(etotal\) \[Ha\]=\s*(\S+)")
+_vectors = r"((?:(?:[ \t]+[-+.0-9]\S*){3}\n)+)"
+_blocks: dict[str, re.Pattern[bytes]] = {
+    "positions": re.compile((r"\n Cartesian coordinates \(xcart\) \[bohr\]\n" + _vectors).encode()),
+    "forces": re.compile((r"\n Cartesian forces \(fcart\) \[Ha/bohr\][^\n]*\n" + _vectors).encode()),
+    "cell": re.compile((r"\n Real space primitive translations \(rprimd\) \[bohr\]\n" + _vectors).encode()),
+    "stress": re.compile((r"\n Stress tensor in cartesian coordinates \(strten\) \[Ha/bohr\^3\]\n" + _vectors).encode()),
+}
+
+
+def _floats(text: bytes) -> np.ndarray:
+    values = text.split()
+    try:
+        return np.array(values, dtype=float)
+    except ValueError:
+        return np.array([_float(v) for v in values])
+
+
+class Trajectory:
+    """Ionic steps of a molecular dynamics or structural optimization run (`MolecularDynamics`, `StructuralOptimization`), read from the main output file.
+
+    Each step provides the cartesian `positions` and `forces` (natom, 3), the `stress` in Voigt order, the primitive vectors `cell` (3, 3) and the total `energy`,
+    in atomic units (NaN when not printed); steps with a different number of atoms than the first one are skipped. Arrays grow in chunks as steps are read and the ones exposed are views of the steps read so far.
+    `update` reads the steps written since the last call (e.g. during a live run): complete steps are parsed only once, starting from `offset`.
+
+    ## Example
+    ```python
+    t = Trajectory("relax.abo", dataset=2)
+    print(t.energy[-1], np.abs(t.forces[-1]).max())
+    ```"""
+
+    def __init__(self, path: str, dataset: Optional[int] = None, offset: int = 0) -> None:
+        """Reads the steps of the given `dataset` (all of them if None) from byte `offset` onwards"""
+        self.path = path
+        self.dataset = dataset
+        self.offset = offset
+        """Byte offset right after the last step read"""
+        self.natom = 0
+        self._n = 0
+        self._a: dict[str, np.ndarray] = {}
+        self.update()
+
+    def __len__(self):
+        return self._n
+
+    def _array(self, name: str) -> np.ndarray:
+        a = self._a.get(name)
+        return np.empty((0,)) if a is None else a[:self._n]
+
+    positions = property(lambda self: self._array("positions"), doc="Cartesian positions (Bohr) with shape (steps, natom, 3)")
+    forces = property(lambda self: self._array("forces"), doc="Cartesian forces (Ha/Bohr) with shape (steps, natom, 3)")
+    stress = property(lambda self: self._array("stress"), doc="Stress tensor (Ha/Bohr^3) in Voigt order (11, 22, 33, 23, 13, 12) with shape (steps, 6)")
+    cell = property(lambda self: self._array("cell"), doc="Primitive vectors (Bohr) as rows, with shape (steps, 3, 3)")
+    energy = property(lambda self: self._array("energy"), doc="Total energy (Ha) with shape (steps,)")
+
+    def _reserve(self, natom: int):
+        """Makes room for one more step, doubling the capacity when full"""
+        if len(self._a) == 0:
+            self.natom = natom
+            shapes = { "positions": (natom, 3), "forces": (natom, 3), "stress": (6,), "cell": (3, 3), "energy": () }
+            self._a = { k: np.full((64, *s), np.nan) for k,s in shapes.items() }
+        capacity = len(self._a["energy"])
+        if self._n == capacity:
+            for k, a in self._a.items():
+                grown = np.full((2*capacity, *a.shape[1:]), np.nan)
+                grown[:capacity] = a
+                self._a[k] = grown
+
+    def update(self) -> int:
+        """Reads the steps completed since the last call, returning how many were added"""
+        with open(self.path, "rb") as fp:
+            try:
+                mm = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError: # empty file
+                return 0
+        with mm:
+            return self._read(mm)
+
+    def _read(self, mm: mmap.mmap):
+        added = 0
+        dataset, _ = _state_before(mm, self.offset)
+        header = _patterns[DatasetHeader]
+        pos = self.offset
+        for end in _step.finditer(mm, max(pos-1, 0)): # type: ignore
+            for h in header.finditer(mm, pos, end.start()+1): # type: ignore
+                dataset = int(h[1])
+            stop = end.end()
+            if stop == len(mm) or mm[stop:stop+1] != b"\n":
+                break # the line may still be being written
+            if self.dataset is None or self.dataset == dataset:
+                values = { k: _floats(m[1]) for k,p in _blocks.items() if (m := p.search(mm, pos, stop)) is not None } # type: ignore
+                xcart = values.get("positions")
+                if xcart is not None and len(xcart) % 3 == 0 and (self.natom == 0 or len(xcart) == 3*self.natom):
+                    self._reserve(len(xcart) // 3)
+                    i = self._n
+                    a = self._a
+                    a["positions"][i] = xcart.reshape(-1, 3)
+                    a["energy"][i] = _float(end[1])
+                    f = values.get("forces")
+                    if f is not None and len(f) == len(xcart):
+                        a["forces"][i] = f.reshape(-1, 3)
+                    c = values.get("cell")
+                    if c is not None and len(c) == 9:
+                        a["cell"][i] = c.reshape(3, 3)
+                    s = values.get("stress")
+                    if s is not None and len(s) == 9:
+                        s = s.reshape(3, 3)
+                        a["stress"][i] = (s[0,0], s[1,1], s[2,2], s[1,2], s[0,2], s[0,1])
+                    self._n += 1
+                    added += 1
+            pos = self.offset = stop
+        return added
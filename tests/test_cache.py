@@ -0,0 +1,26 @@
+import os
+from pynabi import InputCache, digest
+
+
+def test_store(tmp_path):
+    cache = InputCache(str(tmp_path))
+    key = cache.store("ecut 10\n")
+    assert key == digest("ecut 10\n") and len(key) == 64
+    assert key in cache and digest("ecut 12\n") not in cache
+    assert cache.input(key) == os.path.join(str(tmp_path), key[:2], key, "run.abi")
+    with open(cache.input(key)) as fp:
+        assert fp.read() == "ecut 10\n"
+    mtime = os.stat(cache.input(key)).st_mtime_ns
+    assert cache.store("ecut 10\n") == key
+    assert os.stat(cache.input(key)).st_mtime_ns == mtime
+
+
+def test_done(tmp_path):
+    cache = InputCache(str(tmp_path))
+    key = cache.store("ecut 10\n")
+    assert not cache.isDone(key) and cache.result(key) is None
+    cache.markDone(key, etotal=-8.5, steps=12)
+    assert cache.isDone(key)
+    assert cache.result(key) == { "etotal": -8.5, "steps": 12 }
+    assert InputCache(str(tmp_path)).isDone(key)
+    assert not any(f.endswith(".tmp") for _, _, files in os.walk(tmp_path) for f in files)
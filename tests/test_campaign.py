@@ -0,0 +1,62 @@
+import json
+import os
+from pynabi import Campaign, DataSet, InputCache, digest
+from pynabi.crystal import Atom, AtomBasis, Lattice
+from pynabi.calculation import EnergyCutoff, ToleranceOn
+from pynabi.kspace import SymmetricGrid, BrillouinZone, UsualKShifts
+
+
+def _campaign():
+    base = DataSet(AtomBasis.ofOne(Atom("Si")), ToleranceOn.EnergyDifference(1e-6))
+    return (Campaign(base)
+        .product(lattice={ "a10": Lattice.FCC(10.0), "a11": Lattice.FCC(11.0) })
+        .product(ecut=[EnergyCutoff(e) for e in (10.0, 15.0)])
+        .zip(kgrid=[SymmetricGrid(BrillouinZone.Irreducible, UsualKShifts.FCC).ofMonkhorstPack(n) for n in (4, 6)]))
+
+
+def test_generate(tmp_path):
+    c = _campaign()
+    assert len(c) == 8
+    runs = c.generate(str(tmp_path), workers=1)
+    with open(tmp_path / "manifest.json") as fp:
+        manifest = json.load(fp)
+    assert manifest["axes"] == ["lattice", "ecut", "kgrid"]
+    assert manifest["runs"] == runs and len(runs) == 8
+    first = runs[0]
+    assert first["file"] == os.path.join("lattice-a10", "ecut-0", "kgrid-0", "run.abi")
+    assert first["parameters"] == { "lattice": "a10", "ecut": "0", "kgrid": "0" }
+    assert first["values"]["ecut"] == { "ecut": "10.0 Ha" }
+    assert first["values"]["kgrid"]["ngkpt"] == "3*4"
+    assert first["values"]["lattice"]["acell"] == "10.0 10.0 10.0 Bohr"
+    for r in runs:
+        with open(tmp_path / r["file"]) as fp:
+            text = fp.read()
+        assert digest(text) == r["digest"]
+        assert f"ecut {r['values']['ecut']['ecut']}" in text
+
+
+def test_generate_again(tmp_path):
+    c = _campaign()
+    c.generate(str(tmp_path), workers=1)
+    f = tmp_path / c.path(0)
+    mtime = os.stat(f).st_mtime_ns
+    os.remove(tmp_path / c.path(1))
+    c.generate(str(tmp_path), workers=1)
+    assert os.stat(f).st_mtime_ns == mtime
+    assert os.path.isfile(tmp_path / c.path(1))
+
+
+def test_generate_in_parallel(tmp_path):
+    c = _campaign()
+    runs = c.generate(str(tmp_path / "par"), workers=2, chunksize=3)
+    assert runs == c.generate(str(tmp_path / "seq"), workers=1)
+
+
+def test_generate_with_cache(tmp_path):
+    c = _campaign()
+    cache = InputCache(str(tmp_path / "cache"))
+    runs = c.generate(str(tmp_path / "runs"), workers=1, cache=cache)
+    assert not any(r["done"] for r in runs)
+    cache.markDone(runs[2]["digest"], etotal=-8.0)
+    runs = c.generate(str(tmp_path / "runs"), workers=1, cache=cache)
+    assert [r["done"] for r in runs] == [i == 2 for i in range(8)]
@@ -0,0 +1,60 @@
+from pynabi import DataSet, AbOut, createAbi
+from pynabi.calculation import EnergyCutoff, ToleranceOn
+from pynabi.crystal import Atom, AtomBasis, Lattice
+from pynabi._common import Stampable, Vec3D, formatArray, formatVectors
+
+
+def test_compression():
+    assert formatArray([0.5, 0.5, 0.5, 0.5, 1]) == "4*0.5 1"
+    assert formatArray([1, 1]) == "1 1"
+
+
+def test_compression_inside_vectors():
+    vectors = (Vec3D(0.5, 0.5, 0.5), Vec3D(0.5, 0.0, 0.0), Vec3D(0.0, 0.5, 0.0))
+    assert formatVectors(vectors) == "3*0.5   0.5 2*0.0   0.0 0.5 0.0"
+
+
+class _Checked(Stampable):
+    calls = 0
+
+    def __init__(self, value: int) -> None:
+        self.value = value
+
+    def set(self, value: int):
+        self.value = value
+        self.invalidate()
+        return self
+
+    def compatible(self, coll):
+        _Checked.calls += 1
+
+    def stamp(self, index: int):
+        return f"checked{index or ''} {self.value}"
+
+
+def test_render_cache_invalidated_by_methods():
+    out = AbOut("./out")
+    assert out.render(1) == 'outdata_prefix "./out"'
+    out.ElectronDensity()
+    assert out.render(1) == 'outdata_prefix "./out"\nprtden1 1'
+    basis = AtomBasis.ofOne(Atom("Si"))
+    assert basis.render(0, (Atom("Si"),)).startswith("natom 1")
+    basis.add(Atom("Si"), Vec3D.uniform(0.25))
+    assert basis.render(0, (Atom("Si"),)).startswith("natom 2")
+
+
+def test_validation_scoped_to_modified_stampables():
+    checked = _Checked(1)
+    other = _Checked(2)
+    base = DataSet(AtomBasis.ofOne(Atom("Si")), Lattice.FCC(10.2), ToleranceOn.EnergyDifference(1e-6))
+    sets = [DataSet(checked, EnergyCutoff(10.0)), DataSet(EnergyCutoff(12.0))]
+    _Checked.calls = 0
+    createAbi(base, *sets)
+    createAbi(base, *sets)
+    assert _Checked.calls == 1
+    other.set(3)
+    createAbi(base, *sets)
+    assert _Checked.calls == 1
+    checked.set(4)
+    assert "checked1 4" in createAbi(base, *sets)
+    assert _Checked.calls == 2
@@ -0,0 +1,30 @@
+import numpy as np
+from pynabi import Convergence, createAbi, DataSet
+from pynabi.crystal import Atom, AtomBasis, Lattice
+from pynabi.calculation import EnergyCutoff, ToleranceOn
+
+
+def test_numpy_values():
+    study = Convergence.ofCutoff(np.arange(8.0, 12.25, 0.25), 1e-3)
+    assert all(type(v) is float for v in study.values)
+    base = DataSet(AtomBasis.ofOne(Atom("Si")), Lattice.FCC(10.2), ToleranceOn.EnergyDifference(1e-6))
+    assert "ecut1 8.0 Ha" in createAbi(base, *study.next())
+    grid = Convergence.ofGrid(np.array([[2,2,2], [4,4,4], [6,6,6]]), 1e-3)
+    assert grid.values == [(2,2,2), (4,4,4), (6,6,6)]
+
+
+def test_bisection():
+    values = [float(v) for v in range(1, 21)]
+    made: dict[int, float] = {}
+    def make(v: float):
+        s = EnergyCutoff(v)
+        made[id(s)] = v
+        return s
+    study = Convergence(make, values, 0.5)
+    # converged from 13 on
+    while len(sets := study.next()) > 0:
+        for d in sets:
+            v = next(made[id(s)] for s in d.map.values() if id(s) in made)
+            study.record(d, 0.0 if v >= 13 else 20.0 - v)
+    assert study.done and study.converged == 13.0
+    assert study.rounds > 1 and len(study.energies) < len(values)
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+from pynabi import DataSet, estimate
+from pynabi.crystal import Atom, AtomBasis, Lattice
+from pynabi.calculation import EnergyCutoff, MaxSteps, NonSelfConsistentCalc
+from pynabi.kspace import SymmetricGrid, BrillouinZone, UsualKShifts, ManualGrid
+from pynabi.occupation import Metal, Smearing, SpinType
+from pynabi._common import Vec3D
+
+
+Si = Atom("Si")
+
+
+def _base(*stampables):
+    return DataSet(AtomBasis((Si, Vec3D.zero()), (Si, Vec3D.uniform(0.25))), Lattice.FCC(10.2), *stampables)
+
+
+def test_sizes():
+    c = estimate(DataSet(EnergyCutoff(10.0)), _base(SymmetricGrid(BrillouinZone.Irreducible, UsualKShifts.FCC).ofMonkhorstPack(4)))
+    # plane waves in the sphere of radius sqrt(2*ecut), in the volume a^3/4 of the cell
+    assert c.planeWaves == int(10.2**3/4 * np.sqrt(20.0)**3 / (6*np.pi**2))
+    assert c.kPoints == 4**3 * 4
+    # 8 valence electrons of the two Si atoms
+    assert c.bands == 4
+    assert all(n >= 2*np.sqrt(20.0)*np.linalg.norm(a)/np.pi for n,a in zip(c.fftGrid, Lattice.FCC(10.2).primitiveVectors()))
+    assert c.memory > 0 and c.cost > 0
+
+
+def test_kpoints():
+    mp = SymmetricGrid(BrillouinZone.Irreducible).ofMonkhorstPack((2, 3, 4))
+    assert estimate(DataSet(EnergyCutoff(10.0), mp), _base()).kPoints == 24
+    half = SymmetricGrid(BrillouinZone.Half).ofMonkhorstPack(4)
+    assert estimate(DataSet(EnergyCutoff(10.0), half), _base()).kPoints == 32
+    manual = ManualGrid(Vec3D.zero(), Vec3D.uniform(0.5))
+    assert estimate(DataSet(EnergyCutoff(10.0), manual), _base()).kPoints == 2
+    assert estimate(DataSet(EnergyCutoff(10.0)), _base()).kPoints == 1
+    # spin polarizations are separate k-points
+    assert estimate(DataSet(EnergyCutoff(10.0), manual, SpinType.Polarized), _base()).kPoints == 4
+
+
+def test_bands():
+    assert estimate(DataSet(EnergyCutoff(10.0), Metal(Smearing.FermiDirac)), _base()).bands == 8
+    assert estimate(DataSet(EnergyCutoff(10.0), Metal(Smearing.FermiDirac, bands=12)), _base()).bands == 12
+    assert estimate(DataSet(EnergyCutoff(10.0), SpinType.SpinOrbitCoupling), _base()).bands == 8
+
+
+def test_comparisons():
+    base = _base(SymmetricGrid(BrillouinZone.Irreducible).ofMonkhorstPack(4))
+    low, high = (estimate(DataSet(EnergyCutoff(e)), base) for e in (10.0, 20.0))
+    assert high.planeWaves > low.planeWaves and high.memory > low.memory and high.cost > low.cost
+    # k-points distributed over ranks only reduce the memory of the wavefunctions
+    shared = estimate(DataSet(EnergyCutoff(20.0)), base, ranks=4)
+    assert shared.memory < high.memory and shared.cost == high.cost
+    nscf = estimate(DataSet(EnergyCutoff(20.0), NonSelfConsistentCalc(-2)), base)
+    short = estimate(DataSet(EnergyCutoff(20.0), MaxSteps(15)), base)
+    assert nscf.cost * 30 == pytest.approx(high.cost)
+    assert short.cost * 2 == pytest.approx(high.cost)
+
+
+def test_missing():
+    with pytest.raises(AssertionError):
+        estimate(DataSet(EnergyCutoff(10.0)))
+    with pytest.raises(AssertionError):
+        estimate(DataSet(Lattice.FCC(10.2)))
+    with pytest.raises(AssertionError):
+        estimate(DataSet(EnergyCutoff(10.0)), _base(), ranks=0)
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+from pynabi.crystal import Atom, AtomBasis, ZincBlendeLike, RockSaltLike, spaceGroup, supercell
+from pynabi.units import Ang, Bohr
+from pynabi.units.internal import Pos3D
+from pynabi._common import Vec3D
+
+
+Ga = Atom("Ga")
+As = Atom("As")
+
+
+def test_cartesian_positions_in_bohr():
+    basis = AtomBasis((Ga, Pos3D(0, 0, 0, Ang)), (As, Pos3D(1.0, 2.0, 0.5, Ang)), cartesian=True)
+    np.testing.assert_allclose(basis.positions[1], np.array((1.0, 2.0, 0.5)) / 0.529177249, rtol=1e-6)
+    assert "xcart" in basis.stamp(0, (Ga, As))
+
+
+def test_cartesian_positions_added_in_bohr():
+    basis = AtomBasis((Ga, Vec3D.zero()), cartesian=True)
+    basis.add(As, Pos3D(2.0, 0, 0, Bohr))
+    basis.add(As, Pos3D(1.0, 0, 0, Ang))
+    np.testing.assert_allclose(basis.positions[1:,0], (2.0, 1/0.529177249), rtol=1e-6)
+
+
+def test_space_group_of_supercell():
+    assert len(spaceGroup(*ZincBlendeLike(Ga, As, 10.68))) == 24
+    group = spaceGroup(*supercell(*ZincBlendeLike(Ga, As, 10.68), (4, 4, 4)))
+    assert len(group) == 24 * 64
+    with pytest.raises(AssertionError, match="primitive"):
+        group.stamp(0)
+
+
+def test_species_missing_from_pool():
+    basis = AtomBasis((Ga, Vec3D.zero()), (As, Vec3D.uniform(0.25)))
+    assert "typat 2 1" in basis.stamp(0, (As, Ga))
+    with pytest.raises(ValueError):
+        basis.stamp(0, (Ga,))
+
+
+def _volume(lattice):
+    return abs(np.linalg.det(lattice.primitiveVectors()))
+
+
+def test_supercell():
+    Na, Cl, Br = Atom("Na"), Atom("Cl"), Atom("Br")
+    basis, lattice = RockSaltLike(Na, Cl, 10.6)
+    b, l = supercell(basis, lattice, 2)
+    assert len(b) == 16 and _volume(l) == pytest.approx(8*_volume(lattice))
+    assert b.types.tolist() == [0]*8 + [1]*8
+    assert np.all((b.positions >= 0) & (b.positions < 1))
+    # all the sites are distinct
+    assert len(np.unique(np.round(b.positions, 6), axis=0)) == 16
+
+    b, l = supercell(basis, lattice, (2, 1, 1), vacancies=[0], substitutions={ Br: [2] })
+    assert len(b) == 3 and b.species == (Na, Cl, Br)
+    assert b.types.tolist() == [0, 2, 1]
+    mask = np.zeros(4, dtype=bool)
+    mask[3] = True
+    assert len(supercell(basis, lattice, (2, 1, 1), vacancies=mask)[0]) == 3
+
+
+def test_supercell_of_conventional_cell():
+    basis, lattice = ZincBlendeLike(Ga, As, 10.68)
+    b, l = supercell(basis, lattice, [[-1, 1, 1], [1, -1, 1], [1, 1, -1]])
+    assert len(b) == 8
+    a = l.primitiveVectors()
+    np.testing.assert_allclose(a @ a.T, 10.68**2*np.eye(3), atol=1e-9)
+    assert len(spaceGroup(b, l)) == 24*4
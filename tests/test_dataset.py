@@ -0,0 +1,62 @@
+import re
+from pynabi import DataSet, createAbi
+from pynabi.crystal import Atom, AtomBasis, Lattice
+from pynabi.calculation import EnergyCutoff, SCFMixing, NonSelfConsistentCalc, ToleranceOn, MaxSteps
+
+
+def _base(*stampables):
+    return DataSet(AtomBasis.ofOne(Atom("Si")), Lattice.FCC(10.2), *stampables)
+
+
+def _common(text: str) -> str:
+    return text.split("# Common DataSet")[1].split("\n# ")[0]
+
+
+def test_no_hoisting_in_taken_group():
+    base = _base(SCFMixing(density=True).Pulay(10), ToleranceOn.EnergyDifference(1e-6))
+    sets = [DataSet(NonSelfConsistentCalc(-2), EnergyCutoff(8.0 + i), ToleranceOn.WavefunctionSquaredResidual(1e-12)) for i in range(3)]
+    text = createAbi(base, *sets)
+    common = _common(text)
+    assert len(re.findall(r"^iscf ", common, re.M)) == 1
+    assert "tolwfr " not in common
+    assert all(f"iscf{i} -2" in text for i in (1, 2, 3))
+
+
+def test_no_sweep_of_base_variable():
+    base = _base(EnergyCutoff(10.0), ToleranceOn.EnergyDifference(1e-6))
+    text = createAbi(base, *(DataSet(EnergyCutoff(8.0 + i)) for i in range(3)))
+    assert "ecut:" not in text and "ecut+" not in text
+    assert all(f"ecut{i+1} {8.0 + i} Ha" in text for i in range(3))
+
+
+def test_no_empty_sections_after_sweep():
+    base = _base(ToleranceOn.EnergyDifference(1e-6))
+    text = createAbi(base, *(DataSet(EnergyCutoff(8.0 + i)) for i in range(3)))
+    assert "ecut: 8.0 Ha" in text and "ecut+ 1.0 Ha" in text
+    assert "# DataSet" not in text
+
+
+def test_no_empty_sections_after_hoisting():
+    base = _base(ToleranceOn.EnergyDifference(1e-6))
+    text = createAbi(base, DataSet(EnergyCutoff(10.0)), DataSet(EnergyCutoff(10.0)), series=False)
+    assert "ecut 10.0 Ha" in _common(text)
+    assert "# DataSet" not in text
+
+
+def test_series_over_part_of_the_datasets():
+    base = _base(ToleranceOn.EnergyDifference(1e-6))
+    sets = [DataSet(EnergyCutoff(8.0 + i)) for i in range(4)]
+    sets.append(DataSet(EnergyCutoff(20.0)))
+    sets.append(DataSet(NonSelfConsistentCalc(-2), ToleranceOn.WavefunctionSquaredResidual(1e-12)))
+    text = createAbi(base, *sets)
+    assert "ecut: 8.0 Ha" in text and "ecut+ 1.0 Ha" in text
+    assert "ecut5 20.0 Ha" in text
+    assert not any(f"ecut{i}" in text for i in (1, 2, 3, 4, 6))
+
+
+def test_no_series_of_optional_variables_missing_in_some_datasets():
+    base = _base(ToleranceOn.EnergyDifference(1e-6), EnergyCutoff(10.0))
+    sets = [DataSet(MaxSteps(10 + i)) for i in range(3)] + [DataSet()]
+    text = createAbi(base, *sets)
+    assert "nstep:" not in text
+    assert all(f"nstep{i+1} {10 + i}" in text for i in range(3))
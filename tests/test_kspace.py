@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+from pynabi.crystal import Lattice
+from pynabi.kspace import SymmetricGrid, BrillouinZone, UsualKShifts, Path, CriticalPointsOf, kpointDivisions, densityGrids
+from pynabi._common import Vec3D
+
+
+@pytest.mark.parametrize("n, shifts, count", [
+    (4, UsualKShifts.FCC, 10),
+    (8, UsualKShifts.Unshifted, 29),
+    (8, UsualKShifts.FCC, 60),
+])
+def test_irreducible_points_fcc(n, shifts, count):
+    grid = SymmetricGrid(BrillouinZone.Irreducible, shifts).ofMonkhorstPack(n)
+    points, weights = grid.kpoints(Lattice.FCC(10.2))
+    assert len(points) == count
+    assert weights.sum() == pytest.approx(1.0)
+
+
+def test_path_divisions_round_half_up():
+    # segments of lengths 1 and 2.5 in units of the smallest one
+    path = Path.auto(1, [Vec3D.zero(), Vec3D(0.25, 0, 0), Vec3D(0.25, 0.625, 0)])
+    assert path.divisions(Lattice.CUB(10.0)) == [1, 3]
+    assert path.kpoints(Lattice.CUB(10.0)).shape == (5, 3)
+
+
+def test_even_path():
+    lattice = Lattice.FCC(10.2)
+    path = Path.even(41, lattice, "GXWLG", CriticalPointsOf.FCC)
+    divisions = path.divisions()
+    assert sum(divisions) == 40 and min(divisions) >= 1
+    points = path.kpoints()
+    assert len(points) == 41
+    np.testing.assert_allclose(points[0], 0)
+    np.testing.assert_allclose(points[-1], 0)
+    # evenly spaced in the cartesian reciprocal space
+    steps = np.linalg.norm(np.diff(points @ np.linalg.inv(lattice.primitiveVectors()).T, axis=0), axis=1)
+    assert steps.max() / steps.min() < 1.5
+    assert len(path.toManualGrid().p) == 41
+
+
+def test_kpoint_divisions():
+    # reciprocal vectors of a 10 Bohr cube: 2π/(10*0.529177249) ≈ 1.187 Å⁻¹
+    assert kpointDivisions(Lattice.CUB(10.0), perLength=5).tolist() == [[6, 6, 6]]
+    cells = np.stack([10*np.eye(3), 20*np.eye(3)])
+    assert kpointDivisions(cells, perLength=[5, 5]).tolist() == [[6, 6, 6], [3, 3, 3]]
+    n = kpointDivisions([Lattice.CUB(10.0), Lattice.TET(10.0, 20.0)], perAtom=1000, atoms=2)
+    assert n[0].tolist() == [8, 8, 8]
+    assert n[1, 0] == n[1, 1] and abs(n[1, 0] - 2*n[1, 2]) <= 1
+
+
+def test_density_grids():
+    hexagonal, cubic = densityGrids([Lattice.HEX(6.0, 9.8), Lattice.FCC(10.2)], perLength=4)
+    assert "shiftk 3*0\n" in hexagonal.stamp(0)
+    assert "shiftk 3*0.5\n" in cubic.stamp(0)
+    grids = densityGrids(Lattice.FCC(10.2), perLength=4, shifts=UsualKShifts.FCC)
+    assert len(grids) == 1 and "nshiftk 4" in grids[0].stamp(0)
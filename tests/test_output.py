@@ -0,0 +1,173 @@
+import os
+import numpy as np
+import pytest
+from pynabi import DataSet, AbIn
+from pynabi.crystal import Lattice
+from pynabi.occupation import SpinType
+from pynabi.output import parseAbo, DatasetHeader, SCFIteration, TotalEnergy, Forces, Stress, Trajectory, GridFile, checkGridFiles
+
+
+ABO = os.path.join(os.path.dirname(__file__), "data", "small.abo")
+
+
+def test_parse_abo():
+    records = list(parseAbo(ABO))
+    assert [type(r).__name__ for r in records] == [
+        "DatasetHeader", "SCFIteration", "SCFIteration", "SCFIteration", "Forces", "Stress", "TotalEnergy",
+        "DatasetHeader", "SCFIteration", "SCFIteration", "Forces", "TotalEnergy"]
+    assert all(records[i].offset < records[i+1].offset for i in range(len(records) - 1))
+    energies = [(r.dataset, r.etotal) for r in records if isinstance(r, TotalEnergy)]
+    assert energies == [(1, -8.8454926117002), (2, -8.851)]
+
+
+def test_scf_iterations():
+    iterations = list(parseAbo(ABO, SCFIteration))
+    assert [(r.dataset, r.iteration) for r in iterations] == [(1, 1), (1, 2), (1, 3), (2, 1), (2, 2)]
+    assert iterations[1].etot == -8.8453727815643 and iterations[1].deltaE == -5.956e-3
+    assert iterations[0].residuals == { "residm": 1.045e-4, "vres2": 8.297 }
+    # Fortran reals without the E of three-digit exponents
+    assert iterations[3].residuals["residm"] == 1e-100 and iterations[3].residuals["diffor"] == 1e-3
+
+
+def test_forces_and_stress():
+    forces = list(parseAbo(ABO, Forces))
+    assert forces[0].forces.shape == (2, 3)
+    np.testing.assert_allclose(forces[1].forces, [[-1e-3, 2e-3, -3e-3], [1e-3, -2e-3, 3e-3]])
+    stress, = parseAbo(ABO, Stress)
+    np.testing.assert_allclose(stress.stress, [5.36164405e-05]*3 + [0.0]*3)
+
+
+def test_start_offset():
+    header = [r for r in parseAbo(ABO, DatasetHeader)][1]
+    iterations = list(parseAbo(ABO, SCFIteration, start=header.offset))
+    assert [r.dataset for r in iterations] == [2, 2]
+    # columns of the table before the start are still known
+    first = list(parseAbo(ABO, SCFIteration))[3]
+    later = list(parseAbo(ABO, SCFIteration, start=first.offset + 1))
+    assert later[0].residuals["diffor"] == 1e-5
+
+
+def test_empty(tmp_path):
+    (tmp_path / "empty.abo").write_bytes(b"")
+    assert list(parseAbo(str(tmp_path / "empty.abo"))) == []
+    with pytest.raises(AssertionError):
+        list(parseAbo(ABO, int))
+
+
+def _record(payload: bytes, e: str):
+    marker = np.array([len(payload)], dtype=e+"i4").tobytes()
+    return marker + payload + marker
+
+
+def _grid(path, grid: np.ndarray, rprimd: np.ndarray, e: str = "<", nsppol: int = 1, nspinor: int = 1):
+    """Writes a density file in the layout of Abinit: grid with shape (nspden, cplex, n1, n2, n3)"""
+    nspden, cplex, n1, n2, n3 = grid.shape
+    ints = [0, 20240101, 0, 1, 2, n1, n2, n3, 1, nspden, nspinor, nsppol, 1, 1, 1, 1, 0, 0]
+    reals = [10.0, 20.0, 0.0, 0.0, 0.0, 0.0, 0.0, *rprimd.ravel()]
+    records = [
+        b"9.10.1  " + np.array([80, 52], dtype=e+"i4").tobytes(),
+        np.array(ints, dtype=e+"i4").tobytes() + np.array(reals, dtype=e+"f8").tobytes(),
+        np.zeros(5, dtype=e+"f8").tobytes(), # rest of the header
+    ]
+    # one record per component, with the first index running fastest
+    records += [np.asarray(g.transpose(3, 2, 1, 0), dtype=e+"f8").tobytes() for g in grid]
+    with open(path, "wb") as fp:
+        for r in records:
+            fp.write(_record(r, e))
+
+
+def test_grid_file(tmp_path):
+    rng = np.random.default_rng(0)
+    rprimd = Lattice.FCC(10.0).primitiveVectors()
+    for e, cplex, nspden in (("<", 1, 1), (">", 2, 2)):
+        values = rng.random((nspden, cplex, 4, 3, 2))
+        path = str(tmp_path / f"o_DEN{cplex}")
+        _grid(path, values, rprimd, e)
+        with GridFile(path) as g:
+            assert g.codvsn == "9.10.1" and (g.headform, g.fform) == (80, 52)
+            assert g.ngfft == (4, 3, 2) and (g.nspden, g.cplex, g.natom) == (nspden, cplex, 2)
+            assert g.ecut == 10.0 and g.ecutdg == 20.0
+            np.testing.assert_array_equal(g.rprimd, rprimd)
+            np.testing.assert_array_equal(g.data, values)
+            assert not g.data.flags.writeable
+
+
+def test_grid_file_invalid(tmp_path):
+    path = tmp_path / "o_DEN"
+    path.write_bytes(b"not a fortran file")
+    with pytest.raises(ValueError):
+        GridFile(str(path))
+    # the last record is not a grid of ngfft points
+    _grid(str(path), np.zeros((1, 1, 4, 3, 2)), np.eye(3))
+    path.write_bytes(path.read_bytes()[:-(8*4*3*2 + 8)] + _record(np.zeros(3).tobytes(), "<"))
+    with pytest.raises(ValueError):
+        GridFile(str(path))
+
+
+def test_check_grid_files(tmp_path):
+    path = str(tmp_path / "o_DEN")
+    # same cell in another orientation
+    rotated = Lattice.FCC(10.0).primitiveVectors() @ np.array([[0.0, -1.0, 0.0], [1.0, 0.0, 0.0], [0.0, 0.0, 1.0]])
+    _grid(path, np.zeros((2, 1, 2, 2, 2)), rotated, nsppol=2)
+    base = DataSet(Lattice.FCC(10.0), SpinType.Polarized)
+    checkGridFiles(DataSet(AbIn().ElectronDensity(path)), base)
+    checkGridFiles(DataSet(AbIn().ElectronDensity(str(tmp_path / "missing_DEN"))), base)
+    with pytest.raises(ValueError, match="nsppol"):
+        checkGridFiles(DataSet(AbIn().ElectronDensity(path), SpinType.Unpolarized), base)
+    with pytest.raises(ValueError, match="cell"):
+        checkGridFiles(DataSet(AbIn().ElectronDensity(path), Lattice.FCC(10.5)), base)
+
+
+def _rows(a) -> str:
+    return "".join("   " + " ".join(f"{x: .10E}" for x in r) + "\n" for r in np.reshape(a, (-1, 3)))
+
+
+def _step(k: int, natom: int = 2) -> str:
+    """Output of the k-th ionic step of a relaxation"""
+    xcart = np.arange(3*natom).reshape(natom, 3) * 0.5 + 0.01*k
+    stress = np.array([[1.0, 6.0, 5.0], [6.0, 2.0, 4.0], [5.0, 4.0, 3.0]]) * 1e-5 * k
+    return (
+        "\n Cartesian coordinates (xcart) [bohr]\n" + _rows(xcart) +
+        " Cartesian forces (fcart) [Ha/bohr]; max,rms= 1.0E-03 5.0E-04 (free atoms)\n" + _rows(-0.001*xcart) +
+        " Real space primitive translations (rprimd) [bohr]\n" + _rows(np.eye(3) * (10.0 + 0.01*k)) +
+        " Stress tensor in cartesian coordinates (strten) [Ha/bohr^3]\n" + _rows(stress) +
+        f" Total energy (etotal) [Ha]= -8.{k:04d}0E+00\n"
+    )
+
+
+def test_trajectory(tmp_path):
+    path = tmp_path / "relax.abo"
+    path.write_text(
+        "\n== DATASET  1 ==\n" + "".join(_step(k) for k in range(70)) +
+        "\n== DATASET  2 ==\n" + _step(100) + _step(101, natom=3) + _step(102)
+    )
+    t = Trajectory(str(path))
+    assert len(t) == 72 and t.natom == 2
+    assert t.positions.shape == (72, 2, 3) and t.stress.shape == (72, 6) and t.cell.shape == (72, 3, 3)
+    np.testing.assert_allclose(t.positions[3], np.arange(6).reshape(2, 3) * 0.5 + 0.03)
+    np.testing.assert_allclose(t.forces[3], -0.001 * t.positions[3])
+    np.testing.assert_allclose(t.cell[69], np.eye(3) * 10.69)
+    np.testing.assert_allclose(t.stress[1], [1e-5, 2e-5, 3e-5, 4e-5, 5e-5, 6e-5])
+    # the step with 3 atoms is skipped
+    second = Trajectory(str(path), dataset=2)
+    assert len(second) == 2
+    np.testing.assert_allclose(second.energy, [-8.01, -8.0102])
+
+
+def test_trajectory_update(tmp_path):
+    path = tmp_path / "relax.abo"
+    path.write_text("\n== DATASET  1 ==\n" + _step(1))
+    t = Trajectory(str(path))
+    assert len(t) == 1
+    # the energy line of the next step is not complete yet
+    partial = _step(2)
+    with open(path, "a") as fp:
+        fp.write(partial[:-1])
+    assert t.update() == 0 and len(t) == 1
+    with open(path, "a") as fp:
+        fp.write("\n" + _step(3))
+    assert t.update() == 2 and len(t) == 3
+    assert t.update() == 0
+    np.testing.assert_allclose(t.energy, [-8.0001, -8.0002, -8.0003])
+    # a later reader can start from the offset of the first one
+    assert len(Trajectory(str(path), offset=t.offset)) == 0
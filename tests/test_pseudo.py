@@ -0,0 +1,77 @@
+import json
+import pytest
+from pynabi import DataSet, AbIn, PseudoIndex
+from pynabi.crystal import Atom, AtomBasis
+from pynabi._common import Vec3D
+
+
+PSP8 = """Fe    ONCVPSP-3.3.0  r_core=   1.26
+   26.0000     16.0000      170506    zatom,zion,pspd
+    8   11    2    4   600     0.0000    pspcod,pspxc,lmax,lloc,mesh,r2well
+"""
+
+UPF2 = """<UPF version="2.0.1">
+  <PP_HEADER
+    element="U "
+    z_valence="1.4D1"
+    wfc_cutoff="8.0D1"
+    l_max="3"/>
+"""
+
+UPF1 = """<PP_INFO>
+</PP_INFO>
+<PP_HEADER>
+   0                   Version Number
+  Fm                   Element
+   NC                  Norm - Conserving pseudopotential
+  .F.                  Nonlinear Core Correction
+ SLA  PW   PBE  PBE    PBE  Exchange-Correlation functional
+   16.00000000000      Z valence
+    0.00000000000      Total energy
+    0.0000000    0.0000000 Suggested cutoff for wfc and rho
+    3                  Max angular momentum component
+</PP_HEADER>
+"""
+
+
+@pytest.fixture
+def pseudos(tmp_path):
+    (tmp_path / "Fe.psp8").write_text(PSP8)
+    (tmp_path / "Fe.djrepo").write_text(json.dumps({"hints": {"normal": {"ecut": 45.0}}}))
+    (tmp_path / "U.upf").write_text(UPF2)
+    (tmp_path / "Fm.upf").write_text(UPF1)
+    return tmp_path
+
+
+def test_headers(pseudos):
+    index = PseudoIndex()
+    fe = index.header(str(pseudos / "Fe.psp8"))
+    assert (fe.format, fe.Z, fe.zval, fe.lmax, fe.ecut) == ("psp8", 26.0, 16.0, 2, 45.0)
+    u = index.header(str(pseudos / "U.upf"))
+    assert (u.format, u.Z, u.zval, u.lmax, u.ecut) == ("upf", 92.0, 14.0, 3, 40.0)
+    fm = index.header(str(pseudos / "Fm.upf"))
+    assert (fm.Z, fm.zval, fm.lmax, fm.ecut) == (100.0, 16.0, 3, None)
+
+
+def test_dataset(pseudos):
+    Fe = Atom("Fe")
+    U = Atom("U", "U.upf")
+    d = DataSet(AtomBasis((Fe, Vec3D.zero()), (Fe, Vec3D.uniform(0.5)), (U, Vec3D.uniform(0.25))), AbIn().PseudoPotentials(str(pseudos)))
+    index = PseudoIndex()
+    index.check(d)
+    assert index.electrons(d) == 2*16 + 14
+    assert "ecut 45.0 Ha" == index.suggestedCutoff(d).stamp(0)
+    with pytest.raises(ValueError):
+        index.check(DataSet(AtomBasis((Atom("Co", "Fe.psp8"), Vec3D.zero())), AbIn().PseudoPotentials(str(pseudos))))
+    with pytest.raises(FileNotFoundError):
+        index.check(DataSet(AtomBasis.ofOne(Atom("Ni")), AbIn().PseudoPotentials(str(pseudos))))
+
+
+def test_saved_index(pseudos):
+    path = str(pseudos / "index.json")
+    index = PseudoIndex(path)
+    header = index.header(str(pseudos / "Fe.psp8"))
+    index.save()
+    again = PseudoIndex(path)
+    assert again._dirty is False and again.header(str(pseudos / "Fe.psp8")) == header
+    assert again._dirty is False
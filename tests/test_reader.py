@@ -0,0 +1,73 @@
+from pynabi import DataSet, AbIn, Variables, createAbi, parseAbi, readAbi
+from pynabi.crystal import Atom, AtomBasis, Lattice
+from pynabi.calculation import EnergyCutoff, ToleranceOn, MaxSteps, NonSelfConsistentCalc
+from pynabi.kspace import SymmetricGrid, BrillouinZone, UsualKShifts
+from pynabi._common import Vec3D
+from pynabi._reader import _resolve, _variables
+
+
+Ga = Atom("Ga")
+As = Atom("As")
+
+
+def _base():
+    return DataSet(AtomBasis((Ga, Vec3D.zero()), (As, Vec3D.uniform(0.25))), Lattice.FCC(10.68), ToleranceOn.EnergyDifference(1e-6),
+                   SymmetricGrid(BrillouinZone.Irreducible, UsualKShifts.FCC).ofMonkhorstPack(4))
+
+
+def _value(v):
+    try:
+        return tuple(v.numbers()), v.unit
+    except ValueError:
+        return v.string(), v.unit
+
+
+def _resolved(text: str):
+    """Values of the variables of each dataset, as Abinit reads them"""
+    generic, indexes, datasets = _resolve(_variables(text))
+    return indexes, [{ **{ k: _value(v) for k,v in generic.items() }, **{ k: _value(v) for k,v in d.items() } } for d in datasets]
+
+
+def _roundtrip(text: str):
+    base, datasets = parseAbi(text)
+    again = createAbi(base, *datasets)
+    assert _resolved(again) == _resolved(text)
+    base, datasets = parseAbi(again)
+    assert createAbi(base, *datasets) == again
+    return again
+
+
+def test_roundtrip_double_loop():
+    sets = [DataSet(EnergyCutoff(10.0 + 2*i), MaxSteps(10*(j+1))) for i in range(2) for j in range(3)]
+    text = createAbi(_base(), *sets)
+    assert "udtset 2 3" in text
+    again = _roundtrip(text)
+    assert "udtset 2 3" in again
+    indexes, datasets = _resolved(again)
+    assert indexes == [11, 12, 13, 21, 22, 23]
+    assert [d["ecut"][0][0] for d in datasets] == [10.0]*3 + [12.0]*3
+    assert [d["nstep"][0][0] for d in datasets] == [10, 20, 30]*2
+
+
+def test_roundtrip_series_and_references():
+    sets = [DataSet(EnergyCutoff(8.0 + i)) for i in range(4)]
+    sets.append(DataSet(NonSelfConsistentCalc(-2), ToleranceOn.WavefunctionSquaredResidual(1e-12), AbIn().ElectronDensity(sets[-1]), Variables(nband=12)))
+    text = createAbi(_base(), *sets)
+    assert "ecut: 8.0 Ha" in text
+    again = _roundtrip(text)
+    indexes, datasets = _resolved(again)
+    assert indexes == [1, 2, 3, 4, 5]
+    assert [d["ecut"][0][0] for d in datasets[:4]] == [8.0, 9.0, 10.0, 11.0]
+    assert datasets[4]["getden"][0] == (4,)
+    assert datasets[4]["iscf"][0] == (-2,)
+    assert datasets[4]["nband"][0] == (12,)
+    assert "getden" not in datasets[3]
+
+
+def test_read_from_file(tmp_path):
+    text = createAbi(_base(), DataSet(EnergyCutoff(10.0)), DataSet(EnergyCutoff(12.0)))
+    path = tmp_path / "in.abi"
+    path.write_text(text)
+    base, datasets = readAbi(str(path))
+    assert len(datasets) == 2
+    assert _resolved(createAbi(base, *datasets)) == _resolved(text)
@@ -0,0 +1,114 @@
+import asyncio
+import json
+import sys
+from pynabi import Runner, JobStatus, InputCache, digest
+
+
+# stands for abinit: the input holds the exit code and the time to sleep
+FAKE = """import sys, time
+code, delay = open(sys.argv[1]).read().split()
+print("running", sys.argv[1])
+time.sleep(float(delay))
+sys.exit(int(code))
+"""
+
+
+def _runner(tmp_path, **kwargs):
+    script = tmp_path / "fake.py"
+    script.write_text(FAKE)
+    return Runner([sys.executable, str(script)], concurrency=2, grace=1.0, **kwargs)
+
+
+def _input(tmp_path, name: str, code: int = 0, delay: float = 0.0):
+    path = tmp_path / name
+    path.write_text(f"{code} {delay}\n")
+    return str(path)
+
+
+def test_run(tmp_path):
+    runner = _runner(tmp_path)
+    ok = runner.submit(_input(tmp_path, "ok.abi"))
+    failed = runner.submit(_input(tmp_path, "failed.abi", code=3))
+    assert runner.execute() == [ok, failed]
+    assert ok.status is JobStatus.Done and ok.returncode == 0
+    assert failed.status is JobStatus.Failed and failed.returncode == 3
+    with open(ok.stdout) as fp:
+        assert fp.read() == "running ok.abi\n"
+    assert ok.duration is not None and ok.duration >= 0
+    assert runner.summary()["done"] == 1 and runner.summary()["failed"] == 1
+    # finished jobs are not run again
+    assert runner.execute() == []
+
+
+def test_timeout(tmp_path):
+    runner = _runner(tmp_path, timeout=0.5)
+    slow = runner.submit(_input(tmp_path, "slow.abi", delay=30))
+    fast = runner.submit(_input(tmp_path, "fast.abi"), timeout=10)
+    runner.execute()
+    assert slow.status is JobStatus.TimedOut and slow.returncode != 0
+    assert slow.duration is not None and slow.duration < 10
+    assert fast.status is JobStatus.Done
+
+
+def test_dependencies(tmp_path):
+    runner = _runner(tmp_path)
+    scf = runner.submit(_input(tmp_path, "scf.abi", code=1, delay=0.2))
+    nscf = runner.submit(_input(tmp_path, "nscf.abi"), after=[scf])
+    bands = runner.submit(_input(tmp_path, "bands.abi"), after=[nscf])
+    other = runner.submit(_input(tmp_path, "other.abi"))
+    runner.execute()
+    assert scf.status is JobStatus.Failed
+    assert nscf.status is JobStatus.Cancelled and bands.status is JobStatus.Cancelled
+    assert nscf.started is None
+    assert other.status is JobStatus.Done
+
+    runner = _runner(tmp_path)
+    first = runner.submit(_input(tmp_path, "first.abi", delay=0.2))
+    second = runner.submit(_input(tmp_path, "second.abi"), after=[first])
+    runner.execute()
+    assert second.status is JobStatus.Done and second.started is not None and first.finished is not None
+    assert second.started >= first.finished
+
+
+def test_cancel(tmp_path):
+    runner = _runner(tmp_path)
+    running = runner.submit(_input(tmp_path, "running.abi", delay=30))
+    waiting = runner.submit(_input(tmp_path, "waiting.abi"), after=[running])
+
+    async def main():
+        task = asyncio.create_task(runner.run())
+        while running.status is not JobStatus.Running:
+            await asyncio.sleep(0.01)
+        runner.cancel()
+        await task
+    asyncio.run(main())
+    assert running.status is JobStatus.Cancelled and running.returncode is not None
+    assert waiting.status is JobStatus.Cancelled
+
+
+def test_missing_executable(tmp_path):
+    runner = Runner(str(tmp_path / "missing"))
+    job = runner.submit(_input(tmp_path, "run.abi"))
+    runner.execute()
+    assert job.status is JobStatus.Failed
+    with open(job.stderr) as fp:
+        assert fp.read() != ""
+
+
+def test_cache_and_manifest(tmp_path):
+    cache = InputCache(str(tmp_path / "cache"))
+    inputs = [_input(tmp_path, f"run{i}.abi", delay=0.01*i) for i in range(3)]
+    (tmp_path / "manifest.json").write_text(json.dumps({ "runs": [
+        { "file": "run0.abi" }, { "file": "run1.abi", "done": True }, { "file": "run2.abi" }
+    ] }))
+    runner = _runner(tmp_path, cache=cache)
+    jobs = runner.submitManifest(str(tmp_path))
+    assert [j.input for j in jobs] == [inputs[0], inputs[2]]
+    runner.execute()
+    assert all(j.status is JobStatus.Done for j in jobs)
+    assert cache.isDone(digest("0 0.0\n"))
+
+    runner = _runner(tmp_path, cache=cache)
+    again = runner.submit(inputs[0])
+    runner.execute()
+    assert again.status is JobStatus.Skipped and again.started is None
@@ -0,0 +1,59 @@
+import pytest
+from pynabi import DataSet, AbIn, AbOut, splitAbi
+from pynabi.crystal import Atom, AtomBasis, Lattice
+from pynabi.calculation import EnergyCutoff, NonSelfConsistentCalc, ToleranceOn
+from pynabi._common import Vec3D
+
+
+Si = Atom("Si")
+
+
+def _base(*stampables):
+    return DataSet(AtomBasis((Si, Vec3D.zero()), (Si, Vec3D.uniform(0.25))), Lattice.FCC(10.2), ToleranceOn.EnergyDifference(1e-6), *stampables)
+
+
+def _nscf(source: DataSet):
+    return DataSet(NonSelfConsistentCalc(-2), AbIn().ElectronDensity(source))
+
+
+def test_independent_datasets_split_with_filepath():
+    scf = DataSet(EnergyCutoff(10.0))
+    a, b = _nscf(scf), _nscf(scf)
+    # first-order wavefunctions have no file alternative: c stays with b
+    c = DataSet(AbIn().FirstOrderWavefunction(b).WavefunctionsK(b))
+    parts = splitAbi(_base(), scf, a, b, c, name="si")
+    assert [(p.name, p.after) for p in parts] == [("si_1", ()), ("si_2", ("si_1",)), ("si_3", ("si_1",))]
+    assert [p.text.count("# DataSet") for p in parts] == [1, 1, 2]
+    lines = [p.text.split('\n') for p in parts]
+    for k in range(3):
+        assert f'outdata_prefix "sio_{k+1}"' in lines[k]
+    assert "getden" not in parts[0].text
+    assert 'getden_filepath1 "sio_1_DS1_DEN"' in lines[1]
+    assert 'getden_filepath1 "sio_1_DS1_DEN"' in lines[2]
+    assert "get1wf2 1" in lines[2] and "getwfk2 1" in lines[2]
+    # the datasets given are left untouched
+    assert a.map[AbIn]._d[AbIn.ElectronDensity] is scf
+
+
+def test_chain_stays_in_one_file():
+    scf = DataSet(EnergyCutoff(10.0))
+    nscf = _nscf(scf)
+    bands = _nscf(nscf)
+    part, = splitAbi(_base(AbOut("out")), scf, nscf, bands)
+    assert part.name == "run_1" and part.after == ()
+    lines = part.text.split('\n')
+    assert "ndtset 3" in lines and 'outdata_prefix "out_1"' in lines
+    assert "getden2 1" in lines and "getden3 2" in lines
+    assert "_filepath" not in part.text
+
+
+def test_prefix_of_the_base():
+    scf = DataSet(EnergyCutoff(10.0))
+    parts = splitAbi(_base(AbOut("gaas")), scf, _nscf(scf), _nscf(scf))
+    assert 'getden_filepath1 "gaas_1_DS1_DEN"' in parts[2].text.split('\n')
+
+
+def test_reference_outside_the_split():
+    other = DataSet(EnergyCutoff(10.0))
+    with pytest.raises(ValueError):
+        splitAbi(_base(), DataSet(EnergyCutoff(12.0)), _nscf(other))
@@ -0,0 +1,57 @@
+import io
+import pytest
+from pynabi import DataSet, writeAbi, parseAbi
+from pynabi.crystal import Atom, AtomBasis, Lattice
+from pynabi.calculation import EnergyCutoff, ToleranceOn
+from pynabi._common import Vec3D
+
+
+Si = Atom("Si")
+Ge = Atom("Ge")
+
+
+class _Stream(io.StringIO):
+    def seekable(self):
+        return False
+
+
+def _base():
+    return DataSet(Lattice.FCC(10.2), ToleranceOn.EnergyDifference(1e-6))
+
+
+def _sets(n: int):
+    for i in range(n):
+        yield DataSet(AtomBasis((Si, Vec3D.zero()), (Ge if i % 2 else Si, Vec3D.uniform(0.25))), EnergyCutoff(10.0 + i))
+
+
+def test_ndtset_written_back():
+    fp = io.StringIO()
+    fp.write("# header\n")
+    assert writeAbi(fp, _base(), _sets(12)) == 12
+    text = fp.getvalue()
+    assert text.startswith("# header\nndtset 12 ")
+    assert text.count("ndtset") == 1
+    # the pool, known only at the end, is written last
+    assert text.rstrip().endswith('pseudos "Si.psp8, Ge.psp8"')
+    assert "typat12 1 2" in text and "typat1 1 1\n" in text
+
+
+def test_not_seekable():
+    fp = _Stream()
+    assert writeAbi(fp, _base(), _sets(3)) == 3
+    text = fp.getvalue()
+    assert text.rstrip().endswith("ndtset 3") and text.count("ndtset") == 1
+
+
+def test_round_trip():
+    fp = io.StringIO()
+    writeAbi(fp, _base(), _sets(4))
+    base, datasets = parseAbi(fp.getvalue())
+    assert len(datasets) == 4
+    assert [d.map[EnergyCutoff].stamp(0) for d in datasets] == [f"ecut {10.0 + i} Ha" for i in range(4)]
+    assert [a.num for a in datasets[1].atoms.species] == [14, 32]
+
+
+def test_single_dataset():
+    with pytest.raises(ValueError):
+        writeAbi(io.StringIO(), None, _sets(1))